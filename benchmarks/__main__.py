@@ -0,0 +1,87 @@
+"""Run the benchmarks without asv and print one line per benchmark and parameter set.
+
+The scaling of a benchmark over its params, e.g., the cluster sizes of
+CommandFanOut, reads off consecutive lines.  --output saves the results as
+JSON so that two runs can be compared with --compare.
+"""
+import inspect
+import itertools
+import json
+import re
+import timeit
+
+import click
+
+from benchmarks import orchestration
+
+
+def _param_sets(cls):
+    params = getattr(cls, 'params', [])
+    if not params:
+        return [()]
+    # a single list of values is the params of a class with one parameter
+    if not isinstance(params, tuple):
+        params = (params,)
+    return list(itertools.product(*params))
+
+
+def _time(method, args, repeat):
+    """The best time of one call in seconds, with enough calls per repeat to last 0.1 second."""
+    timer = timeit.Timer(lambda: method(*args))
+    (number, _) = timer.autorange() if hasattr(timer, 'autorange') else (1, None)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(pattern, repeat):
+    results = {}
+    for (class_name, cls) in inspect.getmembers(orchestration, inspect.isclass):
+        if cls.__module__ != orchestration.__name__:
+            continue
+        methods = [name for name in sorted(dir(cls)) if name.startswith('time_') and re.search(pattern, "{}.{}".format(class_name, name))]
+        if not methods:
+            continue
+        for args in _param_sets(cls):
+            benchmark = cls()
+            try:
+                if hasattr(benchmark, 'setup'):
+                    benchmark.setup(*args)
+            except NotImplementedError:
+                print("{:<60} skipped".format("{}({})".format(class_name, ", ".join(map(str, args)))))
+                continue
+            try:
+                for name in methods:
+                    key = "{}.{}({})".format(class_name, name, ", ".join(map(str, args)))
+                    results[key] = _time(getattr(benchmark, name), args, repeat)
+                    print("{:<60} {:>12.3f} ms".format(key, results[key] * 1000))
+            finally:
+                if hasattr(benchmark, 'teardown'):
+                    benchmark.teardown(*args)
+    return results
+
+
+@click.command()
+@click.option('-b', '--bench', 'pattern', default='.', help="Only the benchmarks whose Class.time_method matches this regular expression")
+@click.option('--repeat', type=int, default=3)
+@click.option('--output', type=click.Path(), help="Save the results (seconds per call) as JSON")
+@click.option('--compare', type=click.Path(exists=True), help="Print the ratio to the results of an earlier run")
+@click.option('--factor', type=float, default=1.2, help="Ratio above which --compare flags a regression")
+def cli(pattern, repeat, output, compare, factor):
+    results = run(pattern, repeat)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    if compare:
+        with open(compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = 0
+        for key in sorted(set(results) & set(baseline)):
+            ratio = results[key] / baseline[key]
+            flag = ' REGRESSION' if ratio > factor else ''
+            regressions += 1 if flag else 0
+            print("{:<60} {:>8.2f}x{}".format(key, ratio, flag))
+        if regressions:
+            raise click.ClickException("{} benchmarks are more than {}x slower".format(regressions, factor))
+
+
+if __name__ == '__main__':
+    cli()
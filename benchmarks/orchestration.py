@@ -0,0 +1,132 @@
+"""Benchmarks of the orchestration hot paths, in the asv format.
+
+Each class is set up once per combination of its params and every time_*
+method is timed.  Run them with `asv run` or `python -m benchmarks`.
+"""
+import os
+import shutil
+import tempfile
+
+from scoutcli.utils import artifacts
+from scoutcli.utils import config
+from scoutcli.utils import sar
+
+from benchmarks import synthetic
+
+
+CLUSTER_SIZES = [1, 2, 4, 8, 16, 32, 64]
+
+
+class SarExport:
+    """Parsing, joining and writing sadf output, i.e., sar.export without sadf itself."""
+    params = ([720, 8640, 34560], [1, 4])
+    param_names = ['samples', 'devices']
+
+    def setup(self, samples, devices):
+        self.activities = synthetic.sadf_lines(samples, devices)
+        self.tmp_dir = tempfile.mkdtemp(prefix='scout-bench-')
+
+    def teardown(self, samples, devices):
+        shutil.rmtree(self.tmp_dir)
+
+    def time_export(self, samples, devices):
+        streams = [sar._activity_rows(lines, item_field, prefix) for (lines, item_field, prefix) in self.activities]
+        sar.write(sar.join_streams(streams), os.path.join(self.tmp_dir, 'sar.csv'))
+
+
+class ConfigRewrite:
+    """Rewriting HiBench *.conf and Hadoop *-site.xml files the way configure does."""
+    params = [50, 500, 5000]
+    param_names = ['keys']
+
+    def setup(self, keys):
+        self.tmp_dir = tempfile.mkdtemp(prefix='scout-bench-')
+        self.conf_path = synthetic.property_file(os.path.join(self.tmp_dir, 'hibench.conf'), keys)
+        self.xml_path = os.path.join(self.tmp_dir, 'yarn-site.xml')
+        # update_xml_properties writes the whole set, so every call passes all keys
+        self.xml_properties = {'yarn.synthetic.key{}'.format(i): 'value{}'.format(i) for i in range(keys)}
+        config.update_xml_properties(self.xml_path, self.xml_properties)
+        self.keys = keys
+        self.round = 0
+
+    def teardown(self, keys):
+        shutil.rmtree(self.tmp_dir)
+
+    def _properties(self, prefix):
+        # a new value every round so that the files are really rewritten
+        self.round += 1
+        return {'{}{}'.format(prefix, i): '{}-{}'.format(i, self.round) for i in range(0, self.keys, 10)}
+
+    def time_update_property_file(self, keys):
+        config.update_property_file(self.conf_path, self._properties('hibench.synthetic.key'))
+
+    def time_update_xml_properties(self, keys):
+        config.update_xml_properties(self.xml_path, dict(self.xml_properties, **self._properties('yarn.synthetic.key')))
+
+    def time_unchanged_xml_properties(self, keys):
+        config.update_xml_properties(self.xml_path, self.xml_properties)
+
+
+class CommandFanOut:
+    """Running a trivial command on N fake hosts; the local runner stands in for ssh."""
+    params = CLUSTER_SIZES
+    param_names = ['hosts']
+    timeout = 120
+
+    def setup(self, hosts):
+        try:
+            from scoutcli.utils import parallel
+        except ImportError:
+            # executor is not installed
+            raise NotImplementedError
+        self.parallel = parallel
+        self.hosts = synthetic.hosts(hosts)
+
+    def time_command_agent(self, hosts):
+        with self.parallel.CommandAgent(show_result=False, concurrency=len(self.hosts), multiplex=False) as agent:
+            for host in self.hosts:
+                agent.submit(host, "true", silent=True)
+
+    def time_async_command_agent(self, hosts):
+        with self.parallel.AsyncCommandAgent(show_result=False, runner=self.parallel.local_runner, multiplex=False) as agent:
+            agent.submit_remote_commands(self.hosts, "true")
+
+
+class ReportGeneration:
+    """Packing the outputs of one run into the compressed archive and its index."""
+    params = ([1, 8, 64], ['gzip', 'zstd'])
+    param_names = ['nodes', 'compression']
+    timeout = 300
+
+    def setup(self, nodes, compression):
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise NotImplementedError
+        self.tmp_dir = tempfile.mkdtemp(prefix='scout-bench-')
+        self.source_dir = synthetic.run_directory(os.path.join(self.tmp_dir, 'run'), 720, nodes)
+
+    def teardown(self, nodes, compression):
+        shutil.rmtree(self.tmp_dir)
+
+    def time_pack(self, nodes, compression):
+        artifacts.pack(self.source_dir, os.path.join(self.tmp_dir, 'archive'), ['*.csv', '*.json', '*.log'], compression=compression)
+
+
+class LaunchScript:
+    """Rendering the user data of a fleet for N workloads."""
+    params = [1, 16, 256]
+    param_names = ['workloads']
+
+    def setup(self, workloads):
+        try:
+            from scoutcli import myaws
+        except ImportError:
+            # boto3 is not installed
+            raise NotImplementedError
+        self.myaws = myaws
+        self.workloads = ["hibench spark wordcount large {}".format(i) for i in range(workloads)]
+
+    def time_generate_launch_script(self, workloads):
+        self.myaws._generate_launch_script(self.workloads, colocate=True)
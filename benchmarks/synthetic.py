@@ -0,0 +1,59 @@
+"""Synthetic inputs for the benchmarks: sadf output, HiBench configuration and run directories."""
+import json
+import os
+
+from scoutcli.utils import sar
+
+
+GENERAL_FIELDS = [field for (group, fields) in sar.GENERAL_COLUMN_GROUPS for field in fields]
+DISK_FIELDS = ['tps', 'rkB/s', 'wkB/s', 'areq-sz', 'aqu-sz', 'await', '%util']
+NETWORK_FIELDS = ['rxpck/s', 'txpck/s', 'rxkB/s', 'txkB/s', 'rxcmp/s', 'txcmp/s', 'rxmcst/s', '%ifutil']
+
+
+def _timestamp(i, interval):
+    seconds = i * interval
+    return "2018-05-01 {:02d}:{:02d}:{:02d}".format(seconds // 3600 % 24, seconds // 60 % 60, seconds % 60)
+
+
+def sadf_lines(samples, items=1, interval=5):
+    """`sadf -d` output of the three activities sar.export reads, as lists of lines.
+
+    Returns [(lines, item_field, activity_prefix)] in the order of sar.ACTIVITIES.
+    """
+    general = ['# hostname;interval;timestamp;CPU;' + ';'.join(GENERAL_FIELDS)]
+    general += ['node;{};{};-1;'.format(interval, _timestamp(i, interval)) + ';'.join('{:.2f}'.format((i + j) % 100) for j in range(len(GENERAL_FIELDS)))
+                for i in range(samples)]
+    activities = [(general, 'CPU', None)]
+    for (item_field, prefix, fields, name) in [('DEV', 'disk', DISK_FIELDS, 'xvd{}'), ('IFACE', 'network', NETWORK_FIELDS, 'eth{}')]:
+        lines = ['# hostname;interval;timestamp;{};'.format(item_field) + ';'.join(fields)]
+        lines += ['node;{};{};{};'.format(interval, _timestamp(i, interval), name.format(k)) + ';'.join('{:.2f}'.format((i * k + j) % 100) for j in range(len(fields)))
+                  for i in range(samples) for k in range(items)]
+        activities.append((lines, item_field, prefix))
+    return activities
+
+
+def property_file(path, keys):
+    """A HiBench-style `key value` file with comments between the entries."""
+    with open(path, 'w') as f:
+        for i in range(keys):
+            if i % 10 == 0:
+                f.write("# section {}\n".format(i // 10))
+            f.write("hibench.synthetic.key{}    value{}\n".format(i, i))
+    return path
+
+
+def run_directory(path, samples, nodes=1):
+    """The outputs of one workload run: a sar CSV per node, report.json and logs."""
+    os.makedirs(path, exist_ok=True)
+    for node in range(nodes):
+        rows = sar.join_streams([sar._activity_rows(lines, item_field, prefix) for (lines, item_field, prefix) in sadf_lines(samples)])
+        sar.write(rows, os.path.join(path, 'sar-10.0.0.{}.csv'.format(node + 1)))
+    with open(os.path.join(path, 'report.json'), 'w') as f:
+        json.dump({'workload': 'wordcount', 'framework': 'spark', 'datasize': 'large', 'runtime': 123.4, 'completed': True}, f)
+    with open(os.path.join(path, 'bench.log'), 'w') as f:
+        f.write("INFO synthetic log line\n" * samples)
+    return path
+
+
+def hosts(count):
+    return ['10.0.{}.{}'.format(i // 250, i % 250 + 1) for i in range(count)]
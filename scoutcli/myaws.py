@@ -5,10 +5,45 @@ import platform
 import json
 from timeit import default_timer
 import base64
+import shlex
 
 import click
 import boto3
 
+from scoutcli.utils import aws as aws_helper
+from scoutcli.utils import catalog
+from scoutcli.utils import cluster as cluster_helper
+from scoutcli.utils import helper
+from scoutcli.utils import jobqueue
+from scoutcli.utils import predictor as runtime_predictor
+from scoutcli.utils import s3sync
+from scoutcli.utils import spotprice
+
+
+def _launch_options(f):
+    """The spot fleet options shared by run and queue dispatch."""
+    for option in reversed([
+        click.option('--keyname', default='scout', help="The keyname created in your AWS account."),
+        click.option('--ami', default='ami-2196095e', help="The default or customized AMI"),
+        click.option('--iam-fleet-role', default='arn:aws:iam::xxx:role/aws-ec2-spot-fleet-tagging-role'),
+        click.option('--iam-instance-profile', default='arn:aws:iam::xxx:instance-profile/scout'),
+        click.option('--volume-size', default=120),
+        click.option('--volume-type', default='gp2'),
+        click.option('--subnet', default='subnet-12345678'),
+        click.option('--security-group', default='sg-12345678'),
+        click.option('--availability-zone', default='us-east-1e'),
+        click.option('--user-data', default=None),
+        click.option('--spot-price', default=None),
+        click.option('--cluster-mode', default='n+1', type=click.Choice(['single', 'n+1'])),
+        click.option('--s3-bucket', default='scout', help="The S3 bucket to store benchmark results"),
+        click.option('--scout-dir', default='/opt/scout', help="The scout-cli directory in AMI"),
+        click.option('--script-dir', default='/opt/scout/scripts', help="The help scripts to run benchmarks in AMI"),
+        click.option('--dry-run/--no-dry-run', default=False),
+        click.option('--terminate/--no-terminate', default=True),
+    ]):
+        f = option(f)
+    return f
+
 
 @click.group()
 @click.pass_context
@@ -22,34 +57,279 @@ def cli(ctx, **kwargs):
 @click.option('-w', '--workload', multiple=True, help="benchmark framework application datasize run_id, e.g., hibench hadoop terasort large 1")
 @click.option('--instance-num', default=2, help="If 1 is specified, the single-node model will be triggerd.")
 @click.option('--instance-type', default='m4.large')
-@click.option('--keyname', default='scout', help="The keyname created in your AWS account.")
-@click.option('--ami', default='ami-2196095e', help="The default or customized AMI")
-@click.option('--iam-fleet-role', default='arn:aws:iam::xxx:role/aws-ec2-spot-fleet-tagging-role')
-@click.option('--iam-instance-profile', default='arn:aws:iam::xxx:instance-profile/scout')
-@click.option('--volume-size', default=120)
-@click.option('--volume-type', default='gp2')
-@click.option('--subnet', default='subnet-12345678')
-@click.option('--security-group', default='sg-12345678')
-@click.option('--availability-zone', default='us-east-1e')
-@click.option('--user-data', default=None)
-@click.option('--spot-price', default=None)
-@click.option('--cluster-mode', default='n+1', type=click.Choice(['single', 'n+1']))
-@click.option('--s3-bucket', default='scout', help="The S3 bucket to store benchmark results")
-@click.option('--scout-dir', default='/opt/scout', help="The scout-cli directory in AMI")
-@click.option('--script-dir', default='/opt/scout/scripts', help="The help scripts to run benchmarks in AMI")
-@click.option('--dry-run/--no-dry-run', default=False)
-@click.option('--terminate/--no-terminate', default=True)
+@_launch_options
+@click.option('--colocate/--no-colocate', default=False, help="Let small workloads share the cluster concurrently; results are tagged with their co-location")
+@click.option('--target-seconds', default=None, type=int, help="Bin-pack the workloads into fleets that each finish in about this time")
+@click.option('--history', multiple=True, help="Directories with past results (report.json) used to predict runtimes")
 @click.pass_context
 def run(ctx, *args, **kwargs):
     client = boto3.client('ec2')
-    kwargs['user_data'] = _generate_launch_script(kwargs['workload'], kwargs['terminate'], kwargs['scout_dir'], kwargs['script_dir']) if kwargs['user_data'] is None else kwargs['user_data']
-    kwargs['spot_price'] = _get_spot_price(kwargs['instance_type']) if kwargs['spot_price'] is None else kwargs['spot_price']
+    if kwargs['target_seconds']:
+        predictor = _load_predictor(kwargs['history'])
+        runtimes = {w: predictor.predict_workload(w, kwargs['instance_type'], kwargs['instance_num'], kwargs['cluster_mode']) for w in kwargs['workload']}
+        for group in runtime_predictor.pack(runtimes, kwargs['target_seconds']):
+            print("Fleet with ~{:.0f} seconds of workloads: {}".format(group['seconds'], group['items']))
+            _run_fleet(client, dict(kwargs, workload=group['items']))
+    else:
+        _run_fleet(client, kwargs)
+
+
+def _load_predictor(history):
+    predictor = runtime_predictor.RuntimePredictor(default=jobqueue.DEFAULT_RUNTIME)
+    for path in history:
+        print("Loaded {} reports from {}".format(predictor.load_directory(path), path))
+    return predictor
+
+
+def _run_fleet(client, kwargs):
+    kwargs['user_data'] = _generate_launch_script(kwargs['workload'], kwargs['terminate'], kwargs['scout_dir'], kwargs['script_dir'], kwargs['colocate']) if kwargs['user_data'] is None else kwargs['user_data']
+    kwargs['spot_price'] = spotprice.default_bid(kwargs['instance_type'], kwargs['availability_zone']) if kwargs['spot_price'] is None else kwargs['spot_price']
     print(kwargs['user_data'])
     print(base64.b64encode(kwargs['user_data'].encode()).decode())
-    _request_spot_instance(client, **kwargs)
+    return _request_spot_instance(client, **kwargs)
+
+
+@cli.command()
+@click.argument('key', type=click.Choice(['instance-type', 'instance-id', 'local-ipv4', 'public-ipv4', 'region']))
+@click.pass_context
+def metadata(ctx, key):
+    """Print instance metadata from the shared cache, fetching it at most once
+    """
+    getters = {
+        'instance-type': aws_helper.Instance.get_instance_type,
+        'instance-id': aws_helper.Instance.get_instance_id,
+        'local-ipv4': aws_helper.Instance.get_private_ip,
+        'public-ipv4': aws_helper.Instance.get_public_ip,
+        'region': aws_helper.Instance.get_region,
+    }
+    print(getters[key]())
+
+
+@cli.command()
+@click.argument('source', type=click.Path(exists=True, file_okay=False, resolve_path=True))
+@click.argument('destination')
+@click.option('--include', multiple=True, help="Only upload files matching these patterns, e.g., 'sar*.csv'")
+@click.option('--concurrency', default=8)
+@click.option('--local-s3', default=None, type=click.Path(resolve_path=True), help="Upload into this directory instead of S3, for testing")
+@click.pass_context
+def upload(ctx, source, destination, include, concurrency, local_s3):
+    """Upload SOURCE to s3://bucket/prefix, skipping files already in the manifest
+    """
+    client = s3sync.LocalS3Client(local_s3) if local_s3 else None
+    (uploaded, skipped, failed) = s3sync.Uploader(client, concurrency=concurrency).sync(source, destination, include)
+    print("Uploaded {} files, {} unchanged, {} failed".format(len(uploaded), len(skipped), len(failed)))
+    if failed:
+        ctx.exit(1)
+
+
+@cli.group()
+@click.option('--state', default='queue.json', help="The JSON file holding the job matrix and its progress")
+@click.pass_context
+def queue(ctx, state):
+    """Distribute a benchmark matrix across spot fleets as they become idle
+    """
+    ctx.obj['state'] = state
+
+
+@queue.command()
+@click.option('-w', '--workload', multiple=True, required=True, help="benchmark framework application, e.g., hibench hadoop terasort")
+@click.option('--datasize', multiple=True, required=True)
+@click.option('--instance-type', multiple=True, required=True)
+@click.option('--instance-num', multiple=True, type=int, required=True)
+@click.option('--run-id', multiple=True, required=True)
+@click.pass_context
+def submit(ctx, workload, datasize, instance_type, instance_num, run_id):
+    job_queue = jobqueue.JobQueue(ctx.obj['state'])
+    added = job_queue.add_matrix(workload, datasize, instance_type, instance_num, run_id)
+    job_queue.save()
+    print("Added {} jobs, {} pending".format(added, len(job_queue.pending())))
+
+
+@queue.command()
+@click.pass_context
+def status(ctx):
+    job_queue = jobqueue.JobQueue(ctx.obj['state'])
+    counts = {}
+    for job in job_queue.jobs:
+        counts[job['state']] = counts.get(job['state'], 0) + 1
+    print("Jobs:", counts)
+    print("Active fleets:", job_queue.active_fleets())
+    for (deployment, seconds) in sorted(job_queue.pending_work().items()):
+        print("{}: {} pending, ~{:.0f} seconds".format(deployment, len(job_queue.pending(deployment)), seconds))
+
+
+@queue.command()
+@click.option('--max-fleets', default=4, help="The number of fleets running at the same time")
+@click.option('--target-seconds', default=3600, help="The estimated benchmark time handed to one fleet")
+@click.option('--overhead', default=600, help="The seconds a simulated fleet spends on booting and setup")
+@click.option('--max-retries', default=2, help="How often a workload without report.json is queued again")
+@click.option('--poll', default=60)
+@click.option('--fake/--no-fake', default=False, help="Simulate fleets locally instead of calling EC2")
+@click.option('--history', multiple=True, help="Directories with past results (report.json) used to predict runtimes")
+@_launch_options
+@click.pass_context
+def dispatch(ctx, max_fleets, target_seconds, overhead, max_retries, poll, fake, history, **kwargs):
+    job_queue = jobqueue.JobQueue(ctx.obj['state'], _load_predictor(history), kwargs['cluster_mode'], in_memory=fake)
+    if fake:
+        print("Simulating the dispatch; {} is left unchanged".format(ctx.obj['state']))
+        clock = jobqueue.FakeClock()
+        backend = jobqueue.FakeEC2Backend(clock, overhead=overhead)
+        dispatcher = jobqueue.Dispatcher(job_queue, backend, max_fleets, target_seconds, max_retries, clock=clock.time, sleep=clock.sleep)
+    else:
+        backend = SpotFleetBackend(boto3.client('ec2'), job_queue, **kwargs)
+        dispatcher = jobqueue.Dispatcher(job_queue, backend, max_fleets, target_seconds, max_retries)
+    dispatcher.run(poll)
+    print("Runtime estimates:", json.dumps(job_queue.runtimes, indent=4, sort_keys=True))
+
+
+class SpotFleetBackend:
+    """Launch one spot fleet per batch.
+
+    A fleet is done once terminate_fleet.sh cancels its request or, with
+    --no-terminate, once the report.json of every workload is in S3.  What
+    each fleet runs is read from the queue state, so a restarted dispatcher
+    still collects the runtimes of fleets launched before.
+    """
+    def __init__(self, client, job_queue, **kwargs):
+        self.client = client
+        self.s3 = boto3.client('s3')
+        self.job_queue = job_queue
+        self.kwargs = kwargs
+
+    def launch(self, workloads, instance_type, instance_num):
+        kwargs = dict(self.kwargs, instance_type=instance_type, instance_num=instance_num)
+        kwargs['user_data'] = _generate_launch_script(workloads, kwargs['terminate'], kwargs['scout_dir'], kwargs['script_dir'])
+        kwargs['spot_price'] = spotprice.default_bid(instance_type, kwargs['availability_zone']) if kwargs['spot_price'] is None else kwargs['spot_price']
+        return _request_spot_instance(self.client, **kwargs)
+
+    def runtimes(self, fleet_id):
+        fleet = self.job_queue.fleets.get(fleet_id)
+        if fleet is None or 'workloads' not in fleet:
+            return {}
+        # the output name used by the benchmark session
+        cluster_size = runtime_predictor.workers(fleet['instance_num'], self.kwargs['cluster_mode'])
+        runtimes = {}
+        for workload in fleet['workloads']:
+            (benchmark, framework, app, datasize, run_id) = workload.split()
+            key = "{}_{}_{}_{}_{}_{}/report.json".format(cluster_size, fleet['instance_type'], app, framework, datasize, run_id)
+            try:
+                response = self.s3.get_object(Bucket=self.kwargs['s3_bucket'], Key=key)
+            except self.s3.exceptions.NoSuchKey:
+                continue
+            runtimes[workload] = float(json.loads(response['Body'].read().decode())['elapsed_time'])
+        return runtimes
+
+    def is_done(self, fleet_id):
+        response = self.client.describe_spot_fleet_requests(SpotFleetRequestIds=[fleet_id])
+        state = response['SpotFleetRequestConfigs'][0]['SpotFleetRequestState']
+        if state.startswith('cancelled') or state == 'failed':
+            return True
+        # with --no-terminate the request stays active after the last workload
+        fleet = self.job_queue.fleets.get(fleet_id, {})
+        return 'workloads' in fleet and len(self.runtimes(fleet_id)) == len(fleet['workloads'])
+
+
+@cli.command()
+@click.option('-w', '--workload', required=True, help="benchmark framework application, e.g., hibench hadoop terasort")
+@click.option('--datasize', required=True)
+@click.option('--deadline', default=None, type=float, help="Maximum runtime in seconds")
+@click.option('--budget', default=None, type=float, help="Maximum cost in USD")
+@click.option('--family', multiple=True, default=['c4', 'm4', 'r4'])
+@click.option('--size', multiple=True, default=['large', 'xlarge', '2xlarge'])
+@click.option('--min-nodes', default=2, help="Minimum number of workers")
+@click.option('--max-nodes', default=48, help="Maximum number of workers")
+@click.option('--history', multiple=True, required=True, help="Directories with past results (report.json)")
+@click.option('--region', default='us-east-1')
+@click.option('--availability-zone', multiple=True, default=['us-east-1a', 'us-east-1b', 'us-east-1c', 'us-east-1d', 'us-east-1e', 'us-east-1f'])
+@click.option('--refresh-prices/--cached-prices', default=False, help="Fetch new spot price history instead of using the cache")
+@click.option('--estimated-prices/--no-estimated-prices', 'use_estimates', default=True, help="Price types without spot price history at the default bid instead of skipping them")
+@click.option('--cluster-mode', default='n+1', type=click.Choice(['single', 'n+1']))
+@click.pass_context
+def plan(ctx, workload, datasize, deadline, budget, family, size, min_nodes, max_nodes, history, region, availability_zone, refresh_prices, use_estimates, cluster_mode):
+    """Print the deployments on the runtime/cost Pareto frontier of a workload
+    """
+    from scoutcli.utils import optimizer
+    (benchmark, framework, app) = workload.split()
+    model = optimizer.fit_runtime(_load_predictor(history).observations, app, framework, datasize)
+    if model is None:
+        raise click.UsageError("No past results of {} {} in {}".format(workload, datasize, history))
+    (instance_types, nodes) = optimizer.candidates(family, size, min_nodes, max_nodes)
+    types = sorted(set(instance_types))
+    means = spotprice.SpotPriceHistory(region).mean_prices(types, availability_zone, days=7, refresh=refresh_prices)
+    # the mean over zones, or the default bid without any history
+    prices = {t: (sum(means[t].values()) / len(means[t]) if means[t] else catalog.spot_price(t)) for t in types}
+    prices = {t: p for (t, p) in prices.items() if p is not None}
+    estimated = sorted(t for t in prices if not means[t])
+    if not use_estimates:
+        prices = {t: p for (t, p) in prices.items() if t not in estimated}
+    with helper.Timer() as timer:
+        frontier = optimizer.plan(instance_types, nodes, model, prices, deadline, budget, cluster_mode)
+    print("Evaluated {} deployments in {:.1f} ms".format(len(nodes), timer.elapsed))
+    if estimated:
+        print("No spot price history for {}, {}".format(", ".join(estimated), "using the default bid (estimated)" if use_estimates else "skipped"))
+    for row in frontier:
+        print("{instance_type}\t{nodes}\t{runtime:.0f} s\t${cost:.3f}".format(**row) + ("\t(estimated)" if row['instance_type'] in estimated else ""))
 
 
-def _generate_launch_script(workload_list, terminate=True, scout_dir="/opt/scout", script_dir="/opt/scout/scripts"):
+@cli.command(name='cluster')
+@click.option('--refresh/--cached', default=False, help="Query EC2 even if the cached cluster is complete")
+@click.option('--wait/--no-wait', default=False, help="Poll until all instances of the fleet are running")
+@click.option('--format', 'output_format', default='json', type=click.Choice(['json', 'shell']))
+@click.pass_context
+def cluster_info(ctx, refresh, wait, output_format):
+    """Discover the fleet of this instance and cache it for myhibench/mysparkperf
+    """
+    region = aws_helper.Instance.get_region()
+    discovery = cluster_helper.ClusterDiscovery(boto3.client('ec2', region_name=region), aws_helper.Instance.get_instance_id(), region)
+    info = discovery.wait() if wait else discovery.get(refresh)
+    if output_format == 'json':
+        print(json.dumps(info, indent=4, sort_keys=True))
+        return
+    # the variables config.sh used to compute
+    variables = {
+        'fleet_request_id': info['fleet_request_id'],
+        'instance_list': " ".join(info['instances']),
+        'master': info['master'],
+        'node_list': " ".join(info['slaves']),
+        'cluster_mode': info['cluster_mode'],
+        'target_cluster_size': info['target_cluster_size'],
+        'cluster_size': info['cluster_size'],
+        's3_bucket': info['s3_bucket'],
+    }
+    for (key, value) in sorted(variables.items()):
+        # an unset tag is an empty string, as in the shell
+        print("{}={}".format(key, shlex.quote('' if value is None else str(value))))
+
+
+@cli.group(name='catalog')
+def catalog_group():
+    """Instance specs used to size Hadoop/Spark and to launch fleets
+    """
+
+
+@catalog_group.command()
+@click.option('--dump', default=None, type=click.Path(exists=True, resolve_path=True), help="Output of 'aws ec2 describe-instance-types'; queried live when omitted")
+@click.option('--region', default='us-east-1')
+def refresh(dump, region):
+    if dump:
+        with open(dump, 'r') as f:
+            instance_types = json.load(f)['InstanceTypes']
+    else:
+        paginator = boto3.client('ec2', region_name=region).get_paginator('describe_instance_types')
+        instance_types = [spec for page in paginator.paginate() for spec in page['InstanceTypes']]
+    instance_catalog = catalog.get_catalog()
+    print("Refreshed {} instance types into {}".format(instance_catalog.refresh(instance_types), instance_catalog.path))
+
+
+@catalog_group.command()
+@click.argument('instance_type')
+def show(instance_type):
+    print(json.dumps(dict(catalog.get_catalog().get(instance_type),
+                          yarn_memory=catalog.yarn_memory(instance_type),
+                          config_profile=catalog.config_profile(instance_type)), indent=4, sort_keys=True))
+
+
+def _generate_launch_script(workload_list, terminate=True, scout_dir="/opt/scout", script_dir="/opt/scout/scripts", colocate=False):
     workload_str = " ".join(['"{}"'.format(workload) for workload in workload_list])
     launch_script = '''#!/bin/bash -ex
 setup_ami()
@@ -68,7 +348,7 @@ setup_ami()
 }
 mybenchmark()
 {''' + '''
-    /bin/bash {}/auto_benchmark.sh {}'''.format(script_dir, workload_str) + '''
+    {}/bin/bash {}/auto_benchmark.sh {}'''.format("SCOUT_COLOCATE=1 " if colocate else "", script_dir, workload_str) + '''
 }
 
 echo 'Executing the launch script' |& tee -a /tmp/init.out
@@ -83,30 +363,6 @@ echo 'Executed the launch script' |& tee -a /tmp/init.out
     return launch_script
 
 
-def _get_spot_price(instance_type):
-    price_table = {
-        'c3.large': 0.032,
-        'c3.xlarge': 0.086,
-        'c3.2xlarge': 0.212,
-        'c4.large': 0.045,
-        'c4.xlarge': 0.092,
-        'c4.2xlarge': 0.17,
-        'm3.large': 0.061,
-        'm3.xlarge': 0.12,
-        'm3.2xlarge': 0.26,
-        'm4.large': 0.044,
-        'm4.xlarge': 0.105,
-        'm4.2xlarge': 0.205,
-        'r3.large': 0.061,
-        'r3.xlarge': 0.081,
-        'r3.2xlarge': 0.328,
-        'r4.large': 0.062,
-        'r4.xlarge': 0.12,
-        'r4.2xlarge': 0.26,
-    }
-    return str(price_table[instance_type])
-
-
 def _request_spot_instance(client, **kwargs):
     # http://boto3.readthedocs.io/en/latest/reference/services/ec2.html#EC2.Client.request_spot_instances
     # https://github.com/boto/boto3/issues/714
@@ -124,7 +380,7 @@ def _request_spot_instance(client, **kwargs):
                 'IamInstanceProfile': {
                     'Arn': kwargs['iam_instance_profile'],
                 },
-                'EbsOptimized': all([i not in kwargs['instance_type'] for i in ['c3', 'r3', 'm3', 't2']]),
+                'EbsOptimized': catalog.ebs_optimized(kwargs['instance_type']),
                 'BlockDeviceMappings': [
                     {
                         'DeviceName': '/dev/sda1',
@@ -175,3 +431,4 @@ def _request_spot_instance(client, **kwargs):
         DryRun=kwargs['dry_run'],
         SpotFleetRequestConfig=spot_fleet_request_config
     )
+    return response['SpotFleetRequestId']
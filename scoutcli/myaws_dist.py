@@ -9,6 +9,9 @@ import base64
 import click
 import boto3
 
+from scoutcli.utils import catalog
+from scoutcli.utils import spotprice
+
 
 @click.group()
 @click.pass_context
@@ -46,7 +49,7 @@ def run(ctx, *args, **kwargs):
     client = boto3.client('ec2')
     #print(json.dumps(kwargs))
     kwargs['user_data'] = _generate_launch_script(kwargs['workload'], kwargs['terminate']) if kwargs['user_data'] is None else kwargs['user_data']
-    kwargs['spot_price'] = _get_spot_price(kwargs['instance_type']) if kwargs['spot_price'] is None else kwargs['spot_price']
+    kwargs['spot_price'] = spotprice.default_bid(kwargs['instance_type'], kwargs['availability_zone']) if kwargs['spot_price'] is None else kwargs['spot_price']
     print(kwargs['user_data'])
     print(base64.b64encode(kwargs['user_data'].encode()).decode())
     #print(kwargs['spot_price'])
@@ -72,30 +75,6 @@ echo 'Executed the launch script' |& tee -a /tmp/init.out
     return launch_script
 
 
-def _get_spot_price(instance_type):
-    price_table = {
-        'c3.large': 0.032,
-        'c3.xlarge': 0.086,
-        'c3.2xlarge': 0.212,
-        'c4.large': 0.045,
-        'c4.xlarge': 0.092,
-        'c4.2xlarge': 0.17,
-        'm3.large': 0.061,
-        'm3.xlarge': 0.12,
-        'm3.2xlarge': 0.26,
-        'm4.large': 0.044,
-        'm4.xlarge': 0.105,
-        'm4.2xlarge': 0.205,
-        'r3.large': 0.061,
-        'r3.xlarge': 0.081,
-        'r3.2xlarge': 0.328,
-        'r4.large': 0.062,
-        'r4.xlarge': 0.12,
-        'r4.2xlarge': 0.26,
-    }
-    return str(price_table[instance_type])
-
-
 def _request_spot_instance(client, **kwargs):
     # http://boto3.readthedocs.io/en/latest/reference/services/ec2.html#EC2.Client.request_spot_instances
     # https://github.com/boto/boto3/issues/714
@@ -113,7 +92,7 @@ def _request_spot_instance(client, **kwargs):
                 'IamInstanceProfile': {
                     'Arn': kwargs['iam_instance_profile'],
                 },
-                'EbsOptimized': all([i not in kwargs['instance_type'] for i in ['c3', 'r3', 'm3', 't2']]),
+                'EbsOptimized': catalog.ebs_optimized(kwargs['instance_type']),
                 'BlockDeviceMappings': [
                     {
                         'DeviceName': '/dev/sda1',
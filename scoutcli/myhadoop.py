@@ -1,4 +1,5 @@
 import getpass
+import glob
 import os
 import platform
 import json
@@ -9,8 +10,14 @@ import executor
 from executor import execute
 from executor.ssh.client import RemoteCommand
 
+from scoutcli.utils import cluster as cluster_helper
+from scoutcli.utils import config
 from scoutcli.utils import helper
 from scoutcli.utils import aws as aws_helper
+from scoutcli.utils import readiness
+
+
+CONFIGURATION_FILES = ['hdfs-site.xml', 'mapred-site.xml', 'yarn-site.xml', 'core-site.xml']
 
 
 @click.group()
@@ -71,133 +78,104 @@ def configure(ctx, replicas, hostname, cores, memory, am_cores, task_cores, mast
     print("Cores for Map/Reduce task:", task_cores)
     print("Memory for Map/Reduce task:", task_memory)
 
-    template_hdfs = '''<?xml version="1.0" encoding="UTF-8"?>
-<?xml-stylesheet type="text/xsl" href="configuration.xsl"?>
-<configuration>
-    <property>
-        <name>dfs.replication</name>
-        <value>{}</value>
-    </property>
-</configuration>
-'''
-    template_mapreduce = '''<?xml version="1.0"?>
-<?xml-stylesheet type="text/xsl" href="configuration.xsl"?>
-<configuration>
-    <property>
-        <name>mapreduce.framework.name</name>
-        <value>yarn</value>
-    </property>
-    <property>
-        <name>yarn.app.mapreduce.am.resource.mb</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.app.mapreduce.am.resource.cpu-vcores</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>mapreduce.map.memory.mb</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>mapreduce.map.cpu.vcores</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>mapreduce.reduce.memory.mb</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>mapreduce.reduce.cpu.vcores</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>mapreduce.map.maxattempts</name>
-        <value>1</value>
-    </property>
-    <property>
-        <name>mapreduce.reduce.maxattempts</name>
-        <value>1</value>
-    </property>
-</configuration>
-'''
-    template_yarn = '''<?xml version="1.0"?>
-<configuration>
-    <property>
-        <name>yarn.resourcemanager.hostname</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.scheduler.minimum-allocation-mb</name>
-        <value>128</value>
-    </property>
-    <property>
-        <name>yarn.scheduler.maximum-allocation-mb</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.scheduler.minimum-allocation-vcores</name>
-        <value>1</value>
-    </property>
-    <property>
-        <name>yarn.scheduler.maximum-allocation-vcores</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.nodemanager.resource.memory-mb</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.nodemanager.resource.cpu-vcores</name>
-        <value>{}</value>
-    </property>
-    <property>
-        <name>yarn.nodemanager.aux-services</name>
-        <value>mapreduce_shuffle</value>
-    </property>
-    <property>
-        <name>yarn.resourcemanager.am.max-attempts</name>
-        <value>1</value>
-    </property>
-</configuration>
-'''
-    template_core = '''<?xml version="1.0"?>
-<configuration>
-    <property>
-        <name>fs.defaultFS</name>
-        <value>hdfs://{}:9000</value>
-    </property>
-</configuration>
-'''
-
-    template_hdfs_content = template_hdfs.format(replicas)
-    template_mapreduce_content = template_mapreduce.format(am_memory, am_cores, task_memory, task_cores, task_memory, task_cores)
-    template_yarn_content = template_yarn.format(master, memory, cores, memory, cores) # one extra core for AM in Yarn
-    template_core_content = template_core.format(master)
-    configuration_hdfs_path = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop', 'hdfs-site.xml')
-    configuration_mapreduce_path = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop', 'mapred-site.xml')
-    configuration_yarn_path = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop', 'yarn-site.xml')
-    configuration_core_path = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop', 'core-site.xml')
-    configuration_slaves_path = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop', 'slaves')
-    with open(configuration_hdfs_path, 'w') as f:
-        f.write(template_hdfs_content)
-    with open(configuration_mapreduce_path, 'w') as f:
-        f.write(template_mapreduce_content)
-    with open(configuration_yarn_path, 'w') as f:
-        f.write(template_yarn_content)
-    with open(configuration_core_path, 'w') as f:
-        f.write(template_core_content)
-    with open(configuration_slaves_path, 'w') as f:
-        for slave in slave_list:
-            f.write(slave + "\n")
-    
+    properties = {
+        'hdfs-site.xml': {
+            'dfs.replication': replicas,
+        },
+        'mapred-site.xml': {
+            'mapreduce.framework.name': 'yarn',
+            'yarn.app.mapreduce.am.resource.mb': am_memory,
+            'yarn.app.mapreduce.am.resource.cpu-vcores': am_cores,
+            'mapreduce.map.memory.mb': task_memory,
+            'mapreduce.map.cpu.vcores': task_cores,
+            'mapreduce.reduce.memory.mb': task_memory,
+            'mapreduce.reduce.cpu.vcores': task_cores,
+            'mapreduce.map.maxattempts': 1,
+            'mapreduce.reduce.maxattempts': 1,
+        },
+        'yarn-site.xml': {
+            'yarn.resourcemanager.hostname': master,
+            'yarn.scheduler.minimum-allocation-mb': 128,
+            'yarn.scheduler.maximum-allocation-mb': memory,
+            'yarn.scheduler.minimum-allocation-vcores': 1,
+            'yarn.scheduler.maximum-allocation-vcores': cores,
+            'yarn.nodemanager.resource.memory-mb': memory,
+            'yarn.nodemanager.resource.cpu-vcores': cores,  # one extra core for AM in Yarn
+            'yarn.nodemanager.aux-services': 'mapreduce_shuffle',
+            'yarn.resourcemanager.am.max-attempts': 1,
+        },
+        'core-site.xml': {
+            'fs.defaultFS': 'hdfs://{}:9000'.format(master),
+        },
+    }
+
+    conf_dir = _conf_dir(ctx)
+    changed = [name for (name, props) in properties.items() if config.update_xml_properties(os.path.join(conf_dir, name), props)]
+    if config.update_lines(os.path.join(conf_dir, 'slaves'), slave_list):
+        changed.append('slaves')
+    print("Changed files:", changed if changed else "none")
+    return changed
+
+
+def _conf_dir(ctx):
+    return os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop')
+
+
+def _fingerprint(ctx):
+    conf_dir = _conf_dir(ctx)
+    files = {name: config.read_xml_properties(os.path.join(conf_dir, name)) for name in CONFIGURATION_FILES}
+    slaves_path = os.path.join(conf_dir, 'slaves')
+    files['slaves'] = helper.parse_file(slaves_path) if os.path.exists(slaves_path) else None
+    return str(helper.md5hash(json.dumps(files, sort_keys=True)))
+
+
+def _formatted_fingerprint_path():
+    # outside of /tmp/hadoop-* that init wipes
+    return '/tmp/scout-hadoop-{}.fingerprint'.format(getpass.getuser())
+
 
 @cli.command()
 @click.pass_context
-def init(ctx):
+def fingerprint(ctx):
+    """Print the fingerprint of the Hadoop configuration on disk
+    """
+    current = _fingerprint(ctx)
+    print(current)
+    return current
+
+
+@cli.command()
+@click.option('--if-changed/--always', default=False, help="Skip the format when HDFS was formatted with the same configuration")
+@click.pass_context
+def init(ctx, if_changed):
+    current = _fingerprint(ctx)
+    if if_changed and _is_formatted_with(current):
+        print("HDFS is already formatted with configuration", current)
+        return False
     # workaround to remove storage dir for the datanode
     execute("rm -rf /tmp/hadoop-*")
     execute("{}/bin/hdfs namenode -format -force -nonInteractive".format(ctx.obj['hadoop_dir']))
+    with open(_formatted_fingerprint_path(), 'w') as f:
+        f.write(current)
+    return True
+
+
+def _is_formatted_with(current):
+    path = _formatted_fingerprint_path()
+    if not os.path.exists(path) or not glob.glob('/tmp/hadoop-*'):
+        return False
+    with open(path, 'r') as f:
+        return f.read().strip() == current
+
+
+@cli.command()
+@click.pass_context
+def is_initialized(ctx):
+    """Tell whether HDFS was formatted with the configuration currently on disk
+    """
+    initialized = _is_formatted_with(_fingerprint(ctx))
+    print("Initialized:", initialized)
+    return initialized
 
 @cli.command()
 @click.pass_context
@@ -208,6 +186,27 @@ def start(ctx):
     execute("{}/sbin/start-yarn.sh".format(ctx.obj['hadoop_dir']))
 
 
+@cli.command()
+@click.option('--nodes', default=None, help="Nodes whose sshd must accept connections; all cluster nodes by default")
+@click.option('--slaves', default=None, help="Nodes expected to register as DataNodes and NodeManagers")
+@click.option('--ssh/--no-ssh', default=True)
+@click.option('--hadoop/--no-hadoop', default=True, help="Wait for the NameNode to leave safe mode and all workers to register")
+@click.option('--timeout', type=int, default=600)
+@click.pass_context
+def wait_ready(ctx, nodes, slaves, ssh, hadoop, timeout):
+    """Return as soon as the cluster is usable and record how long each phase took
+    """
+    checker = readiness.Readiness(timeout)
+    if ssh:
+        nodes = nodes if nodes is not None else cluster_helper.cached('instances')
+        checker.nodes(nodes.split())
+    if hadoop:
+        slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
+        checker.hadoop(ctx.obj['hadoop_dir'], len(slaves.split()), len(slaves.split()))
+    checker.record(command='wait_ready')
+    return checker.phases
+
+
 @cli.command()
 @click.pass_context
 def stop(ctx):
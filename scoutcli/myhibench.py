@@ -4,6 +4,8 @@ import time
 import platform
 import json
 import datetime
+import glob
+import shutil
 from timeit import default_timer
 
 import click
@@ -11,9 +13,20 @@ import executor
 from executor import execute
 from executor.ssh.client import RemoteCommand
 
+from scoutcli.utils import artifacts
+from scoutcli.utils import catalog
+from scoutcli.utils import cluster as cluster_helper
+from scoutcli.utils import collector
+from scoutcli.utils import config
+from scoutcli.utils import configpush
 from scoutcli.utils import helper
 from scoutcli.utils import aws as aws_helper
 from scoutcli.utils import parallel
+from scoutcli.utils import readiness
+from scoutcli.utils import scheduler
+from scoutcli.utils import tracing
+from scoutcli.utils.datasets import DatasetRegistry
+from scoutcli.utils.session import BenchmarkSession
 from scoutcli import myhadoop
 
 
@@ -35,30 +48,8 @@ def cli(ctx, **kwargs):
 @click.option('--slaves')
 @click.pass_context
 def auto_configure(ctx, master, slaves):
-    configure_profiles = {
-        # 'type.size': (am_driver_mem, am_driver_mem_overhead, executor_mem_overhead, hadoop_am_mem)
-        'c3.large': (2048, 512, 512, 1024),
-        'c3.xlarge': (2048, 512, 512, 1024),
-        'c3.2xlarge': (2048, 512, 512, 1024),
-        'c4.large': (2048, 512, 512, 1024),
-        'c4.xlarge': (2048, 512, 512, 1024),
-        'c4.2xlarge': (2048, 512, 512, 1024),
-        'm3.large': (4096, 512, 512, 1024),
-        'm3.xlarge': (4096, 512, 512, 1024),
-        'm3.2xlarge': (4096, 512, 512, 1024),
-        'm4.large': (4096, 512, 512, 1024),
-        'm4.xlarge': (4096, 512, 512, 1024),
-        'm4.2xlarge': (4096, 512, 512, 1024),
-        'r3.large': (8192, 512, 512, 1024),
-        'r3.xlarge': (8192, 512, 512, 1024),
-        'r3.2xlarge': (8192, 512, 512, 1024),
-        'r4.large': (8192, 512, 512, 1024),
-        'r4.xlarge': (8192, 512, 512, 1024),
-        'r4.2xlarge': (8192, 512, 512, 1024),
-        't2.large': (4096, 512, 512, 1024),
-        't2.xlarge': (4096, 512, 512, 1024),
-        't2.2xlarge': (4096, 512, 512, 1024),
-    }
+    master = master if master is not None else cluster_helper.cached('master')
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
     # step
     # 0. common setting
     slave_list = list(sorted(slaves.split(' ')))
@@ -127,6 +118,44 @@ def auto_configure(ctx, master, slaves):
     print("Total Memory Usage: {}/{}".format((am_memory+am_memory_overhead) + (executor_memory+executor_memory_overhead) * executor_num, memory_size))
 
 
+@cli.command()
+@click.option('--master')
+@click.option('--slaves')
+@click.option('--instances', help="All nodes of the cluster, including the master")
+@click.option('--init/--no-init', 'initialize', default=True, help="Run 'myhibench init --if-changed' on every node after the configuration is in place")
+@click.option('--timeout', type=int, default=300, help="Seconds each node may take to apply the configuration")
+@click.option('--retries', type=int, default=2)
+@click.pass_context
+def cluster_configure(ctx, master, slaves, instances, initialize, timeout, retries):
+    """Compute the configuration once on the master and push it to all other nodes
+    """
+    master = master if master is not None else cluster_helper.cached('master')
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
+    instances = instances if instances is not None else cluster_helper.cached('instances')
+    # the fleet is homogeneous, so the files auto_configure writes are the same on every node
+    ctx.invoke(auto_configure, master=master, slaves=slaves)
+    hadoop_conf_dir = os.path.join(ctx.obj['hadoop_dir'], 'etc', 'hadoop')
+    paths = [os.path.join(hadoop_conf_dir, name) for name in myhadoop.CONFIGURATION_FILES + ['slaves']]
+    paths += [os.path.join(ctx.obj['hibench_dir'], 'conf', name) for name in ['hibench.conf', 'hadoop.conf', 'spark.conf']]
+    post_cmd = "myhibench init --if-changed" if initialize else None
+    hostname = aws_helper.Instance.get_private_ip()
+    nodes = [node for node in sorted(instances.split(' ')) if node != hostname]
+    print("Pushing configuration to {} nodes".format(len(nodes)))
+    report = configpush.push(nodes, configpush.apply_command(configpush.bundle(paths), post_cmd, timeout), retries=retries)
+    # the master's own init goes into the table too, so a failure there still shows the other nodes
+    report[hostname] = {'status': 'ok', 'attempts': 1, 'output': ''}
+    if initialize:
+        try:
+            ctx.invoke(init, if_changed=True)
+        except Exception as e:
+            report[hostname].update(status='failed', output=str(e))
+    print(configpush.format_table(report, roles={master: 'master'}))
+    failed = [node for (node, entry) in report.items() if entry['status'] != 'ok']
+    if failed:
+        raise click.ClickException("Configuration failed on {}".format(" ".join(sorted(failed))))
+    return report
+
+
 @cli.command()
 @click.option('--master')
 @click.option('--map_parallelism', type=int, default=8)
@@ -158,24 +187,30 @@ def configure(ctx, master, map_parallelism, reduce_parallelism, spark_master, dr
     configuration_hadoop_path = os.path.join(ctx.obj['hibench_dir'], 'conf', 'hadoop.conf')
     configuration_spark_path = os.path.join(ctx.obj['hibench_dir'], 'conf', 'spark.conf')
 
-    execute('sed -i "s/^hibench.default.map.parallelism.*/hibench.default.map.parallelism         {}/" {}'.format(map_parallelism, configuration_hibench_path))
-    execute('sed -i "s/^hibench.default.shuffle.parallelism.*/hibench.default.shuffle.parallelism     {}/" {}'.format(reduce_parallelism, configuration_hibench_path))
-
+    changed = []
+    changed += config.update_property_file(configuration_hibench_path, {
+        'hibench.default.map.parallelism': map_parallelism,
+        'hibench.default.shuffle.parallelism': reduce_parallelism,
+    })
     #hibench.hadoop.home     /opt/hadoop
-    execute('sed -i "s/^hibench.spark.master.*/hibench.spark.master    {}/" {}'.format(spark_master, configuration_spark_path))
-    execute('sed -i "s/^hibench.hdfs.master.*/hibench.hdfs.master    hdfs:\/\/{}:9000/" {}'.format(master, configuration_hadoop_path))
-
-    # executor related
-    execute('sed -i "s/^hibench.yarn.executor.num.*/hibench.yarn.executor.num     {}/" {}'.format(executor_num, configuration_spark_path))
-    execute('sed -i "s/^hibench.yarn.executor.cores.*/hibench.yarn.executor.cores   {}/" {}'.format(executor_cores, configuration_spark_path))
-    execute('sed -i "s/^spark.executor.memory.*/spark.executor.memory {}m/" {}'.format(executor_memory, configuration_spark_path))
-    execute('sed -i "s/^spark.yarn.executor.memoryOverhead.*/spark.yarn.executor.memoryOverhead {}m/" {}'.format(executor_memory_overhead, configuration_spark_path))
-
-    # driver related
-    execute('sed -i "s/^spark.driver.memory.*/spark.driver.memory {}m/" {}'.format(driver_local_memory, configuration_spark_path))
-    execute('sed -i "s/^spark.yarn.am.memory .*/spark.yarn.am.memory {}m/" {}'.format(driver_memory, configuration_spark_path))
-    execute('sed -i "s/^spark.yarn.am.cores.*/spark.yarn.am.cores {}/" {}'.format(driver_cores, configuration_spark_path))
-    execute('sed -i "s/^spark.yarn.am.memoryOverhead.*/spark.yarn.am.memoryOverhead {}m/" {}'.format(driver_memory_overhead, configuration_spark_path))
+    changed += config.update_property_file(configuration_hadoop_path, {
+        'hibench.hdfs.master': 'hdfs://{}:9000'.format(master),
+    })
+    changed += config.update_property_file(configuration_spark_path, {
+        'hibench.spark.master': spark_master,
+        # executor related
+        'hibench.yarn.executor.num': executor_num,
+        'hibench.yarn.executor.cores': executor_cores,
+        'spark.executor.memory': '{}m'.format(executor_memory),
+        'spark.yarn.executor.memoryOverhead': '{}m'.format(executor_memory_overhead),
+        # driver related
+        'spark.driver.memory': '{}m'.format(driver_local_memory),
+        'spark.yarn.am.memory': '{}m'.format(driver_memory),
+        'spark.yarn.am.cores': driver_cores,
+        'spark.yarn.am.memoryOverhead': '{}m'.format(driver_memory_overhead),
+    })
+    print("Changed properties:", changed if changed else "none")
+    return changed
 
 
 @cli.command()
@@ -183,7 +218,7 @@ def configure(ctx, master, map_parallelism, reduce_parallelism, spark_master, dr
 @click.pass_context
 def config_datasize(ctx, datasize):
     configuration_hibench_path = os.path.join(ctx.obj['hibench_dir'], 'conf', 'hibench.conf')
-    execute('sed -i "s/^hibench.scale.profile.*/hibench.scale.profile                 {}/" {}'.format(datasize, configuration_hibench_path))
+    return config.update_property_file(configuration_hibench_path, {'hibench.scale.profile': datasize})
 
 
 @cli.command()
@@ -199,10 +234,14 @@ def stop(ctx):
 
 
 @cli.command()
+@click.option('--if-changed/--always', default=False, help="Keep HDFS and the daemons when the Hadoop configuration is unchanged")
 @click.pass_context
-def init(ctx):
+def init(ctx, if_changed):
+    if if_changed and ctx.invoke(myhadoop.is_initialized):
+        print("Hadoop configuration unchanged, skip stop and format")
+        return False
     ctx.invoke(myhadoop.stop)
-    ctx.invoke(myhadoop.init)
+    return ctx.invoke(myhadoop.init, if_changed=False)
 
 @cli.command()
 @click.pass_context
@@ -211,16 +250,74 @@ def clean(ctx):
     execute(cmd)
 
 
+@cli.command()
+@click.option('-w', '--workload', multiple=True, help="benchmark framework application datasize run_id, e.g., hibench hadoop terasort large 1")
+@click.option('--master')
+@click.option('--slaves')
+@click.option('--instances', help="All nodes of the cluster, including the master")
+@click.option('--mode', default=None)
+@click.option('--cluster-size', type=int)
+@click.option('--instance-type', default=None)
+@click.option('--s3-bucket', default=None, help="Upload the results of each workload to this bucket")
+@click.option('--timeout', type=int, default=7200)
+@click.option('--dataset-cache-dir', default=None, type=click.Path(exists=False, resolve_path=True), help="Local snapshots of prepared datasets")
+@click.option('--colocate/--no-colocate', default=False, help="Run small spark-perf workloads concurrently, splitting the executors evenly; the apps are assumed equally heavy at any datasize")
+@click.option('--max-concurrency', type=int, default=2)
+@click.option('--small-workload', multiple=True, default=scheduler.SMALL_WORKLOADS, help="spark-perf apps that may be co-located, by default those finishing in < 500 seconds")
+@click.pass_context
+def session(ctx, workload, master, slaves, instances, mode, cluster_size, instance_type, s3_bucket, timeout, dataset_cache_dir, colocate, max_concurrency, small_workload):
+    """Run workloads back to back and only reinitialize Hadoop when its configuration changes
+    """
+    master = master if master is not None else cluster_helper.cached('master')
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
+    instances = instances if instances is not None else cluster_helper.cached('instances')
+    mode = mode if mode is not None else cluster_helper.cached('cluster_mode')
+    cluster_size = cluster_size if cluster_size is not None else cluster_helper.cached('cluster_size')
+    spark_env = None
+    cluster = None
+    if colocate:
+        # imported here since mysparkperf imports this module
+        from scoutcli import mysparkperf
+        spark_env = ctx.invoke(mysparkperf.get_spark_env, slaves=slaves, mode=mode)
+        # the same per-node numbers auto_configure passes to myhadoop configure
+        node_memory = ctx.invoke(get_memory, instance=aws_helper.Instance.get_instance_type())
+        cluster = scheduler.capacity(len(slaves.split(' ')), aws_helper.Instance.get_num_of_cores(), node_memory)
+    benchmark_session = BenchmarkSession(
+        master,
+        list(sorted(slaves.split(' '))),
+        list(sorted(instances.split(' '))),
+        mode,
+        cluster_size,
+        aws_helper.Instance.get_instance_type() if instance_type is None else instance_type,
+        s3_bucket=s3_bucket,
+        timeout=timeout,
+        dataset_cache_dir=dataset_cache_dir,
+        hadoop_dir=ctx.obj['hadoop_dir'],
+        hibench_dir=ctx.obj['hibench_dir'])
+    return benchmark_session.run(workload, colocate=colocate, spark_env=spark_env, cluster=cluster, max_concurrency=max_concurrency, small_workloads=list(small_workload))
+
+
 @cli.command()
 @click.option('--workload', default='wordcount')
 @click.option('--datasize')
+@click.option('--cache/--no-cache', default=True, help="Skip generation when a matching dataset is already in HDFS")
+@click.option('--cache-dir', default=None, type=click.Path(exists=False, resolve_path=True), help="Snapshot prepared datasets here and restore them after HDFS is reformatted")
 @click.pass_context
-def prepare_dataset(ctx, workload, datasize):
+def prepare_dataset(ctx, workload, datasize, cache, cache_dir):
     ctx.invoke(config_datasize, datasize=datasize)
     category = ctx.invoke(get_category, workload=workload)
+    registry = DatasetRegistry(ctx.obj['hibench_dir'], ctx.obj['hadoop_dir'], cache_dir=cache_dir)
+    if cache and registry.lookup(category, workload, datasize):
+        print("Reusing prepared dataset: {} | {} | {}".format(category, workload, datasize))
+        return True
     print("Preparing dataset: {} | {}".format(category, workload))
     cmd = "{}/bin/workloads/{}/{}/prepare/prepare.sh".format(ctx.obj['hibench_dir'], category, workload)
-    return execute(cmd, check=False)
+    successful = execute(cmd, check=False)
+    if successful:
+        registry.register(category, workload, datasize)
+    else:
+        registry.invalidate(category, workload, datasize)
+    return successful
 
 
 @cli.command()
@@ -228,30 +325,7 @@ def prepare_dataset(ctx, workload, datasize):
 @click.pass_context
 def get_memory(ctx, instance):
     # not accurate memory but used for HiBench
-    memory_sizes = {
-        'c3.large': 4096,
-        'c3.xlarge': 8192,
-        'c3.2xlarge': 16384,
-        'c4.large': 4096,
-        'c4.xlarge': 8192,
-        'c4.2xlarge': 16384,
-        'm3.large': 8192,
-        'm3.xlarge': 16384,
-        'm3.2xlarge': 32768,
-        'm4.large': 8192,
-        'm4.xlarge': 16384,
-        'm4.2xlarge': 32768,
-        'r3.large': 16384,
-        'r3.xlarge': 32768,
-        'r3.2xlarge': 65536,
-        'r4.large': 16384,
-        'r4.xlarge': 32768,
-        'r4.2xlarge': 65536,
-        't2.large': 8192,
-        't2.xlarge': 16384,
-        't2.2xlarge': 32768,
-    }
-    return memory_sizes[instance]
+    return catalog.yarn_memory(instance)
 
 
 @cli.command()
@@ -285,8 +359,9 @@ def get_category(ctx, workload):
 @click.option('--timeout', type=int)
 @click.option('--datasize')
 @click.option('--slaves')
+@click.option('--stream-port', type=int, default=None, help="Stream node metrics to an aggregator on this port during the run")
 @click.pass_context
-def execute_workload(ctx, workload, framework, monitoring, interval, timeout, datasize, slaves):
+def execute_workload(ctx, workload, framework, monitoring, interval, timeout, datasize, slaves, stream_port):
     category = ctx.invoke(get_category, workload=workload)
     print("Executing workload: {} | {}".format(category, workload, framework))
     workload_dir = os.path.join(ctx.obj['hibench_dir'], 'report', workload, framework)
@@ -298,11 +373,11 @@ def execute_workload(ctx, workload, framework, monitoring, interval, timeout, da
     if monitoring:
         monitoring_output = os.path.join(ctx.obj['hibench_dir'], 'report', workload, framework, 'sar.csv')
         slave_list = list(sorted(slaves.split(' ')))
-        with HiBenchClusterProfiler(slave_list, monitoring_output, interval) as app_profiler:
-            with helper.Timer() as timer:
+        with HiBenchClusterProfiler(slave_list, monitoring_output, interval, stream_port=stream_port) as app_profiler:
+            with helper.Timer() as timer, tracing.get_tracer().span('execute'):
                 successful = execute(cmd, check=False)
     else:
-        with helper.Timer() as timer:
+        with helper.Timer() as timer, tracing.get_tracer().span('execute'):
             successful = execute(cmd, check=False)
     report = {
         'workload': workload,
@@ -341,45 +416,64 @@ def execute_workload(ctx, workload, framework, monitoring, interval, timeout, da
 @click.option('-w', '--workload', help="workload.framework, e.g., wordcount.spark")
 @click.option('--output_dir', default=None, type=click.Path(exists=False, resolve_path=True))
 @click.option('--prepare/--no-prepare', default=False)
+@click.option('--cache/--no-cache', default=True, help="Reuse a matching prepared dataset when --prepare is given")
+@click.option('--cache-dir', default=None, type=click.Path(exists=False, resolve_path=True))
 @click.option('--monitoring/--no-monitoring', default=True)
 @click.option('--interval', type=int, default=5)
 @click.option('--timeout', type=int, default=60*60*24)
 @click.option('--datasize')
 @click.option('--slaves')
 @click.option('--mode')
+@click.option('--stream-port', type=int, default=None, help="Stream node metrics to an aggregator on this port during the run")
+@click.option('--compression', default='gzip', type=click.Choice(['gzip', 'zstd', 'none']), help="Archive the outputs into one compressed file; none copies them as-is")
 @click.pass_context
-def run(ctx, workload, output_dir, prepare, monitoring, interval, timeout, datasize, slaves, mode):
+def run(ctx, workload, output_dir, prepare, cache, cache_dir, monitoring, interval, timeout, datasize, slaves, mode, stream_port, compression):
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
+    mode = mode if mode is not None else cluster_helper.cached('cluster_mode')
     # 2. prepare required dataset
     workload_name, framework = workload.lower().split('.')
 
-    ctx.invoke(config_datasize, datasize=datasize)
-
-    if prepare:
-        ctx.invoke(prepare_dataset, workload=workload_name, datasize=datasize)
-
-    # workaround to avoid failure on als, lr
-    # time.sleep(30)
-
-    # 4. run and collect data
-    successful = ctx.invoke(execute_workload,
-               workload=workload_name,
-               framework=framework,
-               monitoring=monitoring,
-               interval=interval,
-               timeout=timeout,
-               datasize=datasize,
-               slaves=slaves
-               )
-
-    # 5. copy dataset to prefered place
-    hibench_output_dir = os.path.join(ctx.obj['hibench_dir'], 'report', workload_name, framework)
-    execute("timeout 60s bash -c 'while [ ! -f {} ]; do sleep 1; done'".format(os.path.join(hibench_output_dir, 'monitor.html')), check=False)
-    execute("rm -rf {}".format(output_dir))
-    execute("mkdir -p {}".format(output_dir))
-    execute("cp {}/*.log {}".format(hibench_output_dir, output_dir), check=False)
-    execute("cp {}/*.json {}".format(hibench_output_dir, output_dir), check=False)
-    execute("cp {}/*.html {}".format(hibench_output_dir, output_dir), check=False)
-    execute("cp {}/*.csv {}".format(hibench_output_dir, output_dir), check=False)
+    tracer = tracing.get_tracer()
+    with tracer.span('run', benchmark='hibench', workload=workload_name, framework=framework, datasize=datasize, nodes=len(slaves.split(' '))):
+        with tracer.span('configure'):
+            ctx.invoke(config_datasize, datasize=datasize)
+
+        if prepare:
+            with tracer.span('prepare_dataset', cache=cache):
+                ctx.invoke(prepare_dataset, workload=workload_name, datasize=datasize, cache=cache, cache_dir=cache_dir)
+
+        # workaround to avoid failure on als, lr
+        # time.sleep(30)
+
+        # 4. run and collect data
+        successful = ctx.invoke(execute_workload,
+                   workload=workload_name,
+                   framework=framework,
+                   monitoring=monitoring,
+                   interval=interval,
+                   timeout=timeout,
+                   datasize=datasize,
+                   slaves=slaves,
+                   stream_port=stream_port
+                   )
+
+        # 5. copy dataset to prefered place
+        hibench_output_dir = os.path.join(ctx.obj['hibench_dir'], 'report', workload_name, framework)
+        with tracer.span('copy', compression=compression):
+            try:
+                readiness.wait_until(lambda: os.path.exists(os.path.join(hibench_output_dir, 'monitor.html')), timeout=60, interval=0.1, max_interval=1)
+            except readiness.ReadinessTimeout:
+                print("No monitor.html in", hibench_output_dir)
+            shutil.rmtree(output_dir, ignore_errors=True)
+            patterns = ['*.log', '*.json', '*.html', '*.csv', '*.jsonl']
+            if compression == 'none':
+                os.makedirs(output_dir)
+                for path in set(p for pattern in patterns for p in glob.glob(os.path.join(hibench_output_dir, pattern))):
+                    shutil.copy(path, output_dir)
+            else:
+                index = artifacts.pack(hibench_output_dir, output_dir, patterns, compression)
+                print("Archived {} files ({} bytes) into {} bytes".format(len(index['members']), sum(m['size'] for m in index['members']), index['compressed_size']))
+    tracer.save(output_dir)
     return successful
 
 
@@ -388,13 +482,17 @@ def _clear_fs_cache():
 
 
 class HiBenchClusterProfiler(object):
-    def __init__(self, nodes, monitoring_output, monitoring_interval=5, verbose=False):
+    def __init__(self, nodes, monitoring_output, monitoring_interval=5, verbose=False, stream_port=None):
         self.verbose = verbose
         self.timer = default_timer
         self.nodes = nodes
         self.monitoring_output = monitoring_output
         self.monitoring_data = monitoring_output + ".dat"
         self.monitoring_interval = monitoring_interval
+        # stream samples to an aggregator on this node while the workload runs
+        self.stream_port = stream_port
+        self.timeline_output = os.path.join(os.path.dirname(self.monitoring_output), 'cluster_timeline.jsonl')
+        self.aggregator_pidfile = "/tmp/mysar_aggregate.pid"
         print("Monitoring output:", self.monitoring_output)
         print("Monitoring data:", self.monitoring_data)
         print("Monitoring interval:", self.monitoring_interval)
@@ -403,14 +501,25 @@ class HiBenchClusterProfiler(object):
 
     def __enter__(self):
         cmd = "mysar start --output={} --interval={}".format(self.monitoring_data, self.monitoring_interval)
+        if self.stream_port is not None:
+            execute("rm -f {}".format(self.timeline_output))
+            execute("rm -f {}".format(self.aggregator_pidfile))
+            execute("nohup mysar aggregate --output {} --port {} --interval {} --pidfile {} > /dev/null 2>&1 &".format(
+                self.timeline_output, self.stream_port, self.monitoring_interval, self.aggregator_pidfile))
+            # so that the stop in __exit__ finds it
+            if not collector.wait_pidfile(self.aggregator_pidfile):
+                raise RuntimeError("mysar aggregate did not write {}".format(self.aggregator_pidfile))
+            master = aws_helper.Instance.get_private_ip()
+            cmd += " --collector --flush-every=1 --push={}:{}".format(master, self.stream_port)
         print(cmd)
-        with parallel.CommandAgent(show_result=False, concurrency=len(self.nodes)) as agent:
-            # the long timeout avoid irresponsible nodes due to heavy loading
-            agent.submit_remote_commands(
-                self.nodes,
-                cmd,
-                connect_timeout=60,
-                silent=True)
+        with tracing.get_tracer().span('profiler_start', nodes=len(self.nodes), streaming=self.stream_port is not None):
+            with parallel.CommandAgent(show_result=False, concurrency=len(self.nodes)) as agent:
+                # the long timeout avoid irresponsible nodes due to heavy loading
+                agent.submit_remote_commands(
+                    self.nodes,
+                    cmd,
+                    connect_timeout=60,
+                    silent=True)
         self.start = self.timer()
         return self
 
@@ -419,15 +528,20 @@ class HiBenchClusterProfiler(object):
         self.elapsed_secs = self.end - self.start
         self.elapsed = self.elapsed_secs * 1000  # millisecs
 
-        with parallel.CommandAgent(show_result=False, concurrency=len(self.nodes)) as agent:
-            for node in self.nodes:
-                cmd = "mysar stop; mysar export --input={} --output={} --interval={}".format(self.monitoring_data, self.output_records[node], self.monitoring_interval)
-                print(cmd)
-                agent.submit_remote_command(
-               	    node,
-                    cmd,
-                    connect_timeout=60,
-                    silent=True)
+        with tracing.get_tracer().span('profiler_stop', nodes=len(self.nodes)):
+            with parallel.CommandAgent(show_result=False, concurrency=len(self.nodes)) as agent:
+                for node in self.nodes:
+                    cmd = "mysar stop; mysar export --input={} --output={} --interval={}".format(self.monitoring_data, self.output_records[node], self.monitoring_interval)
+                    print(cmd)
+                    agent.submit_remote_command(
+                        node,
+                        cmd,
+                        connect_timeout=60,
+                        silent=True)
+
+            if self.stream_port is not None:
+                # the collectors are stopped, so the last samples are already pushed
+                execute("mysar stop --pidfile {}".format(self.aggregator_pidfile))
 
         if self.verbose:
             print('elapsed time: %f ms' % self.elapsed)
@@ -2,13 +2,17 @@ import getpass
 import os
 import platform
 import json
+import signal
 
 import click
 import executor
 from executor import execute
 from executor.ssh.client import RemoteCommand
 
+from scoutcli.utils import aggregator
+from scoutcli.utils import collector
 from scoutcli.utils import parallel
+from scoutcli.utils import sar
 
 @click.group()
 @click.pass_context
@@ -21,39 +25,98 @@ def cli(ctx, **kwargs):
 @cli.command()
 @click.pass_context
 @click.option('--output', default="/tmp/sar.dat", type=click.Path(exists=False, resolve_path=True))
-@click.option('--interval', default=5, type=int)
-def start(ctx, output, interval):
-    execute("rm -f".format(output))
+@click.option('--interval', default=5, type=float, help="Seconds between samples; the collector supports sub-second intervals")
+@click.option('--collector/--sar', 'use_collector', default=False, help="Sample /proc in-process instead of running the sar daemon")
+@click.option('--flush-every', default=60, type=int, help="Samples buffered by the collector before each write")
+@click.option('--pidfile', default="/tmp/mysar.pid", type=click.Path(exists=False, resolve_path=True))
+@click.option('--push', default=None, help="host:port of a 'mysar aggregate' listener to stream samples to (collector only)")
+def start(ctx, output, interval, use_collector, flush_every, pidfile, push):
+    execute("rm -f {}".format(output))
     execute("mkdir -p {}".format(os.path.dirname(output)))
-    cmd_start = "nohup sar -p -A -o {} {} > /dev/null 2>&1 &".format(output, interval)
+    if use_collector:
+        execute("rm -f {}".format(pidfile))
+        cmd_start = "nohup mysar collect --output {} --interval {} --flush-every {} --pidfile {} {} > /dev/null 2>&1 &".format(output, interval, flush_every, pidfile, "--push {}".format(push) if push else "")
+    else:
+        cmd_start = "nohup sar -p -A -o {} {} > /dev/null 2>&1 &".format(output, max(1, int(interval)))
     # print(cmd_start)
     execute(cmd_start)
+    # a stop issued before the pidfile exists would not find the collector
+    if use_collector and not collector.wait_pidfile(pidfile):
+        raise click.ClickException("The collector did not write {}".format(pidfile))
+
+
+@cli.command()
+@click.pass_context
+@click.option('--output', default="/tmp/sar.dat", type=click.Path(exists=False, resolve_path=True))
+@click.option('--interval', default=1, type=float)
+@click.option('--flush-every', default=60, type=int)
+@click.option('--pidfile', default="/tmp/mysar.pid", type=click.Path(exists=False, resolve_path=True))
+@click.option('--push', default=None, help="host:port of a 'mysar aggregate' listener")
+@click.option('--node', default=None, help="Node name reported to the aggregator, the hostname by default")
+def collect(ctx, output, interval, flush_every, pidfile, push, node):
+    """Run the in-process collector in the foreground until SIGTERM/SIGINT
+    """
+    reader = collector.ProcReader()
+    publisher = None
+    if push:
+        node = platform.node() if node is None else node
+        publisher = aggregator.Publisher(push, node, reader.fields, interval)
+    agent = collector.Collector(output, interval=interval, flush_every=flush_every, reader=reader, publisher=publisher)
+    signal.signal(signal.SIGTERM, agent.stop)
+    signal.signal(signal.SIGINT, agent.stop)
+    collector.write_pidfile(pidfile)
+    try:
+        agent.run()
+    finally:
+        if os.path.exists(pidfile):
+            os.remove(pidfile)
+
+
+@cli.command()
+@click.pass_context
+@click.option('--output', default="/tmp/cluster_timeline.jsonl", type=click.Path(exists=False, resolve_path=True))
+@click.option('--host', default="0.0.0.0")
+@click.option('--port', default=9999, type=int)
+@click.option('--interval', default=1, type=float, help="Width of the time buckets in seconds")
+@click.option('--pidfile', default="/tmp/mysar_aggregate.pid", type=click.Path(exists=False, resolve_path=True))
+def aggregate(ctx, output, host, port, interval, pidfile):
+    """Receive samples pushed by collectors and write one cluster timeline
+    """
+    server = aggregator.Aggregator((host, port), output, interval)
+    signal.signal(signal.SIGTERM, server.stop)
+    signal.signal(signal.SIGINT, server.stop)
+    collector.write_pidfile(pidfile)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(pidfile):
+            os.remove(pidfile)
+
 
 @cli.command()
+@click.option('--pidfile', default="/tmp/mysar.pid", type=click.Path(exists=False, resolve_path=True))
 @click.pass_context
-def stop(ctx):
+def stop(ctx, pidfile):
+    # the collector flushes its buffer on SIGTERM, so wait for it instead of pkill
+    try:
+        if collector.stop(pidfile):
+            return
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
     cmd_kill = "pkill -x sar"
-    execute(cmd_kill)
+    execute(cmd_kill, check=False)
 
 
 @cli.command()
 @click.option('--input', default="/tmp/sar.dat", type=click.Path(exists=True, resolve_path=True))
 @click.option('--output', default="/tmp/sar.csv", type=click.Path(exists=False, resolve_path=True))
 @click.option('--interval', default=5, type=int)
+@click.option('--columnar', default=None, type=click.Choice(sorted(sar.COLUMNAR_FORMATS.keys())), help="Also write a Parquet or Arrow IPC copy next to the CSV")
 @click.pass_context
-def export(ctx, input, output, interval):
+def export(ctx, input, output, interval, columnar):
     execute('mkdir -p {}'.format(os.path.dirname(output)))
-    # TODO: this tool does not support multiple devices
-    cmd_general = 'sadf -dh -t {} {} -- -p -bBqSwW -u ALL -I SUM -r ALL | csvcut -d ";" -C "# hostname,interval,CPU,INTR" | sed "1s/\[\.\.\.\]//g" > {}'.format(interval, input, "/tmp/sar_general.csv")
-    cmd_disk = 'sadf -dh -t {} {} -- -p -d | csvcut -d ";" -C "# hostname,interval,DEV" | sed "1s/\[\.\.\.\]//g" > {}'.format(interval, input, "/tmp/sar_disk.csv")
-    cmd_network = 'sadf -dh -t {} {} -- -p -n DEV | csvcut -d ";" -C "# hostname,interval,IFACE" | sed "1s/\[\.\.\.\]//g" > {}'.format(interval, input, "/tmp/sar_network.csv")
-    cmd_join = 'csvjoin -I -c timestamp /tmp/sar_general.csv /tmp/sar_disk.csv | csvjoin -I -c timestamp - /tmp/sar_network.csv | csvformat -K 1 > {}'.format("/tmp/sar_join.csv")
-    modified_header = 'timestamp,cpu.%usr,cpu.%nice,cpu.%sys,cpu.%iowait,cpu.%steal,cpu.%irq,cpu.%soft,cpu.%guest,cpu.%gnice,cpu.%idle,task.proc/s,task.cswch/s,intr.intr/s,swap.pswpin/s,swap.pswpout/s,paging.pgpgin/s,paging.pgpgout/s,paging.fault/s,paging.majflt/s,paging.pgfree/s,paging.pgscank/s,paging.pgscand/s,paging.pgsteal/s,paging.%vmeff,io.tps,io.rtps,io.wtps,io.bread/s,io.bwrtn/s,memory.kbmemfree,memory.kbavail,memory.kbmemused,memory.%memused,memory.kbbuffers,memory.kbcached,memory.kbcommit,memory.%commit,memory.kbactive,memory.kbinact,memory.kbdirty,memory.kbanonpg,memory.kbslab,memory.kbkstack,memory.kbpgtbl,memory.kbvmused,swap.kbswpfree,swap.kbswpused,swap.%swpused,swap.kbswpcad,swap.%swpcad,load.runq-sz,load.plist-sz,load.ldavg-1,load.ldavg-5,load.ldavg-15,load.blocked,disk.tps,disk.rd_sec/s,disk.wr_sec/s,disk.avgrq-sz,disk.avgqu-sz,disk.await,disk.svctm,disk.%util,network.rxpck/s,network.txpck/s,network.rxkB/s,network.txkB/s,network.rxcmp/s,network.txcmp/s,network.rxmcst/s,network.%ifutil'
-    cmd_create = 'echo {} > {}'.format(modified_header, output)
-    cmd_header = 'cat {} >> {}'.format("/tmp/sar_join.csv", output)
-    execute(cmd_general)
-    execute(cmd_disk)
-    execute(cmd_network)
-    execute(cmd_join)
-    execute(cmd_create)
-    execute(cmd_header)
+    if collector.is_collector_file(input):
+        collector.export(input, output)
+    else:
+        sar.export(input, output, interval, columnar)
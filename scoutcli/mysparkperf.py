@@ -11,7 +11,10 @@ import executor
 from executor import execute
 from executor.ssh.client import RemoteCommand
 
+from scoutcli.utils import catalog
+from scoutcli.utils import cluster as cluster_helper
 from scoutcli.utils import helper
+from scoutcli.utils import tracing
 from scoutcli.utils import aws as aws_helper
 from scoutcli import myhadoop
 from scoutcli.myhibench import HiBenchClusterProfiler
@@ -34,6 +37,8 @@ def cli(ctx, **kwargs):
 @click.option('--slaves')
 @click.pass_context
 def auto_configure(ctx, master, slaves):
+    master = master if master is not None else cluster_helper.cached('master')
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
     # step
     # 0. common setting
     slave_list = list(sorted(slaves.split(' ')))
@@ -64,8 +69,9 @@ def auto_configure(ctx, master, slaves):
 @cli.command()
 @click.option('--slaves')
 @click.option('--mode')
+@click.option('--executor-num', type=int, default=None, help="Use fewer executors than the cluster fits, e.g., when co-located")
 @click.pass_context
-def get_spark_env(ctx, slaves, mode):
+def get_spark_env(ctx, slaves, mode, executor_num):
     instance_type = aws_helper.Instance.get_instance_type()
     num_cores = aws_helper.Instance.get_num_of_cores()
     memory_size = ctx.invoke(get_memory, instance=instance_type)
@@ -85,7 +91,8 @@ def get_spark_env(ctx, slaves, mode):
         driver_local_memory = memory_per_core
 
     executor_cores = 1
-    executor_num = int((len(slave_list) * num_cores - am_cores) / executor_cores)
+    max_executor_num = int((len(slave_list) * num_cores - am_cores) / executor_cores)
+    executor_num = max_executor_num if executor_num is None else min(executor_num, max_executor_num)
     executor_memory_overhead = 512 if (executor_cores * memory_per_core) <= 4096 else 1024
     executor_memory = int(memory_per_core*executor_cores - executor_memory_overhead - executor_memory_overhead)
     map_parallelism = num_cores * len(slave_list) * 2
@@ -125,10 +132,14 @@ def stop(ctx):
 
 
 @cli.command()
+@click.option('--if-changed/--always', default=False, help="Keep HDFS and the daemons when the Hadoop configuration is unchanged")
 @click.pass_context
-def init(ctx):
+def init(ctx, if_changed):
+    if if_changed and ctx.invoke(myhadoop.is_initialized):
+        print("Hadoop configuration unchanged, skip stop and format")
+        return False
     ctx.invoke(myhadoop.stop)
-    ctx.invoke(myhadoop.init)
+    return ctx.invoke(myhadoop.init, if_changed=False)
 
 
 @cli.command()
@@ -141,32 +152,9 @@ def clean(ctx):
 @click.option('--instance', default='c4.large')
 @click.pass_context
 def get_config_profile(ctx, instance):
-    configure_profiles = {
-        # the last one filed is for the Hadoop application. Not used in spark-perf
-        # 'type.size': (am_driver_mem, am_driver_mem_overhead, executor_mem_overhead, hadoop_am_mem)
-        'c3.large': (2048, 512, 512, 1024),
-        'c3.xlarge': (2048, 512, 512, 1024),
-        'c3.2xlarge': (2048, 512, 512, 1024),
-        'c4.large': (2048, 512, 512, 1024),
-        'c4.xlarge': (2048, 512, 512, 1024),
-        'c4.2xlarge': (2048, 512, 512, 1024),
-        'm3.large': (4096, 512, 512, 1024),
-        'm3.xlarge': (4096, 512, 512, 1024),
-        'm3.2xlarge': (4096, 512, 512, 1024),
-        'm4.large': (4096, 512, 512, 1024),
-        'm4.xlarge': (4096, 512, 512, 1024),
-        'm4.2xlarge': (4096, 512, 512, 1024),
-        'r3.large': (8192, 512, 512, 1024),
-        'r3.xlarge': (8192, 512, 512, 1024),
-        'r3.2xlarge': (8192, 512, 512, 1024),
-        'r4.large': (8192, 512, 512, 1024),
-        'r4.xlarge': (8192, 512, 512, 1024),
-        'r4.2xlarge': (8192, 512, 512, 1024),
-        't2.large': (4096, 512, 512, 1024),
-        't2.xlarge': (4096, 512, 512, 1024),
-        't2.2xlarge': (4096, 512, 512, 1024),
-    }
-    return configure_profiles[instance]
+    # the last one filed is for the Hadoop application. Not used in spark-perf
+    # (am_driver_mem, am_driver_mem_overhead, executor_mem_overhead, hadoop_am_mem)
+    return catalog.config_profile(instance)
 
 
 @cli.command()
@@ -174,30 +162,7 @@ def get_config_profile(ctx, instance):
 @click.pass_context
 def get_memory(ctx, instance):
     # not accurate memory but used for HiBench
-    memory_sizes = {
-        'c3.large': 4096,
-        'c3.xlarge': 8192,
-        'c3.2xlarge': 16384,
-        'c4.large': 4096,
-        'c4.xlarge': 8192,
-        'c4.2xlarge': 16384,
-        'm3.large': 8192,
-        'm3.xlarge': 16384,
-        'm3.2xlarge': 32768,
-        'm4.large': 8192,
-        'm4.xlarge': 16384,
-        'm4.2xlarge': 32768,
-        'r3.large': 16384,
-        'r3.xlarge': 32768,
-        'r3.2xlarge': 65536,
-        'r4.large': 16384,
-        'r4.xlarge': 32768,
-        'r4.2xlarge': 65536,
-        't2.large': 8192,
-        't2.xlarge': 16384,
-        't2.2xlarge': 32768,
-    }
-    return memory_sizes[instance]
+    return catalog.yarn_memory(instance)
 
 
 @cli.command()
@@ -869,54 +834,65 @@ def generate_command(ctx, workload, datasize, num_partitions, output_dir):
 @click.option('--timeout', type=int, default=60*60*24)
 @click.option('--slaves')
 @click.option('--mode')
+@click.option('--stream-port', type=int, default=None, help="Stream node metrics to an aggregator on this port during the run")
+@click.option('--executor-num', type=int, default=None)
+@click.option('--colocation', default=None, help="Comma-separated workloads running on the cluster at the same time")
 @click.pass_context
-def run(ctx, workload, datasize, output_dir, monitoring, interval, timeout, slaves, mode):
+def run(ctx, workload, datasize, output_dir, monitoring, interval, timeout, slaves, mode, stream_port, executor_num, colocation):
+    slaves = slaves if slaves is not None else cluster_helper.cached('slaves')
+    mode = mode if mode is not None else cluster_helper.cached('cluster_mode')
     execute("rm -rf {}; mkdir -p {}".format(output_dir, output_dir))
 
-    # 2. prepare env setting?
-    # @TODO: num-partitions?  x cores?
-    spark_env = ctx.invoke(get_spark_env, slaves=slaves, mode=mode)
-    env_settings = {
-        'HADOOP_CONF_DIR': "{}/etc/hadoop".format(ctx.obj['hadoop_dir']),
-        'SPARK_SUBMIT_OPTS': " ".join(["-D{}={}".format(k, spark_env[k]) for k in spark_env.keys()])
-    }
+    tracer = tracing.get_tracer()
+    with tracer.span('run', benchmark='sparkperf', workload=workload, datasize=datasize, nodes=len(slaves.split(' ')), colocation=colocation):
+        with tracer.span('configure'):
+            # 2. prepare env setting?
+            # @TODO: num-partitions?  x cores?
+            spark_env = ctx.invoke(get_spark_env, slaves=slaves, mode=mode, executor_num=executor_num)
+            env_settings = {
+                'HADOOP_CONF_DIR': "{}/etc/hadoop".format(ctx.obj['hadoop_dir']),
+                'SPARK_SUBMIT_OPTS': " ".join(["-D{}={}".format(k, spark_env[k]) for k in spark_env.keys()])
+            }
 
-    execute("export | grep HADOOP_CONF_DIR", environment=env_settings)
-    execute("export | grep SPARK_SUBMIT_OPTS", environment=env_settings)
+            execute("export | grep HADOOP_CONF_DIR", environment=env_settings)
+            execute("export | grep SPARK_SUBMIT_OPTS", environment=env_settings)
 
-    # 1. generate commands
-    cmd = ctx.invoke(generate_command, workload=workload, datasize=datasize, num_partitions=spark_env['sparkperf.executor.num'], output_dir=output_dir)
-    cmd = "timeout {}s {}".format(timeout, cmd)
-    print(cmd)
+            # 1. generate commands
+            cmd = ctx.invoke(generate_command, workload=workload, datasize=datasize, num_partitions=spark_env['sparkperf.executor.num'], output_dir=output_dir)
+            cmd = "timeout {}s {}".format(timeout, cmd)
+            print(cmd)
 
-    timestampt = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S')
+        timestampt = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S')
 
-    if monitoring:
-        monitoring_output = os.path.join(output_dir, 'sar.csv')
-        slave_list = list(sorted(slaves.split(' ')))
-        with HiBenchClusterProfiler(slave_list, monitoring_output, interval) as app_profiler:
-            with helper.Timer() as timer:
+        if monitoring:
+            monitoring_output = os.path.join(output_dir, 'sar.csv')
+            slave_list = list(sorted(slaves.split(' ')))
+            with HiBenchClusterProfiler(slave_list, monitoring_output, interval, stream_port=stream_port) as app_profiler:
+                with helper.Timer() as timer, tracer.span('execute'):
+                    successful = execute(cmd, environment=env_settings, check=False)
+        else:
+            with helper.Timer() as timer, tracer.span('execute'):
                 successful = execute(cmd, environment=env_settings, check=False)
-    else:
-        with helper.Timer() as timer:
-            successful = execute(cmd, environment=env_settings, check=False)
-
-    report = {
-        'workload': workload,
-        'framework': 'spark1.5',
-        'datasize': datasize,
-        'completed': successful,
-        'program': workload,
-        'timestamp': timestampt,
-        'input_size': -1,
-        'elapsed_time': timer.elapsed_secs,
-        'throughput_cluster': -1,
-        'throughput_node': -1
-    }
 
-    report_json = os.path.join(output_dir, 'report.json')
-    with open(report_json, 'w') as f:
-        json.dump(report, f, indent=4, sort_keys=True)
+        report = {
+            'workload': workload,
+            'framework': 'spark1.5',
+            'datasize': datasize,
+            'completed': successful,
+            'program': workload,
+            'timestamp': timestampt,
+            'input_size': -1,
+            'elapsed_time': timer.elapsed_secs,
+            'throughput_cluster': -1,
+            'throughput_node': -1,
+            'executor_num': spark_env['spark.executor.instances'],
+            'colocation': colocation.split(',') if colocation else [],
+        }
+
+        report_json = os.path.join(output_dir, 'report.json')
+        with open(report_json, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+    tracer.save(output_dir)
     return successful
 
 
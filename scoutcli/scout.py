@@ -0,0 +1,79 @@
+import os
+
+import click
+
+from scoutcli.utils import helper
+from scoutcli.utils import warehouse
+
+
+def _filter_options(f):
+    for option in reversed([
+        click.option('--workload', default=None, help="e.g., terasort"),
+        click.option('--framework', default=None),
+        click.option('--datasize', default=None),
+        click.option('--instance-type', default=None, help="Shell-style patterns are allowed, e.g., 'c4.*'"),
+        click.option('--cluster-size', default=None, type=int),
+    ]):
+        f = option(f)
+    return f
+
+
+@click.group()
+@click.option('--db', default=os.path.expanduser('~/.scout/warehouse.sqlite'), type=click.Path(resolve_path=True), help="The results warehouse")
+@click.pass_context
+def cli(ctx, **kwargs):
+    """This is a command line tool to analyze benchmark results
+    """
+    ctx.obj = kwargs
+
+
+@cli.command()
+@click.argument('root', type=click.Path(exists=True, resolve_path=True))
+@click.option('--downsample', default=60, help="Seconds per stored timeline sample")
+@click.option('--force/--no-force', default=False, help="Reindex directories that did not change")
+@click.pass_context
+def index(ctx, root, downsample, force):
+    """Index the result directories below ROOT, e.g., a local mirror of the S3 bucket
+    """
+    store = warehouse.Warehouse(ctx.obj['db'])
+    with helper.Timer() as timer:
+        (indexed, skipped) = store.index(root, downsample, force)
+    store.close()
+    print("Indexed {} runs, {} unchanged, in {:.1f} seconds".format(indexed, skipped, timer.elapsed_secs))
+
+
+@cli.command()
+@_filter_options
+@click.pass_context
+def runs(ctx, **filters):
+    store = warehouse.Warehouse(ctx.obj['db'])
+    for run in store.runs(**filters):
+        print(" ".join(str(run[c]) for c in warehouse.RUN_COLUMNS + ['completed', 'elapsed_time']))
+    store.close()
+
+
+@cli.command()
+@click.option('--metric', required=True, help="A sar CSV column, e.g., cpu.%iowait")
+@click.option('--stat', default='p95', help="mean, max or a percentile such as p95, over the downsampled (bucket mean) timelines")
+@click.option('--group-by', default='cluster_size', type=click.Choice(warehouse.RUN_COLUMNS))
+@_filter_options
+@click.pass_context
+def query(ctx, metric, stat, group_by, **filters):
+    """Aggregate a metric over the timelines of matching runs
+    """
+    store = warehouse.Warehouse(ctx.obj['db'])
+    with helper.Timer() as timer:
+        results = store.query(metric, stat, group_by, **filters)
+    store.close()
+    for (key, value) in results.items():
+        print("{}\t{}".format(key, value))
+    print("({:.1f} ms)".format(timer.elapsed))
+
+
+@cli.command()
+@click.pass_context
+def metrics(ctx):
+    store = warehouse.Warehouse(ctx.obj['db'])
+    for metric in store.metrics():
+        print(metric)
+    store.close()
@@ -0,0 +1,149 @@
+import json
+import logging
+import math
+import socket
+import socketserver
+import threading
+
+from scoutcli.utils import collector
+
+
+class Publisher(object):
+    """Push per-interval metric rates of one node to the aggregator over TCP.
+
+    Messages are JSON lines.  The column list is sent once per connection and
+    every following message only carries [timestamp, value, ...] samples.  A
+    failed push is dropped and the connection is retried on the next flush, so
+    an unreachable master never stalls sampling.
+    """
+    def __init__(self, address, node, fields, interval, timeout=2):
+        (host, port) = address.rsplit(':', 1)
+        self.address = (host, int(port))
+        self.node = node
+        self.fields = fields
+        self.interval = interval
+        self.timeout = timeout
+        self.sock = None
+        self.previous = None
+        self.logger = logging.getLogger('.'.join([__name__, self.__class__.__name__]))
+
+    def _connect(self, columns):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._send({'node': self.node, 'interval': self.interval, 'columns': columns})
+
+    def _send(self, message):
+        self.sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+    def publish(self, records):
+        samples = []
+        columns = None
+        for current in records:
+            current = (current[0], current[1:])
+            if self.previous is not None:
+                elapsed = (current[0] - self.previous[0]) or self.interval
+                row = collector.rates(self.fields, self.previous, current, elapsed)
+                columns = [column for (column, value) in row]
+                samples.append([current[0]] + [round(value, 3) for (column, value) in row])
+            self.previous = current
+        if not samples:
+            return
+        try:
+            if self.sock is None:
+                self._connect(columns)
+            self._send({'node': self.node, 'samples': samples})
+        except OSError as e:
+            self.logger.warning("Failed to push %s samples to %s: %s", len(samples), self.address, e)
+            self.close()
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class Timeline(object):
+    """Merge node samples into time-aligned buckets and append them as JSON lines.
+
+    A bucket is written once the newest sample is `lateness` seconds past it,
+    so slow nodes still land in the right bucket.  Samples arriving after
+    their bucket was written, or after close(), are counted in `dropped`
+    instead of appending a second line for the same timestamp.
+    """
+    def __init__(self, output, interval, lateness=None):
+        self.output = output
+        self.interval = interval
+        self.lateness = lateness if lateness is not None else 10 * interval
+        self.buckets = {}
+        self.columns = {}
+        self.newest = None
+        self.flushed = None
+        self.dropped = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('.'.join([__name__, self.__class__.__name__]))
+        self.f = open(output, 'a')
+
+    def bucket(self, timestamp):
+        return round(math.floor(timestamp / self.interval) * self.interval, 3)
+
+    def add(self, node, samples):
+        with self.lock:
+            if self.closed:
+                self.dropped += len(samples)
+                return
+            columns = self.columns[node]
+            for sample in samples:
+                bucket = self.bucket(sample[0])
+                if self.flushed is not None and bucket <= self.flushed:
+                    self.logger.warning("Dropped a sample of %s for bucket %s, already written", node, bucket)
+                    self.dropped += 1
+                    continue
+                self.buckets.setdefault(bucket, {})[node] = dict(zip(columns, sample[1:]))
+                self.newest = bucket if self.newest is None else max(self.newest, bucket)
+            self._write(lambda bucket: bucket < self.newest - self.lateness)
+
+    def _write(self, ready):
+        for bucket in sorted(b for b in self.buckets.keys() if ready(b)):
+            self.f.write(json.dumps({'timestamp': bucket, 'nodes': self.buckets.pop(bucket)}, sort_keys=True) + '\n')
+            self.flushed = bucket
+        self.f.flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._write(lambda bucket: True)
+            self.f.close()
+            self.closed = True
+
+
+class AggregatorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        timeline = self.server.timeline
+        for line in self.rfile:
+            if timeline.closed:
+                break
+            message = json.loads(line.decode('utf-8'))
+            if 'columns' in message:
+                with timeline.lock:
+                    timeline.columns[message['node']] = message['columns']
+            else:
+                timeline.add(message['node'], message['samples'])
+
+
+class Aggregator(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, output, interval):
+        socketserver.ThreadingTCPServer.__init__(self, address, AggregatorHandler)
+        self.timeline = Timeline(output, interval)
+
+    def stop(self, *args):
+        # shutdown() blocks until serve_forever() returns, so run it aside
+        threading.Thread(target=self.shutdown).start()
+
+    def server_close(self):
+        # stop accepting connections first; handlers still connected find the timeline closed
+        socketserver.ThreadingTCPServer.server_close(self)
+        self.timeline.close()
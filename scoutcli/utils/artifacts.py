@@ -0,0 +1,85 @@
+import codecs
+import fnmatch
+import glob
+import json
+import os
+import tarfile
+
+
+INDEX_NAME = 'artifacts.json'
+ARCHIVE_NAMES = {'gzip': 'results.tar.gz', 'zstd': 'results.tar.zst'}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd archives need the zstandard package: pip install scout-cli[zstd]")
+    return zstandard
+
+
+def pack(source_dir, output_dir, patterns, compression='gzip', keep=('report.json',)):
+    """Write the files in source_dir matching patterns into one compressed tar.
+
+    Files are streamed from source_dir into the archive, so nothing is copied
+    first.  Files named in keep are also written uncompressed since the job
+    queue and the runtime predictor read them directly.  An index of the
+    members is written next to the archive; returns the index.
+    """
+    files = sorted(set(path for pattern in patterns for path in glob.glob(os.path.join(source_dir, pattern))))
+    os.makedirs(output_dir, exist_ok=True)
+    archive_path = os.path.join(output_dir, ARCHIVE_NAMES[compression])
+    members = []
+    with open(archive_path, 'wb') as raw:
+        if compression == 'zstd':
+            stream = _zstandard().ZstdCompressor(level=3).stream_writer(raw)
+            tar = tarfile.open(fileobj=stream, mode='w|')
+        else:
+            stream = None
+            tar = tarfile.open(fileobj=raw, mode='w:gz', compresslevel=6)
+        with tar:
+            for path in files:
+                name = os.path.basename(path)
+                tar.add(path, arcname=name)
+                members.append({'name': name, 'size': os.path.getsize(path)})
+        if stream is not None:
+            stream.close()
+    for name in keep:
+        path = os.path.join(source_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as src, open(os.path.join(output_dir, name), 'wb') as dst:
+                dst.write(src.read())
+    index = {
+        'archive': os.path.basename(archive_path),
+        'compression': compression,
+        'compressed_size': os.path.getsize(archive_path),
+        'members': members,
+    }
+    with open(os.path.join(output_dir, INDEX_NAME), 'w') as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+    return index
+
+
+def read_index(result_dir):
+    path = os.path.join(result_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def iter_members(result_dir, pattern='*'):
+    """Yield (name, text file) for the archived members matching pattern, in one pass."""
+    index = read_index(result_dir)
+    if index is None:
+        return
+    wanted = set(m['name'] for m in index['members'] if fnmatch.fnmatch(m['name'], pattern))
+    with open(os.path.join(result_dir, index['archive']), 'rb') as raw:
+        if index['compression'] == 'zstd':
+            tar = tarfile.open(fileobj=_zstandard().ZstdDecompressor().stream_reader(raw), mode='r|')
+        else:
+            tar = tarfile.open(fileobj=raw, mode='r|gz')
+        with tar:
+            for member in tar:
+                if member.name in wanted:
+                    yield (member.name, codecs.getreader('utf-8')(tar.extractfile(member)))
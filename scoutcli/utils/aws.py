@@ -1,25 +1,118 @@
+import http.client
+import json
 import math
+import os
+import time
+import urllib.parse
 
-from executor import execute
+
+class MetadataProvider:
+    """Fetch EC2 instance metadata once and cache it in memory and on disk.
+
+    Requests share one keep-alive HTTP connection.  The endpoint can be
+    pointed at a local stub server with SCOUT_METADATA_ENDPOINT.
+    """
+    def __init__(self, endpoint=None, cache_file=None, ttl=3600, timeout=2):
+        self.endpoint = endpoint or os.environ.get('SCOUT_METADATA_ENDPOINT', 'http://169.254.169.254')
+        self.cache_file = cache_file or os.environ.get('SCOUT_METADATA_CACHE', '/tmp/scout-metadata.json')
+        self.ttl = ttl
+        self.timeout = timeout
+        self.connection = None
+        self.cache = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        # entries fetched from another endpoint, e.g., a test stub, are ignored
+        if cache.get('endpoint') != self.endpoint:
+            return {}
+        return cache.get('entries', {})
+
+    def _save(self):
+        tmp_file = "{}.{}".format(self.cache_file, os.getpid())
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({'endpoint': self.endpoint, 'entries': self.cache}, f)
+            os.rename(tmp_file, self.cache_file)
+        except IOError:
+            pass
+
+    def _fetch(self, path):
+        url = urllib.parse.urlparse(self.endpoint)
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+            try:
+                self.connection.request('GET', url.path.rstrip('/') + path)
+                response = self.connection.getresponse()
+                body = response.read().decode('utf-8')
+                if response.status != 200:
+                    raise IOError("metadata {} returned HTTP {}".format(path, response.status))
+                return body
+            except (http.client.HTTPException, ConnectionError):
+                # the server may have dropped the keep-alive connection
+                self.connection.close()
+                self.connection = None
+                if attempt == 1:
+                    raise
+
+    def get(self, path):
+        entry = self.cache.get(path)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        value = self._fetch(path)
+        self.cache[path] = (value, time.time())
+        self._save()
+        return value
+
+    def clear(self):
+        self.cache = {}
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+
+_provider = None
+
+
+def get_metadata_provider():
+    global _provider
+    if _provider is None:
+        _provider = MetadataProvider()
+    return _provider
 
 
 class Instance:
+    @staticmethod
     def get_private_ip():
         # not sure what will happen to the case with multiple network interfaces
-        return execute('curl http://169.254.169.254/latest/meta-data/local-ipv4', capture=True, silent=True)
+        return get_metadata_provider().get('/latest/meta-data/local-ipv4')
 
+    @staticmethod
     def get_public_ip():
-        return execute('curl http://169.254.169.254/latest/meta-data/public-ipv4', capture=True, silent=True)
+        return get_metadata_provider().get('/latest/meta-data/public-ipv4')
 
+    @staticmethod
     def get_instance_type():
-        return execute('curl http://169.254.169.254/latest/meta-data/instance-type', capture=True, silent=True)
+        return get_metadata_provider().get('/latest/meta-data/instance-type')
 
+    @staticmethod
     def get_instance_id():
-        return execute('curl http://169.254.169.254/latest/meta-data/instance-id', capture=True, silent=True)
+        return get_metadata_provider().get('/latest/meta-data/instance-id')
+
+    @staticmethod
+    def get_region():
+        return json.loads(get_metadata_provider().get('/latest/dynamic/instance-identity/document'))['region']
 
+    @staticmethod
     def get_num_of_cores():
-        return int(execute('getconf _NPROCESSORS_ONLN', capture=True, silent=True))
+        return os.sysconf('SC_NPROCESSORS_ONLN')
 
+    @staticmethod
     def get_memory_in_gb():
-        mem_gb = int(math.ceil(float(execute('cat /proc/meminfo  | grep -i memtotal', capture=True, silent=True).split(' ')[-2]) / 1048576))
-        return mem_gb
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.lower().startswith('memtotal'):
+                    return int(math.ceil(float(line.split()[1]) / 1048576))
@@ -0,0 +1,82 @@
+import json
+import os
+
+
+BUNDLED_CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'instance_types.json')
+CACHED_CATALOG = os.environ.get('SCOUT_INSTANCE_CATALOG', os.path.expanduser('~/.scout/instance_types.json'))
+
+
+class InstanceCatalog:
+    """Instance specs (vcpus, memory_mib, network_performance, ebs_optimized_support) by type.
+
+    The refreshed copy in the cache takes precedence over the one bundled
+    with the package.  spot_price is the default bid and only known for the
+    types benchmarked so far.
+    """
+    def __init__(self, path=None):
+        self.path = path if path is not None else (CACHED_CATALOG if os.path.exists(CACHED_CATALOG) else BUNDLED_CATALOG)
+        with open(self.path, 'r') as f:
+            self.types = json.load(f)
+
+    def __contains__(self, instance_type):
+        return instance_type in self.types
+
+    def get(self, instance_type):
+        if instance_type not in self.types:
+            raise KeyError("{} is not in the instance catalog {}; refresh it with 'myaws catalog refresh'".format(instance_type, self.path))
+        return self.types[instance_type]
+
+    def refresh(self, instance_types, output=CACHED_CATALOG):
+        """Merge the InstanceTypes of describe-instance-types into the catalog and save it."""
+        for spec in instance_types:
+            entry = self.types.setdefault(spec['InstanceType'], {})
+            entry.update({
+                'vcpus': spec['VCpuInfo']['DefaultVCpus'],
+                'memory_mib': spec['MemoryInfo']['SizeInMiB'],
+                'network_performance': spec['NetworkInfo']['NetworkPerformance'],
+                'ebs_optimized_support': spec['EbsInfo']['EbsOptimizedSupport'],
+            })
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(output, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(self.types, f, indent=4, sort_keys=True)
+        os.rename(tmp_path, output)
+        self.path = output
+        return len(instance_types)
+
+
+_catalog = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = InstanceCatalog()
+    return _catalog
+
+
+def vcpus(instance_type):
+    return get_catalog().get(instance_type)['vcpus']
+
+
+def yarn_memory(instance_type):
+    """The memory (MB) HiBench and spark-perf assume: the instance memory rounded up to a power of two."""
+    memory = 1024
+    while memory < get_catalog().get(instance_type)['memory_mib']:
+        memory *= 2
+    return memory
+
+
+def config_profile(instance_type):
+    """(am_driver_mem, am_driver_mem_overhead, executor_mem_overhead, hadoop_am_mem), i.e., the memory per vcpu for the driver."""
+    return (yarn_memory(instance_type) // vcpus(instance_type), 512, 512, 1024)
+
+
+def ebs_optimized(instance_type):
+    # only families where EBS optimization is free and on by default
+    return get_catalog().get(instance_type)['ebs_optimized_support'] == 'default'
+
+
+def spot_price(instance_type):
+    return get_catalog().get(instance_type).get('spot_price')
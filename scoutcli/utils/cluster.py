@@ -0,0 +1,144 @@
+import json
+import os
+
+
+CACHE_FILE = os.environ.get('SCOUT_CLUSTER_CACHE', '/tmp/scout-cluster.json')
+
+
+def _paginate(client, method, result_key, **kwargs):
+    """Collect result_key over all NextToken pages of a describe call."""
+    items = []
+    while True:
+        response = getattr(client, method)(**kwargs)
+        items.extend(response[result_key])
+        if not response.get('NextToken'):
+            return items
+        kwargs['NextToken'] = response['NextToken']
+
+
+class ClusterDiscovery:
+    """Find the spot fleet this instance belongs to and the roles of its nodes.
+
+    One paginated call per resource type: the tags of this instance, the
+    active instances of the fleet, and the private IPs of all of them.  The
+    master is the lowest private IP; in n+1 mode it is not a slave.  A cached
+    cluster is only reused while the fleet still has the same instances.
+    """
+    def __init__(self, client, instance_id, region=None, cache_file=CACHE_FILE):
+        self.client = client
+        self.instance_id = instance_id
+        self.region = region
+        self.cache_file = cache_file
+
+    def discover(self):
+        tags = _paginate(self.client, 'describe_tags', 'Tags', Filters=[{'Name': 'resource-id', 'Values': [self.instance_id]}])
+        tags = {tag['Key']: tag['Value'] for tag in tags}
+        fleet_request_id = tags['aws:ec2spot:fleet-request-id']
+        instance_ids = self._active_instance_ids(fleet_request_id)
+        reservations = _paginate(self.client, 'describe_instances', 'Reservations', InstanceIds=instance_ids) if instance_ids else []
+        instances = sorted(i['PrivateIpAddress'] for r in reservations for i in r['Instances'] if i.get('PrivateIpAddress'))
+        cluster_mode = tags.get('cluster-mode', 'n+1')
+        target_cluster_size = int(tags['cluster-size'])
+        info = {
+            'region': self.region,
+            'instance_id': self.instance_id,
+            'fleet_request_id': fleet_request_id,
+            'instance_ids': instance_ids,
+            'instances': instances,
+            'master': instances[0] if instances else None,
+            'slaves': instances[1:] if cluster_mode == 'n+1' else instances,
+            'cluster_mode': cluster_mode,
+            'target_cluster_size': target_cluster_size,
+            'cluster_size': target_cluster_size - 1 if cluster_mode == 'n+1' else target_cluster_size,
+            's3_bucket': tags.get('s3-bucket'),
+        }
+        info['complete'] = len(instances) == target_cluster_size
+        self.save(info)
+        return info
+
+    def _active_instance_ids(self, fleet_request_id):
+        return sorted(i['InstanceId'] for i in _paginate(self.client, 'describe_spot_fleet_instances', 'ActiveInstances', SpotFleetRequestId=fleet_request_id))
+
+    def save(self, info):
+        tmp_path = "{}.{}.tmp".format(self.cache_file, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(info, f, indent=4, sort_keys=True)
+        os.rename(tmp_path, self.cache_file)
+
+    def get(self, refresh=False):
+        """The cached cluster unless it is missing, incomplete, outdated or refresh is requested.
+
+        Checking that the fleet's active instances are unchanged takes one
+        call; a replaced spot instance triggers a full discovery.
+        """
+        if not refresh:
+            info = load(self.cache_file)
+            if (info is not None and info['complete'] and info['instance_id'] == self.instance_id
+                    and info.get('instance_ids') == self._active_instance_ids(info['fleet_request_id'])):
+                return info
+        return self.discover()
+
+    def wait(self, timeout=None):
+        """Poll until all instances of the fleet are running, every 2 seconds at first and at most every 15."""
+        # readiness needs executor, which discovery and the cache do not
+        from scoutcli.utils import readiness
+        state = {}
+
+        def complete():
+            state['info'] = self.discover()
+            print("target cluster size: {}, current cluster size: {}".format(state['info']['target_cluster_size'], len(state['info']['instances'])))
+            return state['info']['complete']
+
+        checker = readiness.Readiness(timeout)
+        checker.wait({'fleet': complete}, interval=2, max_interval=15)
+        checker.record(command='cluster', fleet_request_id=state['info']['fleet_request_id'])
+        return state['info']
+
+
+def load(cache_file=CACHE_FILE):
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def cached(key, cache_file=CACHE_FILE):
+    """A value of the cached cluster, with node lists joined by spaces as the commands expect."""
+    info = load(cache_file)
+    if info is None:
+        raise RuntimeError("No cluster information in {}, run 'myaws cluster' first".format(cache_file))
+    value = info[key]
+    return " ".join(value) if isinstance(value, list) else value
+
+
+class FakeEC2Client:
+    """Answers the describe calls of ClusterDiscovery from in-memory fleets, page_size items at a time."""
+    def __init__(self, fleets, tags, page_size=2):
+        # fleets: {fleet id: {instance id: private ip}}, tags: {instance id: {key: value}}
+        self.fleets = fleets
+        self.tags = tags
+        self.page_size = page_size
+        self.calls = []
+
+    def _page(self, method, result_key, items, NextToken=None):
+        self.calls.append(method)
+        start = int(NextToken or 0)
+        response = {result_key: items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response['NextToken'] = str(start + self.page_size)
+        return response
+
+    def describe_tags(self, Filters, NextToken=None):
+        instance_id = Filters[0]['Values'][0]
+        items = [{'Key': k, 'Value': v, 'ResourceId': instance_id} for (k, v) in sorted(self.tags.get(instance_id, {}).items())]
+        return self._page('describe_tags', 'Tags', items, NextToken)
+
+    def describe_spot_fleet_instances(self, SpotFleetRequestId, NextToken=None):
+        items = [{'InstanceId': i} for i in sorted(self.fleets[SpotFleetRequestId])]
+        return self._page('describe_spot_fleet_instances', 'ActiveInstances', items, NextToken)
+
+    def describe_instances(self, InstanceIds, NextToken=None):
+        ips = {i: ip for fleet in self.fleets.values() for (i, ip) in fleet.items()}
+        items = [{'Instances': [{'InstanceId': i, 'PrivateIpAddress': ips[i]}]} for i in InstanceIds]
+        return self._page('describe_instances', 'Reservations', items, NextToken)
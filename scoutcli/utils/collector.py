@@ -0,0 +1,266 @@
+import csv
+import json
+import os
+import signal
+import struct
+import time
+
+
+# magic, format version, length of the JSON schema that follows
+MAGIC = b'SCOUTMON'
+HEADER = struct.Struct('<8sII')
+
+CPU_FIELDS = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal', 'guest', 'guest_nice']
+STAT_FIELDS = ['intr', 'ctxt', 'processes', 'procs_running', 'procs_blocked']
+MEMINFO_FIELDS = ['MemTotal', 'MemFree', 'MemAvailable', 'Buffers', 'Cached', 'Active', 'Inactive', 'Dirty', 'AnonPages', 'Slab', 'SwapTotal', 'SwapFree']
+# /proc/diskstats columns after the device name
+DISK_FIELDS = ['reads', 'reads_merged', 'sectors_read', 'read_ms', 'writes', 'writes_merged', 'sectors_written', 'write_ms', 'in_flight', 'io_ms', 'weighted_io_ms']
+# /proc/net/dev columns after the interface name
+NET_FIELDS = ['rx_bytes', 'rx_packets', 'rx_errs', 'rx_drop', 'rx_fifo', 'rx_frame', 'rx_compressed', 'rx_multicast',
+              'tx_bytes', 'tx_packets', 'tx_errs', 'tx_drop', 'tx_fifo', 'tx_colls', 'tx_carrier', 'tx_compressed']
+
+
+class ProcReader(object):
+    """Read the counters of /proc/stat, meminfo, diskstats and net/dev.
+
+    The files are kept open and re-read from the start on every sample.
+    """
+    def __init__(self, proc_dir='/proc', devices=None, interfaces=None):
+        self.files = {name: open(os.path.join(proc_dir, name), 'r') for name in ['stat', 'meminfo', 'diskstats', 'net/dev']}
+        disks = self._disks()
+        nics = self._nics()
+        self.devices = sorted(disks.keys()) if devices is None else devices
+        self.interfaces = sorted(nics.keys()) if interfaces is None else interfaces
+        self.fields = ['cpu.' + f for f in CPU_FIELDS] + \
+            ['stat.' + f for f in STAT_FIELDS] + \
+            ['memory.' + f for f in MEMINFO_FIELDS] + \
+            ['disk.{}.{}'.format(d, f) for d in self.devices for f in DISK_FIELDS] + \
+            ['network.{}.{}'.format(i, f) for i in self.interfaces for f in NET_FIELDS]
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+    def _lines(self, name):
+        f = self.files[name]
+        f.seek(0)
+        return f.read().splitlines()
+
+    def _disks(self):
+        disks = {}
+        for line in self._lines('diskstats'):
+            parts = line.split()
+            # loop and ram devices only add noise
+            if parts[2].startswith(('loop', 'ram')):
+                continue
+            disks[parts[2]] = [int(v) for v in parts[3:3 + len(DISK_FIELDS)]]
+        return disks
+
+    def _nics(self):
+        nics = {}
+        for line in self._lines('net/dev')[2:]:
+            (name, counters) = line.split(':', 1)
+            nics[name.strip()] = [int(v) for v in counters.split()[:len(NET_FIELDS)]]
+        return nics
+
+    def sample(self):
+        values = []
+        stat = {}
+        for line in self._lines('stat'):
+            parts = line.split()
+            if parts[0] == 'cpu':
+                cpu = [int(v) for v in parts[1:1 + len(CPU_FIELDS)]]
+                values.extend(cpu + [0] * (len(CPU_FIELDS) - len(cpu)))
+            elif parts[0] in STAT_FIELDS:
+                stat[parts[0]] = int(parts[1])
+        values.extend([stat.get(f, 0) for f in STAT_FIELDS])
+        meminfo = {}
+        for line in self._lines('meminfo'):
+            (name, value) = line.split(':', 1)
+            meminfo[name] = int(value.split()[0])
+        values.extend([meminfo.get(f, 0) for f in MEMINFO_FIELDS])
+        disks = self._disks()
+        for device in self.devices:
+            values.extend(disks.get(device, [0] * len(DISK_FIELDS)))
+        nics = self._nics()
+        for interface in self.interfaces:
+            values.extend(nics.get(interface, [0] * len(NET_FIELDS)))
+        return values
+
+
+class Collector(object):
+    """Sample /proc into a ring buffer and flush it as fixed-size binary records.
+
+    Each record is a little-endian double timestamp followed by one unsigned
+    64-bit counter per field.  The field list is stored as JSON in the header.
+    """
+    def __init__(self, output, interval=1.0, flush_every=60, reader=None, publisher=None):
+        self.output = output
+        self.interval = interval
+        self.flush_every = flush_every
+        self.reader = ProcReader() if reader is None else reader
+        self.record = struct.Struct('<d{}Q'.format(len(self.reader.fields)))
+        self.buffer = [None] * flush_every
+        self.publisher = publisher
+        self.count = 0
+        self.running = False
+
+    def stop(self, *args):
+        self.running = False
+
+    def flush(self, f):
+        if self.count == 0:
+            return
+        f.write(b''.join(self.record.pack(*r) for r in self.buffer[:self.count]))
+        f.flush()
+        if self.publisher is not None:
+            self.publisher.publish(self.buffer[:self.count])
+        self.count = 0
+
+    def run(self, samples=None):
+        self.running = True
+        schema = json.dumps({'interval': self.interval, 'fields': self.reader.fields}).encode('utf-8')
+        with open(self.output, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, 1, len(schema)))
+            f.write(schema)
+            next_sample = time.monotonic()
+            taken = 0
+            while self.running and (samples is None or taken < samples):
+                self.buffer[self.count] = [time.time()] + self.reader.sample()
+                self.count += 1
+                taken += 1
+                if self.count == self.flush_every:
+                    self.flush(f)
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # fell behind, e.g., the node is overloaded; skip missed ticks
+                    next_sample = time.monotonic()
+            self.flush(f)
+        self.reader.close()
+        if self.publisher is not None:
+            self.publisher.close()
+
+
+def is_collector_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_records(path):
+    """Yield (fields, interval) once and then every (timestamp, counters) record."""
+    with open(path, 'rb') as f:
+        (magic, version, schema_length) = HEADER.unpack(f.read(HEADER.size))
+        schema = json.loads(f.read(schema_length).decode('utf-8'))
+        fields = schema['fields']
+        yield (fields, schema['interval'])
+        record = struct.Struct('<d{}Q'.format(len(fields)))
+        while True:
+            data = f.read(record.size)
+            if len(data) < record.size:
+                # a partial record is left behind if the collector was killed
+                break
+            values = record.unpack(data)
+            yield (values[0], values[1:])
+
+
+def rates(fields, previous, current, elapsed):
+    index = {f: i for (i, f) in enumerate(fields)}
+    delta = [c - p for (p, c) in zip(previous[1], current[1])]
+    cpu_total = sum(delta[index['cpu.' + f]] for f in CPU_FIELDS[:8]) or 1
+    row = []
+    for f in CPU_FIELDS:
+        row.append(('cpu.%' + f, 100.0 * delta[index['cpu.' + f]] / cpu_total))
+    for f in ['intr', 'ctxt', 'processes']:
+        row.append(('stat.{}/s'.format(f), delta[index['stat.' + f]] / elapsed))
+    for f in ['procs_running', 'procs_blocked']:
+        row.append(('stat.' + f, current[1][index['stat.' + f]]))
+    for f in MEMINFO_FIELDS:
+        row.append(('memory.kb' + f, current[1][index['memory.' + f]]))
+    for (i, f) in enumerate(fields):
+        parts = f.split('.')
+        if parts[0] == 'disk' and parts[-1] in ['reads', 'writes', 'sectors_read', 'sectors_written']:
+            row.append((f + '/s', delta[i] / elapsed))
+        elif parts[0] == 'disk' and parts[-1] == 'io_ms':
+            row.append(('.'.join(parts[:-1] + ['%util']), min(100.0, delta[i] / elapsed / 10.0)))
+        elif parts[0] == 'network' and parts[-1] in ['rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets']:
+            row.append((f + '/s', delta[i] / elapsed))
+    return row
+
+
+def export(input, output):
+    """Convert a collector file into a CSV of per-interval rates."""
+    records = read_records(input)
+    (fields, interval) = next(records)
+    count = 0
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        previous = None
+        for current in records:
+            if previous is not None:
+                elapsed = (current[0] - previous[0]) or interval
+                row = rates(fields, previous, current, elapsed)
+                if count == 0:
+                    writer.writerow(['timestamp'] + [column for (column, value) in row])
+                timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(current[0])) + '.{:03d}'.format(int(current[0] * 1000) % 1000)
+                writer.writerow([timestamp] + ['{:.2f}'.format(value) for (column, value) in row])
+                count += 1
+            previous = current
+    return count
+
+
+def write_pidfile(pidfile):
+    with open(pidfile, 'w') as f:
+        f.write(str(os.getpid()))
+
+
+def wait_pidfile(pidfile, timeout=30):
+    """Wait for a process started in the background to write its pidfile."""
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(pidfile):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _wait_exit(pid, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def stop(pidfile, timeout=30):
+    """Ask the collector in the pidfile to flush and exit, and wait for it.
+
+    A collector still running after timeout is killed; its unflushed samples
+    are lost.  Returns False when no collector was running and raises
+    RuntimeError, keeping the pidfile, when it cannot be stopped.
+    """
+    if not os.path.exists(pidfile):
+        return False
+    with open(pidfile, 'r') as f:
+        pid = int(f.read().strip())
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        os.remove(pidfile)
+        return False
+    if not _wait_exit(pid, timeout):
+        print("Collector {} did not exit within {} seconds, killing it".format(pid, timeout))
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        if not _wait_exit(pid, 5):
+            raise RuntimeError("Collector {} is still running, see {}".format(pid, pidfile))
+    if os.path.exists(pidfile):
+        os.remove(pidfile)
+    return True
@@ -0,0 +1,119 @@
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+
+
+class PropertyFile:
+    """A whitespace-separated `key value` file such as HiBench's *.conf.
+
+    Lines are kept as-is so comments and layout survive; only the lines of
+    updated keys are rewritten.  Changes are written atomically on save().
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r') as f:
+            self.lines = f.read().splitlines()
+        self.index = {}
+        for (i, line) in enumerate(self.lines):
+            key = self._key(line)
+            if key is not None:
+                self.index[key] = i
+        self.changed = False
+
+    @staticmethod
+    def _key(line):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            return None
+        return stripped.split(None, 1)[0]
+
+    def get(self, key, default=None):
+        if key not in self.index:
+            return default
+        parts = self.lines[self.index[key]].strip().split(None, 1)
+        return parts[1] if len(parts) > 1 else ''
+
+    def set(self, key, value):
+        value = str(value)
+        if self.get(key) == value:
+            return False
+        # keep the original padding between key and value when there is one
+        if key in self.index:
+            match = re.match(r'^(\s*\S+)(\s+)', self.lines[self.index[key]])
+            separator = match.group(2) if match else ' '
+            self.lines[self.index[key]] = "{}{}{}".format(key, separator, value)
+        else:
+            self.index[key] = len(self.lines)
+            self.lines.append("{} {}".format(key, value))
+        self.changed = True
+        return True
+
+    def update(self, properties):
+        return [key for (key, value) in properties.items() if self.set(key, value)]
+
+    def save(self):
+        if not self.changed:
+            return False
+        _write_atomic(self.path, "\n".join(self.lines) + "\n")
+        self.changed = False
+        return True
+
+
+def update_property_file(path, properties):
+    """Apply all properties to the file in one pass and return the changed keys."""
+    conf = PropertyFile(path)
+    changed = conf.update(properties)
+    conf.save()
+    return changed
+
+
+XML_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<?xml-stylesheet type="text/xsl" href="configuration.xsl"?>
+'''
+
+
+def read_xml_properties(path):
+    """Read a Hadoop *-site.xml into an ordered {name: value} dict, or None."""
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (IOError, ElementTree.ParseError):
+        return None
+    properties = {}
+    for prop in root.findall('property'):
+        properties[prop.findtext('name', '').strip()] = prop.findtext('value', '').strip()
+    return properties
+
+
+def render_xml_properties(properties):
+    content = XML_HEADER + '<configuration>\n'
+    for (name, value) in properties.items():
+        content += '    <property>\n        <name>{}</name>\n        <value>{}</value>\n    </property>\n'.format(name, value)
+    return content + '</configuration>\n'
+
+
+def _write_atomic(path, content):
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.rename(tmp_path, path)
+
+
+def update_xml_properties(path, properties):
+    """Write the properties unless the file already holds exactly the same set."""
+    properties = {k: str(v) for (k, v) in properties.items()}
+    if read_xml_properties(path) == properties:
+        return False
+    _write_atomic(path, render_xml_properties(properties))
+    return True
+
+
+def update_lines(path, lines):
+    """Write one entry per line, e.g., Hadoop's slaves file, unless unchanged."""
+    try:
+        with open(path, 'r') as f:
+            if f.read().split() == list(lines):
+                return False
+    except IOError:
+        pass
+    _write_atomic(path, "".join(line + "\n" for line in lines))
+    return True
@@ -0,0 +1,71 @@
+import base64
+import io
+import os
+import shlex
+import tarfile
+
+from scoutcli.utils import parallel
+
+
+# the exit status of coreutils timeout when the command ran out of time
+TIMEOUT_STATUS = 124
+# stay well below the 128 KiB limit of a single argument
+MAX_PAYLOAD = 96 * 1024
+
+
+def bundle(paths):
+    """A gzipped tar of the given absolute paths, stored relative to / so that it extracts in place."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for path in sorted(paths):
+            if os.path.exists(path):
+                tar.add(path, arcname=os.path.relpath(path, '/'))
+    return buffer.getvalue()
+
+
+def apply_command(payload, post_cmd=None, timeout=300):
+    """The shell command that unpacks a bundle on a node and runs post_cmd, all within timeout seconds."""
+    encoded = base64.b64encode(payload).decode('ascii')
+    if len(encoded) > MAX_PAYLOAD:
+        raise RuntimeError("Configuration bundle of {} bytes is too large to push inline".format(len(encoded)))
+    script = "echo {} | base64 -d | tar xzf - -C /".format(encoded)
+    if post_cmd:
+        script = "{} && {}".format(script, post_cmd)
+    return "timeout {} bash -c {}".format(timeout, shlex.quote(script))
+
+
+def push(nodes, cmd, retries=2, connect_timeout=10, runner=parallel.ssh_runner):
+    """Run cmd on all nodes concurrently and run it again on the failed ones.
+
+    runner builds the argv per node, see parallel.ssh_runner and local_runner.
+    Returns {node: {'status', 'attempts', 'output'}} where status is ok,
+    timeout or failed.
+    """
+    report = {node: {'status': None, 'attempts': 0, 'output': ''} for node in nodes}
+    pending = list(nodes)
+    for attempt in range(1 + retries):
+        if not pending:
+            break
+        with parallel.AsyncCommandAgent(show_result=False, runner=runner) as agent:
+            for node in pending:
+                agent.submit_remote_command(node, cmd, connect_timeout=connect_timeout, check=False, silent=True, capture=True)
+        for node in pending:
+            record = agent.cmd_records[hash(node + cmd)]
+            report[node]['attempts'] = attempt + 1
+            report[node]['output'] = (record.output or '').strip()
+            if record.succeeded:
+                report[node]['status'] = 'ok'
+            else:
+                report[node]['status'] = 'timeout' if record.returncode == TIMEOUT_STATUS else 'failed'
+        pending = [node for node in pending if report[node]['status'] != 'ok']
+    return report
+
+
+def format_table(report, roles=None):
+    roles = roles if roles is not None else {}
+    lines = ["{:<16} {:<7} {:<8} {:>8}  {}".format('node', 'role', 'status', 'attempts', 'detail')]
+    for node in sorted(report):
+        entry = report[node]
+        detail = entry['output'].splitlines()[-1] if entry['status'] != 'ok' and entry['output'] else ''
+        lines.append("{:<16} {:<7} {:<8} {:>8}  {}".format(node, roles.get(node, 'slave'), entry['status'], entry['attempts'], detail))
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+
+from executor import execute
+
+from scoutcli.utils import config
+from scoutcli.utils import helper
+
+
+class DatasetRegistry:
+    """Remember which HiBench inputs are in HDFS and how they were generated.
+
+    A dataset is identified by a fingerprint of the workload, datasize, scale
+    profile and parallelism.  Prepared inputs can also be snapshotted to a
+    local cache directory and restored from there after HDFS is reformatted.
+    """
+    def __init__(self, hibench_dir="/opt/HiBench", hadoop_dir="/opt/hadoop", registry_file="/tmp/scout-datasets.json", cache_dir=None):
+        self.hibench_dir = hibench_dir
+        self.hadoop_dir = hadoop_dir
+        self.registry_file = registry_file
+        self.cache_dir = cache_dir
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.registry_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self):
+        with open(self.registry_file, 'w') as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
+
+    def _properties(self, category, workload):
+        properties = {}
+        for path in [os.path.join(self.hibench_dir, 'conf', 'hadoop.conf'),
+                     os.path.join(self.hibench_dir, 'conf', 'hibench.conf'),
+                     os.path.join(self.hibench_dir, 'conf', 'workloads', category, '{}.conf'.format(workload))]:
+            if os.path.exists(path):
+                conf = config.PropertyFile(path)
+                properties.update({key: conf.get(key) for key in conf.index.keys()})
+        return properties
+
+    @staticmethod
+    def _expand(value, properties, depth=10):
+        # resolve ${name} references the way HiBench does
+        for i in range(depth):
+            expanded = re.sub(r'\$\{([^}]+)\}', lambda m: properties.get(m.group(1), m.group(0)), value)
+            if expanded == value:
+                break
+            value = expanded
+        return value
+
+    def describe(self, category, workload, datasize):
+        properties = self._properties(category, workload)
+        key = {
+            'workload': workload,
+            'datasize': datasize,
+            'scale_profile': properties.get('hibench.scale.profile'),
+            'map_parallelism': properties.get('hibench.default.map.parallelism'),
+            'shuffle_parallelism': properties.get('hibench.default.shuffle.parallelism'),
+        }
+        input_path = self._expand(properties.get('hibench.workload.input', ''), properties)
+        return ('{:032x}'.format(helper.md5hash(json.dumps(key, sort_keys=True))), input_path, key)
+
+    def _hdfs(self, args, **kwargs):
+        return execute("{}/bin/hdfs dfs {}".format(self.hadoop_dir, args), **kwargs)
+
+    def _in_hdfs(self, input_path):
+        return bool(input_path) and self._hdfs("-test -e {}".format(input_path), check=False, silent=True)
+
+    def _snapshot_path(self, fingerprint):
+        return os.path.join(self.cache_dir, fingerprint)
+
+    def lookup(self, category, workload, datasize):
+        """Return True when a matching dataset is in HDFS, restoring it from the cache if possible."""
+        (fingerprint, input_path, key) = self.describe(category, workload, datasize)
+        if self.entries.get(input_path, {}).get('fingerprint') == fingerprint and self._in_hdfs(input_path):
+            return True
+        snapshot = self._snapshot_path(fingerprint) if self.cache_dir else None
+        if snapshot and input_path and os.path.isdir(snapshot):
+            print("Restoring dataset {} from {}".format(input_path, snapshot))
+            self._hdfs("-rm -r -f -skipTrash {}".format(input_path), check=False)
+            self._hdfs("-mkdir -p {}".format(os.path.dirname(input_path)), check=False)
+            if self._hdfs("-put {} {}".format(os.path.join(snapshot, os.path.basename(input_path)), input_path), check=False):
+                self.register(category, workload, datasize, snapshot=False)
+                return True
+        return False
+
+    def register(self, category, workload, datasize, snapshot=True):
+        (fingerprint, input_path, key) = self.describe(category, workload, datasize)
+        if not input_path:
+            return None
+        self.entries[input_path] = dict(key, fingerprint=fingerprint)
+        self._save()
+        if snapshot and self.cache_dir:
+            target = self._snapshot_path(fingerprint)
+            execute("rm -rf {}; mkdir -p {}".format(target, target))
+            self._hdfs("-get {} {}".format(input_path, target), check=False)
+        return fingerprint
+
+    def invalidate(self, category, workload, datasize):
+        (fingerprint, input_path, key) = self.describe(category, workload, datasize)
+        if self.entries.pop(input_path, None) is not None:
+            self._save()
@@ -0,0 +1,236 @@
+import itertools
+import json
+import os
+import time
+
+
+# used until a workload has been observed on any deployment
+DEFAULT_RUNTIME = 1200
+
+
+class JobQueue:
+    """The benchmark matrix and the state of every job, stored as JSON.
+
+    A job is one workload ("benchmark framework app datasize run_id") on one
+    deployment (instance type, instance count).  Runtime estimates are kept
+    per (benchmark framework app, datasize, deployment) and are refined from
+    what fleets actually took.  Until then, the predictor trained on past
+    reports provides them.
+    """
+    def __init__(self, path, predictor=None, cluster_mode='n+1', in_memory=False):
+        self.path = path
+        # a simulation starts from the state in path but never writes it back
+        self.in_memory = in_memory
+        self.predictor = predictor
+        self.cluster_mode = cluster_mode
+        self.jobs = []
+        self.fleets = {}
+        self.runtimes = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.jobs = state['jobs']
+            self.fleets = state['fleets']
+            self.runtimes = state['runtimes']
+
+    def save(self):
+        if self.in_memory:
+            return
+        tmp_path = "{}.tmp".format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'jobs': self.jobs, 'fleets': self.fleets, 'runtimes': self.runtimes}, f, indent=4, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+    def add_matrix(self, workloads, datasizes, instance_types, instance_nums, run_ids):
+        existing = set(job['id'] for job in self.jobs)
+        added = 0
+        for (workload, datasize, instance_type, instance_num, run_id) in itertools.product(workloads, datasizes, instance_types, instance_nums, run_ids):
+            job = {
+                'workload': "{} {} {}".format(workload, datasize, run_id),
+                'app': workload,
+                'datasize': datasize,
+                'instance_type': instance_type,
+                'instance_num': int(instance_num),
+                'run_id': str(run_id),
+                'state': 'pending',
+                'fleet': None,
+            }
+            job['id'] = "{}|{}|{}".format(job['workload'], instance_type, instance_num)
+            if job['id'] not in existing:
+                self.jobs.append(job)
+                existing.add(job['id'])
+                added += 1
+        return added
+
+    @staticmethod
+    def deployment(job):
+        return "{}x{}".format(job['instance_type'], job['instance_num'])
+
+    @staticmethod
+    def _runtime_key(job):
+        return "{}|{}|{}".format(job['app'], job['datasize'], JobQueue.deployment(job))
+
+    def estimate(self, job):
+        key = self._runtime_key(job)
+        if key in self.runtimes:
+            return self.runtimes[key]
+        # fall back to the same workload on any deployment
+        observed = [v for (k, v) in self.runtimes.items() if k.startswith("{}|{}|".format(job['app'], job['datasize']))]
+        if observed:
+            return sum(observed) / len(observed)
+        if self.predictor is not None:
+            return self.predictor.predict_workload(job['workload'], job['instance_type'], job['instance_num'], self.cluster_mode)
+        return DEFAULT_RUNTIME
+
+    def observe(self, job, runtime, weight=0.5):
+        key = self._runtime_key(job)
+        previous = self.runtimes.get(key)
+        self.runtimes[key] = runtime if previous is None else (1 - weight) * previous + weight * runtime
+
+    def pending(self, deployment=None):
+        return [job for job in self.jobs if job['state'] == 'pending' and (deployment is None or self.deployment(job) == deployment)]
+
+    def pending_work(self):
+        """Estimated seconds of pending work per deployment."""
+        work = {}
+        for job in self.pending():
+            work[self.deployment(job)] = work.get(self.deployment(job), 0) + self.estimate(job)
+        return work
+
+    def next_batch(self, deployment, target_seconds):
+        """Pick pending jobs for one fleet, longest first, up to target_seconds of estimated work."""
+        batch = []
+        total = 0
+        for job in sorted(self.pending(deployment), key=self.estimate, reverse=True):
+            if batch and total + self.estimate(job) > target_seconds:
+                continue
+            batch.append(job)
+            total += self.estimate(job)
+        return batch
+
+    def assign(self, batch, fleet_id, now):
+        for job in batch:
+            job['state'] = 'assigned'
+            job['fleet'] = fleet_id
+        self.fleets[fleet_id] = {
+            'jobs': [job['id'] for job in batch],
+            'workloads': [job['workload'] for job in batch],
+            'instance_type': batch[0]['instance_type'],
+            'instance_num': batch[0]['instance_num'],
+            'launched_at': now,
+            'finished_at': None,
+        }
+
+    def active_fleets(self):
+        return [fleet_id for (fleet_id, fleet) in self.fleets.items() if fleet['finished_at'] is None]
+
+    def complete(self, fleet_id, now, measured=None, max_retries=2):
+        """Mark the reported jobs of a finished fleet done and learn their runtimes.
+
+        measured maps workloads to their reported elapsed time.  Jobs without
+        a report were lost with the fleet; they go back to pending until they
+        have been retried max_retries times and are failed after that.
+        """
+        measured = measured or {}
+        fleet = self.fleets[fleet_id]
+        fleet['finished_at'] = now
+        for job in self.jobs:
+            if job['id'] not in fleet['jobs']:
+                continue
+            if job['workload'] in measured:
+                job['state'] = 'done'
+                job['runtime'] = measured[job['workload']]
+                self.observe(job, job['runtime'])
+            elif job.get('retries', 0) < max_retries:
+                job['state'] = 'pending'
+                job['fleet'] = None
+                job['retries'] = job.get('retries', 0) + 1
+            else:
+                job['state'] = 'failed'
+
+
+class Dispatcher:
+    """Keep up to max_fleets fleets busy until the queue is drained.
+
+    Whenever a fleet finishes, the deployment with the most estimated pending
+    work gets the next fleet, so long-running deployments are not left for
+    the tail.  The backend launches fleets, reports when they are done and
+    what runtimes the workloads reported.  Workloads without a report are
+    queued again up to max_retries times.
+    """
+    def __init__(self, queue, backend, max_fleets=4, target_seconds=3600, max_retries=2, clock=time.time, sleep=time.sleep):
+        self.queue = queue
+        self.backend = backend
+        self.max_fleets = max_fleets
+        self.target_seconds = target_seconds
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+
+    def step(self):
+        for fleet_id in self.queue.active_fleets():
+            if self.backend.is_done(fleet_id):
+                print("Fleet {} finished".format(fleet_id))
+                self.queue.complete(fleet_id, self.clock(), self.backend.runtimes(fleet_id), self.max_retries)
+        launched = []
+        while len(self.queue.active_fleets()) < self.max_fleets:
+            work = self.queue.pending_work()
+            if not work:
+                break
+            deployment = max(work.keys(), key=lambda d: work[d])
+            batch = self.queue.next_batch(deployment, self.target_seconds)
+            (instance_type, instance_num) = (batch[0]['instance_type'], batch[0]['instance_num'])
+            fleet_id = self.backend.launch([job['workload'] for job in batch], instance_type, instance_num)
+            print("Fleet {} ({}): {}".format(fleet_id, deployment, [job['workload'] for job in batch]))
+            self.queue.assign(batch, fleet_id, self.clock())
+            launched.append(fleet_id)
+        self.queue.save()
+        return launched
+
+    def run(self, poll=60):
+        while True:
+            self.step()
+            if not self.queue.active_fleets() and not self.queue.pending():
+                break
+            self.sleep(poll)
+
+
+class FakeClock:
+    def __init__(self, now=0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeEC2Backend:
+    """Stand-in for EC2 that finishes a fleet after its simulated runtime.
+
+    runtime(workload, instance_type, instance_num) gives the seconds one
+    workload takes; fleets also pay a fixed launch overhead.  The workloads
+    in lost never report, as if their fleet had been interrupted.
+    """
+    def __init__(self, clock, runtime=None, overhead=600, lost=()):
+        self.clock = clock
+        self.runtime = runtime if runtime is not None else (lambda workload, instance_type, instance_num: DEFAULT_RUNTIME)
+        self.overhead = overhead
+        self.lost = set(lost)
+        self.finish_times = {}
+        self.reported = {}
+        self.count = 0
+
+    def launch(self, workloads, instance_type, instance_num):
+        self.count += 1
+        fleet_id = "sfr-fake-{:04d}".format(self.count)
+        self.reported[fleet_id] = {w: self.runtime(w, instance_type, instance_num) for w in workloads}
+        self.finish_times[fleet_id] = self.clock.time() + self.overhead + sum(self.reported[fleet_id].values())
+        return fleet_id
+
+    def is_done(self, fleet_id):
+        return self.clock.time() >= self.finish_times[fleet_id]
+
+    def runtimes(self, fleet_id):
+        return {w: runtime for (w, runtime) in self.reported[fleet_id].items() if w not in self.lost}
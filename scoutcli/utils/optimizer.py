@@ -0,0 +1,69 @@
+import numpy as np
+
+from scoutcli.utils import catalog
+
+
+def candidates(families, sizes, min_nodes, max_nodes):
+    """All (instance type, worker count) pairs of the search space that are in the catalog."""
+    instance_types = ["{}.{}".format(f, s) for f in families for s in sizes if "{}.{}".format(f, s) in catalog.get_catalog()]
+    nodes = np.arange(min_nodes, max_nodes + 1)
+    return (np.repeat(np.array(instance_types, dtype=object), len(nodes)), np.tile(nodes, len(instance_types)))
+
+
+def fit_runtime(observations, workload, framework, datasize):
+    """Fit runtime = fixed + work / vcpus over past runs of one workload.
+
+    Returns (fixed, work, {family: correction}); the per-family correction is
+    the median ratio of observed to fitted runtimes.  None without history.
+    """
+    rows = [(k[3], k[4] * catalog.vcpus(k[3]), value)
+            for (k, values) in observations.items() if k[:3] == (workload, framework, datasize) and k[3] in catalog.get_catalog()
+            for value in values]
+    if not rows:
+        return None
+    capacity = np.array([r[1] for r in rows], dtype=float)
+    runtime = np.array([r[2] for r in rows], dtype=float)
+    if len(np.unique(capacity)) > 1:
+        ((fixed, work), _, _, _) = np.linalg.lstsq(np.column_stack([np.ones_like(capacity), 1 / capacity]), runtime, rcond=None)
+    if len(np.unique(capacity)) == 1 or fixed < 0 or work <= 0:
+        (fixed, work) = (0.0, float(np.median(runtime * capacity)))
+    fitted = fixed + work / capacity
+    families = np.array([r[0].split('.')[0] for r in rows])
+    corrections = {str(family): float(np.median(runtime[families == family] / fitted[families == family])) for family in np.unique(families)}
+    return (float(fixed), float(work), corrections)
+
+
+def evaluate(instance_types, nodes, model, prices, cluster_mode='n+1'):
+    """Predicted runtime (seconds) and cost (USD) of every candidate, as arrays."""
+    (fixed, work, corrections) = model
+    types = list(np.unique(instance_types))
+    index = np.searchsorted(np.array(types, dtype=object), instance_types)
+    vcpus = np.array([catalog.vcpus(t) for t in types], dtype=float)[index]
+    price = np.array([prices.get(t, np.nan) for t in types], dtype=float)[index]
+    correction = np.array([corrections.get(t.split('.')[0], 1.0) for t in types], dtype=float)[index]
+    runtime = (fixed + work / (nodes * vcpus)) * correction
+    # the n+1 mode pays for the master as well
+    instances = nodes + 1 if cluster_mode == 'n+1' else nodes
+    cost = instances * price * runtime / 3600
+    return (runtime, cost)
+
+
+def pareto(runtime, cost):
+    """Indices of the candidates no other candidate beats on both runtime and cost, fastest first."""
+    order = np.lexsort((cost, runtime))
+    sorted_cost = cost[order]
+    best_before = np.concatenate([[np.inf], np.minimum.accumulate(sorted_cost)[:-1]])
+    return order[sorted_cost < best_before]
+
+
+def plan(instance_types, nodes, model, prices, deadline=None, budget=None, cluster_mode='n+1'):
+    """The Pareto frontier of runtime against cost within the deadline and budget."""
+    (runtime, cost) = evaluate(instance_types, nodes, model, prices, cluster_mode)
+    feasible = ~np.isnan(cost)
+    if deadline is not None:
+        feasible &= runtime <= deadline
+    if budget is not None:
+        feasible &= cost <= budget
+    candidates = np.flatnonzero(feasible)
+    frontier = candidates[pareto(runtime[candidates], cost[candidates])]
+    return [{'instance_type': instance_types[i], 'nodes': int(nodes[i]), 'runtime': float(runtime[i]), 'cost': float(cost[i])} for i in frontier]
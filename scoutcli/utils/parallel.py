@@ -1,6 +1,9 @@
+import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from concurrent import futures
+import getpass
 import logging
+import os
 
 from executor.concurrent import CommandPool
 from executor.ssh.client import RemoteCommand
@@ -32,8 +35,57 @@ class ThreadAgent:
         return {k: v.result() for (k, v) in self.future_records.items()}
 
 
-class CommandAgent:
-    def __init__(self, concurrency=8, show_result=True):
+class SSHMultiplexer:
+    """Reuse one SSH connection per host through OpenSSH ControlMaster.
+
+    The master connection outlives the agent for control_persist seconds.
+    """
+    def __init__(self, multiplex=True, control_dir="/tmp/scout-ssh", control_persist=600):
+        self.multiplex = multiplex
+        self.control_dir = control_dir
+        self.control_persist = control_persist
+        self.connection_records = {}
+
+    def _control_path(self, host, user=None, port=None):
+        # literal path instead of %C so that reuse can be checked up front
+        return os.path.join(self.control_dir, "{}@{}:{}".format(user or getpass.getuser(), host, port or 22))
+
+    def _multiplex_ssh_command(self, host, user=None, port=None):
+        control_path = self._control_path(host, user, port)
+        reused = os.path.exists(control_path)
+        (opened, reuses) = self.connection_records.get(host, (0, 0))
+        self.connection_records[host] = (opened, reuses + 1) if reused else (opened + 1, reuses)
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        return ['ssh',
+                '-o', 'ControlMaster=auto',
+                '-o', 'ControlPath={}'.format(control_path),
+                '-o', 'ControlPersist={}'.format(self.control_persist)]
+
+    def connection_stats(self):
+        """Per-host counts of new and reused SSH connections, plus totals.
+
+        A connection counts as reused when the host's control socket already
+        existed at submission time.
+        """
+        stats = {host: {'opened': opened, 'reused': reused} for (host, (opened, reused)) in self.connection_records.items()}
+        stats['total'] = {
+            'opened': sum(opened for (opened, reused) in self.connection_records.values()),
+            'reused': sum(reused for (opened, reused) in self.connection_records.values()),
+        }
+        return stats
+
+    def close_connections(self, hosts=None, user=None, port=None):
+        """Shut down the persistent master connections of the given hosts."""
+        hosts = list(self.connection_records.keys()) if hosts is None else hosts
+        for host in hosts:
+            control_path = self._control_path(host, user, port)
+            if os.path.exists(control_path):
+                ExternalCommand("ssh -o ControlPath={} -O exit {}".format(control_path, host), check=False, silent=True).start()
+
+
+class CommandAgent(SSHMultiplexer):
+    def __init__(self, concurrency=8, show_result=True, multiplex=True, control_dir="/tmp/scout-ssh", control_persist=600):
+        SSHMultiplexer.__init__(self, multiplex, control_dir, control_persist)
         self.pool = CommandPool(concurrency=concurrency)
         self.cmd_records = {}
         self.show_result = show_result
@@ -58,7 +110,8 @@ class CommandAgent:
             ec = cmd
         else:
             ec = ExternalCommand(cmd, *args, **kwargs)
-        ec.async = True
+        # executor 19.x calls it 'async', a reserved word since Python 3.7
+        setattr(ec, 'async', True)
         self.cmd_records[cmd_id] = ec
         self.pool.add(ec)
 
@@ -72,6 +125,8 @@ class CommandAgent:
             kwargs['ignore_known_hosts'] = True
         connect_timeout = kwargs['connect_timeout'] if 'connect_timeout' in kwargs else 10
         kwargs.pop('connect_timeout', None)
+        if self.multiplex and 'ssh_command' not in kwargs:
+            kwargs['ssh_command'] = self._multiplex_ssh_command(host, kwargs.get('ssh_user'), kwargs.get('port'))
         rc = RemoteCommand(host, cmd, *args, **kwargs)
         rc.connect_timeout = connect_timeout
         self.submit(hash(host + cmd), rc)
@@ -88,3 +143,161 @@ class CommandAgent:
 
     def status(self):
         return {k: v.succeeded for (k, v) in self.cmd_records.items()}
+
+
+class AsyncCommand:
+    def __init__(self, argv, host=None, timeout=None):
+        self.argv = argv
+        self.ssh_alias = host
+        self.timeout = timeout
+        self.output = ""
+        self.returncode = None
+        self.succeeded = False
+        self.timed_out = False
+
+
+def ssh_runner(host, cmd, ssh_command=None, connect_timeout=10, ssh_user=None, port=None, identity_file=None,
+               strict_host_key_checking=False, ignore_known_hosts=True):
+    """Build the argv to run cmd on host with the same options as CommandAgent."""
+    argv = ['ssh'] if ssh_command is None else list(ssh_command)
+    argv += ['-o', 'BatchMode=yes']
+    if not strict_host_key_checking:
+        argv += ['-o', 'StrictHostKeyChecking=no']
+    if ignore_known_hosts:
+        argv += ['-o', 'UserKnownHostsFile=/dev/null']
+    argv += ['-o', 'LogLevel=QUIET', '-o', 'ConnectTimeout={}'.format(connect_timeout)]
+    if ssh_user:
+        argv += ['-l', ssh_user]
+    if port:
+        argv += ['-p', str(port)]
+    if identity_file:
+        argv += ['-i', identity_file]
+    return argv + [host, cmd]
+
+
+def local_runner(host, cmd, **kwargs):
+    """Stand-in for ssh_runner that runs the command locally, e.g., in tests."""
+    return ['bash', '-c', cmd]
+
+
+class AsyncCommandAgent(SSHMultiplexer):
+    """Run many local or remote commands concurrently on an asyncio loop.
+
+    It has the submit/run/results/status API of CommandAgent, but a command
+    costs a subprocess rather than a worker slot, so hundreds of commands can
+    be in flight.  `on_line(cmd_id, line)` is called as stdout lines arrive
+    and each command can have its own timeout.  Output is always captured
+    and failures are reported by status(), so the check, silent and capture
+    options of CommandAgent are accepted and ignored; the ssh options go to
+    the runner.
+    """
+    def __init__(self, concurrency=256, show_result=True, timeout=None, on_line=None, runner=ssh_runner,
+                 multiplex=True, control_dir="/tmp/scout-ssh", control_persist=600):
+        SSHMultiplexer.__init__(self, multiplex, control_dir, control_persist)
+        self.concurrency = concurrency
+        self.show_result = show_result
+        self.timeout = timeout
+        self.on_line = on_line
+        self.runner = runner
+        self.cmd_records = {}
+        self.logger = logging.getLogger('.'.join([__name__, self.__class__.__name__]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.run()
+        if not self.show_result:
+            return
+        i = 0
+        for (identifier, cmd) in self.cmd_records.items():
+            i = i + 1
+            print("[{}] {}".format(i, cmd.ssh_alias if cmd.ssh_alias is not None else identifier))
+            print(cmd.output)
+
+    def submit(self, cmd_id, cmd, timeout=None, **kwargs):
+        ac = cmd if type(cmd) is AsyncCommand else AsyncCommand(['bash', '-c', cmd], timeout=timeout)
+        self.cmd_records[cmd_id] = ac
+
+    def submit_command(self, cmd, *args, **kwargs):
+        self.submit(hash(cmd), cmd, **kwargs)
+
+    def submit_remote_command(self, host, cmd, timeout=None, connect_timeout=10, **kwargs):
+        for option in ['check', 'silent', 'capture']:
+            kwargs.pop(option, None)
+        ssh_command = kwargs.pop('ssh_command', None)
+        if self.multiplex and ssh_command is None and self.runner is ssh_runner:
+            ssh_command = self._multiplex_ssh_command(host, kwargs.get('ssh_user'), kwargs.get('port'))
+        argv = self.runner(host, cmd, ssh_command=ssh_command, connect_timeout=connect_timeout, **kwargs)
+        self.submit(hash(host + cmd), AsyncCommand(argv, host=host, timeout=timeout))
+
+    def submit_remote_commands(self, nodes, cmd, *args, **kwargs):
+        for node in nodes:
+            self.submit_remote_command(node, cmd, *args, **kwargs)
+
+    async def _run_command(self, semaphore, cmd_id, cmd):
+        async with semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd.argv, stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            except OSError as e:
+                # fail this command only, not the whole run
+                self.logger.warning("Command %s failed to start: %s", cmd_id, e)
+                (cmd.output, cmd.returncode) = (str(e), -1)
+                return
+            lines = []
+
+            def add_line(data):
+                line = data.decode('utf-8', errors='replace').rstrip('\n')
+                lines.append(line)
+                if self.on_line is not None:
+                    self.on_line(cmd_id, line)
+
+            async def read_lines():
+                partial = b''
+                while True:
+                    try:
+                        data = await process.stdout.readuntil(b'\n')
+                    except asyncio.IncompleteReadError as e:
+                        if partial + e.partial:
+                            add_line(partial + e.partial)
+                        break
+                    except asyncio.LimitOverrunError as e:
+                        # a line longer than the stream buffer is collected in pieces
+                        partial += await process.stdout.readexactly(e.consumed)
+                        continue
+                    add_line(partial + data)
+                    partial = b''
+                return await process.wait()
+
+            timeout = cmd.timeout if cmd.timeout is not None else self.timeout
+            try:
+                cmd.returncode = await asyncio.wait_for(read_lines(), timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning("Command %s timed out after %s seconds", cmd_id, timeout)
+                cmd.timed_out = True
+                process.kill()
+                cmd.returncode = await process.wait()
+            cmd.output = "\n".join(lines)
+            cmd.succeeded = cmd.returncode == 0 and not cmd.timed_out
+
+    async def _run_all(self, pending):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[self._run_command(semaphore, cmd_id, cmd) for (cmd_id, cmd) in pending])
+
+    def run(self):
+        pending = [(cmd_id, cmd) for (cmd_id, cmd) in self.cmd_records.items() if cmd.returncode is None]
+        if not pending:
+            return
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run_all(pending))
+        finally:
+            loop.close()
+
+    def results(self):
+        return {k: v.output for (k, v) in self.cmd_records.items()}
+
+    def status(self):
+        return {k: v.succeeded for (k, v) in self.cmd_records.items()}
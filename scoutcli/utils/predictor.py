@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import statistics
+
+
+def workers(instance_num, cluster_mode='n+1'):
+    """The cluster size used in output names, see scripts/config.sh."""
+    return max(1, instance_num - 1) if cluster_mode == 'n+1' else instance_num
+
+
+def parse_output_name(name):
+    """Split "<cluster size>_<instance type>_<app>_<framework>_<datasize>_<run_id>", or return None."""
+    parts = name.split('_')
+    if len(parts) < 6 or not parts[0].isdigit():
+        return None
+    return {
+        'cluster_size': int(parts[0]),
+        'instance_type': parts[1],
+        'workload': '_'.join(parts[2:-3]),
+        'framework': parts[-3],
+        'datasize': parts[-2],
+        'run_id': parts[-1],
+    }
+
+
+def _program_workload(program):
+    # HadoopTerasort -> terasort, ScalaSparkPagerank -> pagerank
+    return re.sub(r'^(Hadoop|ScalaSpark|JavaSpark|PySpark|Spark)', '', program).lower()
+
+
+def parse_hibench_report(path):
+    """Yield (workload, framework, input size, elapsed seconds) for every line of a hibench.report."""
+    with open(path, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 5 or fields[0] == 'Type':
+                continue
+            try:
+                elapsed = float(fields[4])
+            except ValueError:
+                continue
+            framework = 'hadoop' if fields[0].startswith('Hadoop') else 'spark'
+            yield (_program_workload(fields[0]), framework, fields[3], elapsed)
+
+
+class RuntimePredictor:
+    """Expected elapsed time per (workload, framework, datasize, instance type, cluster size).
+
+    Observations come from the report.json files of past runs, located by
+    their output directory name, and from hibench.report lines.  Runs that
+    failed or were co-located with other workloads are ignored.
+    """
+    def __init__(self, default=1200):
+        self.default = default
+        self.observations = {}
+
+    def add(self, workload, framework, datasize, instance_type, cluster_size, elapsed):
+        key = (workload, framework, datasize, instance_type, int(cluster_size))
+        self.observations.setdefault(key, []).append(float(elapsed))
+
+    def load_report(self, path):
+        meta = parse_output_name(os.path.basename(os.path.dirname(os.path.abspath(path))))
+        if meta is None:
+            return False
+        with open(path, 'r') as f:
+            report = json.load(f)
+        if not report.get('completed') or report.get('colocation'):
+            return False
+        self.add(meta['workload'], meta['framework'], meta['datasize'], meta['instance_type'], meta['cluster_size'], report['elapsed_time'])
+        return True
+
+    def load_hibench_report(self, path, datasize, instance_type, cluster_size, workload=None, framework=None):
+        """Add the lines of a hibench.report run with datasize on one deployment.
+
+        hibench.report has no datasize or deployment, so the caller provides
+        them.  HiBench appends to the file across runs; with workload and
+        framework given, only their lines with the input size of the last one
+        are taken, which skips other workloads and other datasizes.
+        """
+        lines = list(parse_hibench_report(path))
+        if workload is not None:
+            lines = [line for line in lines if line[:2] == (workload, framework)]
+            lines = [line for line in lines if line[2] == lines[-1][2]] if lines else []
+        for (line_workload, line_framework, input_size, elapsed) in lines:
+            self.add(line_workload, line_framework, datasize, instance_type, cluster_size, elapsed)
+        return len(lines)
+
+    def load_directory(self, path):
+        """Load every report.json below path, e.g., a local copy of the S3 bucket.
+
+        A hibench.report is read instead when its directory has no
+        report.json; the workload, datasize and deployment come from the
+        directory name.
+        """
+        count = 0
+        for (root, dirs, files) in os.walk(path):
+            if 'report.json' in files:
+                if self.load_report(os.path.join(root, 'report.json')):
+                    count += 1
+            elif 'hibench.report' in files:
+                meta = parse_output_name(os.path.basename(os.path.abspath(root)))
+                if meta is not None:
+                    count += self.load_hibench_report(os.path.join(root, 'hibench.report'), meta['datasize'], meta['instance_type'], meta['cluster_size'],
+                                                      meta['workload'], meta['framework'])
+        return count
+
+    def predict(self, workload, framework, datasize, instance_type, cluster_size):
+        key = (workload, framework, datasize, instance_type, int(cluster_size))
+        if key in self.observations:
+            return statistics.median(self.observations[key])
+        # the same workload on other deployments, assuming it scales with the cluster size
+        scaled = [value * k[4] / int(cluster_size)
+                  for (k, values) in self.observations.items() if k[:3] == key[:3]
+                  for value in values]
+        if scaled:
+            return statistics.median(scaled)
+        return self.default
+
+    def predict_workload(self, workload, instance_type, instance_num, cluster_mode='n+1'):
+        """Predict a "benchmark framework app datasize run_id" workload on a fleet."""
+        (benchmark, framework, app, datasize, run_id) = workload.split()
+        return self.predict(app, framework, datasize, instance_type, workers(instance_num, cluster_mode))
+
+
+def pack(runtimes, target_seconds):
+    """First-fit decreasing: group {item: seconds} into bins of about target_seconds.
+
+    Items longer than the target get a bin of their own.
+    """
+    bins = []
+    for item in sorted(runtimes.keys(), key=lambda i: runtimes[i], reverse=True):
+        for b in bins:
+            if b['seconds'] + runtimes[item] <= target_seconds:
+                b['items'].append(item)
+                b['seconds'] += runtimes[item]
+                break
+        else:
+            bins.append({'items': [item], 'seconds': runtimes[item]})
+    return bins
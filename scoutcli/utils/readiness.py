@@ -0,0 +1,103 @@
+import concurrent.futures
+import json
+import re
+import socket
+import threading
+import time
+
+from executor import execute
+
+
+RECORD_FILE = '/tmp/scout-readiness.jsonl'
+
+
+class ReadinessTimeout(Exception):
+    pass
+
+
+def wait_until(condition, timeout=600, interval=0.5, max_interval=5, stop=None):
+    """Call condition until it is true; returns the seconds waited.
+
+    The polling interval doubles up to max_interval, so quick phases return
+    within a fraction of a second and slow ones do not hammer the services.
+    Setting the stop event cancels the wait with ReadinessTimeout.
+    """
+    stop = threading.Event() if stop is None else stop
+    start = time.time()
+    while not condition():
+        if timeout is not None and time.time() - start > timeout:
+            raise ReadinessTimeout("not ready after {} seconds".format(timeout))
+        if stop.wait(interval):
+            raise ReadinessTimeout("cancelled after {:.1f} seconds".format(time.time() - start))
+        interval = min(interval * 2, max_interval)
+    return time.time() - start
+
+
+def ssh_reachable(host, port=22, timeout=3):
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return True
+    except (socket.error, socket.timeout):
+        return False
+
+
+def all_reachable(hosts, port=22):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(hosts))) as pool:
+        return all(pool.map(lambda host: ssh_reachable(host, port), hosts))
+
+
+def _output(cmd):
+    return execute(cmd, capture=True, check=False, silent=True) or ''
+
+
+def namenode_out_of_safemode(hadoop_dir):
+    return 'OFF' in _output("{}/bin/hdfs dfsadmin -safemode get".format(hadoop_dir))
+
+
+def live_datanodes(hadoop_dir):
+    match = re.search(r'Live datanodes \((\d+)\)', _output("{}/bin/hdfs dfsadmin -report -live".format(hadoop_dir)))
+    return int(match.group(1)) if match else 0
+
+
+def running_nodemanagers(hadoop_dir):
+    match = re.search(r'Total Nodes:\s*(\d+)', _output("{}/bin/yarn node -list".format(hadoop_dir)))
+    return int(match.group(1)) if match else 0
+
+
+class Readiness:
+    """Wait for named phases and record how long each one took.
+
+    Phases given to wait() together are probed concurrently; wait() returns
+    once all of them hold.  The first phase that fails cancels the others.
+    """
+    def __init__(self, timeout=600, record_file=RECORD_FILE):
+        self.timeout = timeout
+        self.record_file = record_file
+        self.phases = {}
+
+    def wait(self, phases, interval=0.5, max_interval=5):
+        stop = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(phases)) as pool:
+            futures = {pool.submit(wait_until, condition, self.timeout, interval, max_interval, stop): name for (name, condition) in phases.items()}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    self.phases[futures[future]] = future.result()
+                except Exception:
+                    stop.set()
+                    raise
+                print("Ready: {} after {:.1f} seconds".format(futures[future], self.phases[futures[future]]))
+        return self.phases
+
+    def nodes(self, hosts):
+        return self.wait({'sshd': lambda: all_reachable(hosts)})
+
+    def hadoop(self, hadoop_dir, datanodes, nodemanagers):
+        return self.wait({
+            'namenode_safemode': lambda: namenode_out_of_safemode(hadoop_dir),
+            'datanodes': lambda: live_datanodes(hadoop_dir) >= datanodes,
+            'nodemanagers': lambda: running_nodemanagers(hadoop_dir) >= nodemanagers,
+        })
+
+    def record(self, **context):
+        with open(self.record_file, 'a') as f:
+            f.write(json.dumps(dict(context, timestamp=time.time(), phases=self.phases), sort_keys=True) + '\n')
@@ -0,0 +1,220 @@
+import concurrent.futures
+import fnmatch
+import hashlib
+import itertools
+import json
+import os
+import socket
+import threading
+
+
+MANIFEST_NAME = '.scout-manifest.json'
+
+
+def parse_s3_url(url):
+    """s3://bucket/prefix -> (bucket, prefix)"""
+    path = url[len('s3://'):] if url.startswith('s3://') else url
+    (bucket, _, prefix) = path.partition('/')
+    return (bucket, prefix.strip('/'))
+
+
+def file_md5(path, chunk_size=1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def s3_client(concurrency):
+    import boto3
+    from botocore.config import Config
+    # one client shared by all upload threads, with a connection per thread
+    return boto3.client('s3', config=Config(max_pool_connections=concurrency))
+
+
+class Uploader:
+    """Upload a directory to S3 with bounded concurrency and a manifest.
+
+    The manifest maps every uploaded file to its size and MD5.  It is saved
+    after each file, in the source directory and next to the objects, so a
+    rerun after an interruption only uploads what is missing or changed.
+    The local copy keeps one manifest per destination since the same
+    directory may be synced to several prefixes.
+    Files above multipart_threshold are uploaded in chunk_size parts.
+    """
+    def __init__(self, client=None, concurrency=8, multipart_threshold=64 * 1024 * 1024, chunk_size=16 * 1024 * 1024):
+        self.client = client if client is not None else s3_client(concurrency)
+        self.concurrency = concurrency
+        self.multipart_threshold = multipart_threshold
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+
+    def _remote_manifest_key(self, prefix):
+        # one manifest per node since several nodes upload into the same prefix
+        return "/".join(filter(None, [prefix, '.manifests', "{}.json".format(socket.gethostname())]))
+
+    @staticmethod
+    def _destination(bucket, prefix):
+        return "s3://{}/{}".format(bucket, prefix)
+
+    @staticmethod
+    def _load_local_manifests(source):
+        """{destination: manifest} from the source directory."""
+        local_path = os.path.join(source, MANIFEST_NAME)
+        try:
+            with open(local_path, 'r') as f:
+                return json.load(f).get('destinations', {})
+        except (IOError, ValueError):
+            return {}
+
+    def load_manifest(self, source, bucket, prefix):
+        manifests = self._load_local_manifests(source)
+        if self._destination(bucket, prefix) in manifests:
+            return manifests[self._destination(bucket, prefix)]
+        return self._load_remote_manifest(bucket, prefix)
+
+    def _load_remote_manifest(self, bucket, prefix):
+        try:
+            response = self.client.get_object(Bucket=bucket, Key=self._remote_manifest_key(prefix))
+            return json.loads(response['Body'].read().decode())
+        except Exception:
+            return {}
+
+    def _save_manifest(self, source, manifests):
+        local_path = os.path.join(source, MANIFEST_NAME)
+        tmp_path = "{}.tmp".format(local_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'destinations': manifests}, f, indent=4, sort_keys=True)
+        os.rename(tmp_path, local_path)
+
+    @staticmethod
+    def list_files(source, include=None):
+        files = []
+        for (root, dirs, names) in os.walk(source):
+            for name in names:
+                if name.startswith(MANIFEST_NAME):
+                    continue
+                if include and not any(fnmatch.fnmatch(name, pattern) for pattern in include):
+                    continue
+                files.append(os.path.relpath(os.path.join(root, name), source))
+        return sorted(files)
+
+    def sync(self, source, url, include=None):
+        """Upload the files below source (matching the include patterns) to s3://bucket/prefix.
+
+        Returns (uploaded, skipped, failed) lists of relative paths.
+        """
+        (bucket, prefix) = parse_s3_url(url)
+        manifests = self._load_local_manifests(source)
+        destination = self._destination(bucket, prefix)
+        if destination not in manifests:
+            manifests[destination] = self._load_remote_manifest(bucket, prefix)
+        manifest = manifests[destination]
+        pending = []
+        skipped = []
+        for rel_path in self.list_files(source, include):
+            path = os.path.join(source, rel_path)
+            entry = {'size': os.path.getsize(path), 'md5': file_md5(path)}
+            if manifest.get(rel_path) == entry:
+                skipped.append(rel_path)
+            else:
+                pending.append((rel_path, entry))
+
+        uploaded = []
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self.upload_file, os.path.join(source, rel_path), bucket, "/".join(filter(None, [prefix, rel_path])), entry): (rel_path, entry)
+                       for (rel_path, entry) in pending}
+            for future in concurrent.futures.as_completed(futures):
+                (rel_path, entry) = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print("Failed to upload {}: {}".format(rel_path, e))
+                    failed.append(rel_path)
+                    continue
+                with self.lock:
+                    manifest[rel_path] = entry
+                    self._save_manifest(source, manifests)
+                uploaded.append(rel_path)
+        if uploaded:
+            self.client.put_object(Bucket=bucket, Key=self._remote_manifest_key(prefix), Body=json.dumps(manifest, indent=4, sort_keys=True).encode())
+        return (sorted(uploaded), skipped, sorted(failed))
+
+    def upload_file(self, path, bucket, key, entry):
+        metadata = {'md5': entry['md5']}
+        if entry['size'] < self.multipart_threshold:
+            with open(path, 'rb') as f:
+                self.client.put_object(Bucket=bucket, Key=key, Body=f.read(), Metadata=metadata)
+            return
+        upload_id = self.client.create_multipart_upload(Bucket=bucket, Key=key, Metadata=metadata)['UploadId']
+        try:
+            parts = []
+            with open(path, 'rb') as f:
+                for (number, chunk) in enumerate(iter(lambda: f.read(self.chunk_size), b''), 1):
+                    response = self.client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=chunk)
+                    parts.append({'PartNumber': number, 'ETag': response['ETag']})
+            self.client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            raise
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class LocalS3Client:
+    """The subset of the boto3 S3 client used by Uploader, backed by a local directory."""
+    def __init__(self, root):
+        self.root = root
+        self.uploads = {}
+        # ids are never reused, unlike len(self.uploads) once an upload completes
+        self.upload_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+
+    def _write(self, bucket, key, data):
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return {'ETag': '"{}"'.format(hashlib.md5(data).hexdigest())}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None):
+        self.calls.append(('put_object', Key))
+        return self._write(Bucket, Key, Body)
+
+    def get_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise KeyError(Key)
+        with open(path, 'rb') as f:
+            return {'Body': _Body(f.read())}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None):
+        with self.lock:
+            upload_id = str(next(self.upload_ids))
+            self.uploads[upload_id] = {}
+        self.calls.append(('create_multipart_upload', Key))
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': '"{}"'.format(hashlib.md5(Body).hexdigest())}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.calls.append(('complete_multipart_upload', Key))
+        return self._write(Bucket, Key, b''.join(parts[p['PartNumber']] for p in MultipartUpload['Parts']))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
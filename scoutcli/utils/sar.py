@@ -0,0 +1,241 @@
+import csv
+import os
+import subprocess
+
+
+# sadf field name -> exported column group, in the order sar prints them
+GENERAL_COLUMN_GROUPS = [
+    ('cpu', ['%usr', '%nice', '%sys', '%iowait', '%steal', '%irq', '%soft', '%guest', '%gnice', '%idle']),
+    ('task', ['proc/s', 'cswch/s']),
+    ('intr', ['intr/s']),
+    ('swap', ['pswpin/s', 'pswpout/s']),
+    ('paging', ['pgpgin/s', 'pgpgout/s', 'fault/s', 'majflt/s', 'pgfree/s', 'pgscank/s', 'pgscand/s', 'pgsteal/s', '%vmeff']),
+    ('io', ['tps', 'rtps', 'wtps', 'bread/s', 'bwrtn/s']),
+    ('memory', ['kbmemfree', 'kbavail', 'kbmemused', '%memused', 'kbbuffers', 'kbcached', 'kbcommit', '%commit', 'kbactive', 'kbinact', 'kbdirty', 'kbanonpg', 'kbslab', 'kbkstack', 'kbpgtbl', 'kbvmused']),
+    ('swap', ['kbswpfree', 'kbswpused', '%swpused', 'kbswpcad', '%swpcad']),
+    ('load', ['runq-sz', 'plist-sz', 'ldavg-1', 'ldavg-5', 'ldavg-15', 'blocked']),
+]
+GENERAL_COLUMNS = {field: '{}.{}'.format(group, field) for (group, fields) in GENERAL_COLUMN_GROUPS for field in fields}
+
+# (name, sadf options, sar options, item column dropped from the output, column prefix)
+ACTIVITIES = [
+    ('general', ['-h'], ['-p', '-bBqSwW', '-u', 'ALL', '-I', 'SUM', '-r', 'ALL'], 'CPU', None),
+    ('disk', [], ['-p', '-d'], 'DEV', 'disk'),
+    ('network', [], ['-p', '-n', 'DEV'], 'IFACE', 'network'),
+]
+
+# columns sadf adds to every record that are not metrics
+SKIPPED_FIELDS = ['# hostname', 'hostname', 'interval', 'timestamp', 'INTR']
+
+
+def parse_sadf(lines, item_field=None):
+    """Parse `sadf -d` output and yield (timestamp, item, {field: value}) per record.
+
+    Header lines reset the schema, so the output of several activities can be
+    concatenated.  The "[...]" markers of `sadf -h` are stripped from headers.
+    """
+    header = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line:
+            continue
+        fields = line.split(';')
+        if line.startswith('#'):
+            header = [field.replace('[...]', '') for field in fields]
+            continue
+        if header is None or len(fields) != len(header):
+            # e.g., LINUX-RESTART records
+            continue
+        record = dict(zip(header, fields))
+        item = record.get(item_field) if item_field else None
+        values = {k: v for (k, v) in record.items() if k not in SKIPPED_FIELDS and k != item_field}
+        yield (record['timestamp'], item, values)
+
+
+def group_by_timestamp(records):
+    """Collapse consecutive records with the same timestamp into one row."""
+    current_timestamp = None
+    current_items = []
+    for (timestamp, item, values) in records:
+        if timestamp != current_timestamp and current_items:
+            yield (current_timestamp, current_items)
+            current_items = []
+        current_timestamp = timestamp
+        current_items.append((item, values))
+    if current_items:
+        yield (current_timestamp, current_items)
+
+
+def _rename(activity_prefix, item, field):
+    if activity_prefix is None:
+        return GENERAL_COLUMNS.get(field, field)
+    return '{}.{}.{}'.format(activity_prefix, item, field)
+
+
+def flatten(activity_prefix, items):
+    """Turn the items recorded at one timestamp into [(column, value), ...].
+
+    Devices and interfaces get their own column group, e.g., disk.xvda.tps.
+    """
+    return [(_rename(activity_prefix, item, k), v) for (item, values) in items for (k, v) in values.items()]
+
+
+def join_streams(streams):
+    """Inner join several timestamp-ordered streams in a single pass.
+
+    Each stream yields (timestamp, [(column, value), ...]).  Only the current
+    row of every stream is kept in memory.
+    """
+    iterators = [iter(stream) for stream in streams]
+    heads = []
+    for it in iterators:
+        row = next(it, None)
+        if row is None:
+            return
+        heads.append(row)
+    while True:
+        timestamps = [row[0] for row in heads]
+        newest = max(timestamps)
+        if all(timestamp == newest for timestamp in timestamps):
+            joined = []
+            for row in heads:
+                joined.extend(row[1])
+            yield (newest, joined)
+            advance = range(len(iterators))
+        else:
+            advance = [i for (i, timestamp) in enumerate(timestamps) if timestamp < newest]
+        for i in advance:
+            row = next(iterators[i], None)
+            if row is None:
+                return
+            heads[i] = row
+
+
+class CsvWriter(object):
+    def __init__(self, output, columns):
+        self.f = open(output, 'w', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(['timestamp'] + columns)
+
+    def write(self, timestamp, values):
+        self.writer.writerow([timestamp] + values)
+
+    def close(self):
+        self.f.close()
+
+
+class ArrowWriter(object):
+    """Write rows as Parquet or Arrow IPC in record batches of a fixed size."""
+    def __init__(self, output, columns, format='parquet', batch_size=4096):
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("pyarrow is required for {} output: pip install scout-cli[columnar]".format(format))
+        self.pa = pyarrow
+        self.columns = columns
+        self.batch_size = batch_size
+        self.schema = pyarrow.schema([('timestamp', pyarrow.string())] + [(c, pyarrow.float64()) for c in columns])
+        if format == 'parquet':
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(output, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(output, self.schema)
+        self.batch = []
+
+    def write(self, timestamp, values):
+        self.batch.append([timestamp] + [_to_float(v) for v in values])
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        arrays = [self.pa.array(list(column), type=field.type) for (column, field) in zip(zip(*self.batch), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def columnar_path(output, format):
+    return os.path.splitext(output)[0] + COLUMNAR_FORMATS[format]
+
+
+def write(rows, output, columnar=None):
+    """Write joined rows to a CSV file and optionally a columnar copy next to it.
+
+    The schema is derived from the first row.  Columns missing in later rows
+    are left empty, and devices showing up after the first row are dropped.
+    """
+    count = 0
+    writers = []
+    columns = None
+    try:
+        for (timestamp, values) in rows:
+            if columns is None:
+                columns = [column for (column, value) in values]
+                writers.append(CsvWriter(output, columns))
+                if columnar is not None:
+                    writers.append(ArrowWriter(columnar_path(output, columnar), columns, format=columnar))
+            values = dict(values)
+            row = [values.get(column, '') for column in columns]
+            for writer in writers:
+                writer.write(timestamp, row)
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+    return count
+
+
+def _activity_rows(lines, item_field, activity_prefix):
+    for (timestamp, items) in group_by_timestamp(parse_sadf(lines, item_field)):
+        yield (timestamp, flatten(activity_prefix, items))
+
+
+def sadf_command(input, interval, sadf_options, sar_options):
+    # -t: local time, matching the timestamps used in the reports
+    return ['sadf', '-d'] + sadf_options + ['-t', str(interval), input, '--'] + sar_options
+
+
+def export(input, output, interval=5, columnar=None):
+    """Export a binary sar file into one CSV joined by timestamp.
+
+    `columnar` is None, 'parquet' or 'arrow' for an extra copy next to the CSV.
+
+    One sadf process per activity is streamed concurrently and joined on the fly.
+    A failing sadf raises CalledProcessError and an input without any record
+    raises RuntimeError, as no CSV is written then.
+    """
+    processes = []
+    streams = []
+    try:
+        for (name, sadf_options, sar_options, item_field, activity_prefix) in ACTIVITIES:
+            cmd = sadf_command(input, interval, sadf_options, sar_options)
+            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, universal_newlines=True)
+            processes.append(p)
+            streams.append(_activity_rows(p.stdout, item_field, activity_prefix))
+        count = write(join_streams(streams), output, columnar)
+    finally:
+        for p in processes:
+            p.stdout.close()
+            p.wait()
+    for p in processes:
+        if p.returncode != 0:
+            raise subprocess.CalledProcessError(p.returncode, p.args)
+    if count == 0:
+        raise RuntimeError("No sar records in {}".format(input))
+    return count
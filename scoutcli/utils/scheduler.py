@@ -0,0 +1,94 @@
+# spark-perf workloads that finished in < 500 seconds on the benchmarked deployments
+# and left most of YARN idle, see the runtime buckets in scripts/mybenchmark.py.
+# The list is static: it does not look at the datasize or the cluster at hand.
+SMALL_WORKLOADS = [
+    'block-matrix-mult', 'decision-tree', 'random-forest', 'spearman',
+    'summary-statistics', 'fp-growth', 'chi-sq-gof', 'chi-sq-mat',
+]
+
+
+def parse_workload(workload):
+    """Split "benchmark framework app datasize run_id" into a dict."""
+    (benchmark, framework, app, datasize, run_id) = workload.split()
+    return {'benchmark': benchmark, 'framework': framework, 'app': app, 'datasize': datasize, 'run_id': run_id, 'id': workload}
+
+
+def is_colocatable(workload, small_workloads=SMALL_WORKLOADS):
+    # HiBench workloads share conf files and hibench.report, so they always run alone
+    return workload['benchmark'] == 'sparkperf' and workload['app'] in small_workloads
+
+
+def _parse_mb(value):
+    return int(str(value).rstrip('m'))
+
+
+def footprint(spark_env, executor_num=None):
+    """YARN vcores and memory (MB) of one Spark application.
+
+    The sizes come from mysparkperf get_spark_env; executor_num overrides the
+    number of executors, which by default fills the whole cluster.  The
+    container sizes are derived from the instance type alone, so every
+    application with the same executor_num has the same footprint whatever
+    its app or datasize.
+    """
+    executor_num = spark_env['spark.executor.instances'] if executor_num is None else executor_num
+    executor_memory = _parse_mb(spark_env['spark.executor.memory']) + _parse_mb(spark_env['spark.yarn.executor.memoryOverhead'])
+    am_memory = _parse_mb(spark_env['spark.yarn.am.memory']) + _parse_mb(spark_env['spark.yarn.am.memoryOverhead'])
+    return {
+        'vcores': executor_num * spark_env['spark.executor.cores'] + spark_env['spark.yarn.am.cores'],
+        'memory': executor_num * executor_memory + am_memory,
+    }
+
+
+def capacity(nodes, cores, memory):
+    """YARN capacity as configured by myhadoop configure (per-node cores and MB)."""
+    return {'vcores': nodes * cores, 'memory': nodes * memory}
+
+
+def _fits(footprints, cluster):
+    return all(sum(f[resource] for f in footprints) <= cluster[resource] for resource in ['vcores', 'memory'])
+
+
+def _executors_per_member(spark_env, cluster, size):
+    # every member needs its own AM container
+    free_vcores = cluster['vcores'] - size * spark_env['spark.yarn.am.cores']
+    return int(free_vcores / size / spark_env['spark.executor.cores'])
+
+
+def plan(workloads, spark_env, cluster, max_concurrency=2, min_executors=2, small_workloads=SMALL_WORKLOADS):
+    """Group workloads into rounds that run concurrently on one cluster.
+
+    Small spark-perf workloads (apps in small_workloads) are packed up to
+    max_concurrency per round and split the executors evenly, as long as
+    each keeps min_executors and the round fits the YARN capacity.
+    Everything else runs alone with the full cluster.  Since the footprint
+    only depends on the executor count, the capacity check assumes the
+    members are equally heavy; an app that is only small at some datasizes
+    should be left out of small_workloads.
+    Returns [{'workloads': [...], 'executors': {id: n or None}}].
+    """
+    workloads = [parse_workload(w) if isinstance(w, str) else w for w in workloads]
+    rounds = []
+    pending = []
+
+    def flush():
+        while pending:
+            for size in range(min(max_concurrency, len(pending)), 0, -1):
+                executor_num = _executors_per_member(spark_env, cluster, size)
+                group = pending[:size]
+                if size == 1 or (executor_num >= min_executors and _fits([footprint(spark_env, executor_num)] * size, cluster)):
+                    rounds.append({
+                        'workloads': group,
+                        'executors': {w['id']: (executor_num if size > 1 else None) for w in group},
+                    })
+                    del pending[:size]
+                    break
+
+    for workload in workloads:
+        if is_colocatable(workload, small_workloads):
+            pending.append(workload)
+        else:
+            rounds.append({'workloads': [workload], 'executors': {workload['id']: None}})
+    flush()
+    return rounds
+
@@ -0,0 +1,182 @@
+import os
+
+from executor import execute
+
+from scoutcli.utils import parallel
+from scoutcli.utils import s3sync
+from scoutcli.utils import scheduler
+from scoutcli.utils import tracing
+
+
+class BenchmarkSession:
+    """Run a list of workloads on one cluster while keeping HDFS/YARN warm.
+
+    The cluster is configured before every workload, but the namenode is only
+    formatted and the daemons only restarted when the Hadoop configuration
+    fingerprint changes.  Otherwise only per-workload state is cleaned.
+    """
+    def __init__(self, master, slaves, instances, cluster_mode, cluster_size, instance_type,
+                 s3_bucket=None, timeout=7200, dataset_cache_dir=None, interval=5, hadoop_dir="/opt/hadoop", hibench_dir="/opt/HiBench"):
+        self.master = master
+        self.slaves = slaves
+        self.instances = instances
+        self.cluster_mode = cluster_mode
+        self.cluster_size = cluster_size
+        self.instance_type = instance_type
+        self.s3_bucket = s3_bucket
+        self.timeout = timeout
+        self.dataset_cache_dir = dataset_cache_dir
+        self.interval = interval
+        self.hadoop_dir = hadoop_dir
+        self.hibench_dir = hibench_dir
+        self.fingerprint = None
+        # the runs write their own traces next to their report.json
+        self.trace_dir = "/tmp/scout-session"
+        self.stats = {'workloads': 0, 'reinitialized': 0, 'reused': 0}
+
+    def _on_all_nodes(self, cmd):
+        """Run cmd on every node and return {node: succeeded}."""
+        with parallel.CommandAgent(show_result=False, concurrency=len(self.instances)) as agent:
+            agent.submit_remote_commands(self.instances, cmd, connect_timeout=60, check=False, silent=True)
+        return {record.ssh_alias: record.succeeded for record in agent.cmd_records.values()}
+
+    def configure(self):
+        print("Configuring {} nodes".format(len(self.instances)))
+        execute("myhibench cluster_configure --no-init --master {} --slaves '{}' --instances '{}'".format(self.master, " ".join(self.slaves), " ".join(self.instances)))
+        return execute("myhadoop fingerprint", capture=True, silent=True).strip()
+
+    def prepare_cluster(self):
+        with tracing.get_tracer().span('prepare_cluster'):
+            return self._prepare_cluster()
+
+    def _prepare_cluster(self):
+        fingerprint = self.configure()
+        if fingerprint == self.fingerprint:
+            print("Reusing the running cluster with configuration", fingerprint)
+            self.clean()
+            self.stats['reused'] += 1
+            return False
+        print("Reinitializing the cluster with configuration", fingerprint)
+        failed = sorted(node for (node, succeeded) in self._on_all_nodes("myhibench init").items() if not succeeded)
+        if failed:
+            # HDFS would come up without these datanodes
+            raise RuntimeError("myhibench init failed on {}".format(" ".join(failed)))
+        execute("myhibench start")
+        execute("myhadoop wait_ready --no-ssh --slaves '{}'".format(" ".join(self.slaves)))
+        self.fingerprint = fingerprint
+        self.stats['reinitialized'] += 1
+        return True
+
+    def clean(self):
+        # report directories and workload outputs; prepared inputs are kept
+        execute("myhibench clean", check=False)
+        execute("{}/bin/hdfs dfs -rm -r -f -skipTrash '/HiBench/*/Output'".format(self.hadoop_dir), check=False)
+
+    def output_name(self, framework, app, datasize, run_id):
+        return "{}_{}_{}_{}_{}_{}".format(self.cluster_size, self.instance_type, app, framework, datasize, run_id)
+
+    def run_workload(self, benchmark, framework, app, datasize, run_id, monitoring=True, executor_num=None, colocation=None):
+        script_name = "my{}".format(benchmark)
+        if benchmark == "hibench":
+            cmd_prepare = "{} prepare_dataset --workload {} --datasize {}".format(script_name, app, datasize)
+            if self.dataset_cache_dir:
+                cmd_prepare += " --cache-dir {}".format(self.dataset_cache_dir)
+            # a dataset that is still in HDFS from an earlier workload is reused
+            execute(cmd_prepare, check=False)
+            workload_id = "{}.{}".format(app, framework)
+        else:
+            workload_id = app
+        output_name = self.output_name(framework, app, datasize, run_id)
+        workload_output = "/tmp/{}".format(output_name)
+        # the timeout is handled by the run command so monitoring data is still collected
+        cmd = "{} run --timeout {} --mode {} --slaves '{}' --workload {} --datasize {} --output_dir {} {}".format(
+            script_name, self.timeout, self.cluster_mode, " ".join(self.slaves), workload_id, datasize, workload_output,
+            "--monitoring" if monitoring else "--no-monitoring")
+        if executor_num is not None:
+            cmd += " --executor-num {}".format(executor_num)
+        if colocation:
+            cmd += " --colocation {}".format(",".join(colocation))
+        with tracing.get_tracer().span('workload', benchmark=benchmark, app=app, framework=framework, datasize=datasize):
+            successful = execute(cmd, check=False)
+        self.stats['workloads'] += 1
+        return successful
+
+    def run_round(self, index, round):
+        """Run one round of the scheduler plan, concurrently if it has several workloads."""
+        self.prepare_cluster()
+        members = round['workloads']
+        if len(members) == 1:
+            member = members[0]
+            successful = self.run_workload(member['benchmark'], member['framework'], member['app'], member['datasize'], member['run_id'])
+            self._upload_member(member)
+            return {member['id']: successful}
+
+        # imported here since myhibench drives the session
+        from scoutcli.myhibench import HiBenchClusterProfiler
+        print("Co-locating:", [member['id'] for member in members])
+        round_output = "/tmp/round_{}".format(index)
+        execute("rm -rf {}; mkdir -p {}".format(round_output, round_output))
+        # one profiler for the whole round; each run alone would stop the others' sar
+        with HiBenchClusterProfiler(self.slaves, os.path.join(round_output, 'sar.csv'), self.interval):
+            with parallel.ThreadAgent(concurrency=len(members)) as runner:
+                for member in members:
+                    colocation = [other['app'] for other in members if other is not member]
+                    # the workload spans of the members nest in this round's session span
+                    runner.submit(member['id'], tracing.get_tracer().wrap(self.run_workload),
+                                  member['benchmark'], member['framework'], member['app'], member['datasize'], member['run_id'],
+                                  monitoring=False, executor_num=round['executors'][member['id']], colocation=colocation)
+                runner.wait()
+        cmd_copy = "; ".join(["mkdir -p {}; cp {}/sar*.csv {}/".format(output, round_output, output)
+                              for output in ["/tmp/{}".format(self.output_name(m['framework'], m['app'], m['datasize'], m['run_id'])) for m in members]])
+        with parallel.CommandAgent(show_result=False, concurrency=len(self.slaves)) as agent:
+            agent.submit_remote_commands(self.slaves, cmd_copy, connect_timeout=60, silent=True)
+        for member in members:
+            self._upload_member(member)
+        return runner.results()
+
+    def _upload_member(self, member):
+        if self.s3_bucket:
+            output_name = self.output_name(member['framework'], member['app'], member['datasize'], member['run_id'])
+            self.upload(member['benchmark'], member['framework'], member['app'], "/tmp/{}".format(output_name), output_name)
+
+    def upload(self, benchmark, framework, app, workload_output, output_name):
+        # upload everything even with failures; reruns skip what the manifests list
+        destination = "s3://{}/{}".format(self.s3_bucket, output_name)
+        with tracing.get_tracer().span('upload', output_name=output_name):
+            self._upload(benchmark, framework, app, workload_output, destination)
+
+    def _upload(self, benchmark, framework, app, workload_output, destination):
+        s3sync.Uploader().sync(workload_output, destination)
+        sar_dir = "{}/report/{}/{}".format(self.hibench_dir, app, framework) if benchmark == "hibench" else workload_output
+        with parallel.CommandAgent(show_result=False, concurrency=len(self.slaves)) as agent:
+            agent.submit_remote_commands(
+                self.slaves,
+                "myaws upload {} {} --include 'sar*.csv'".format(sar_dir, destination),
+                connect_timeout=60,
+                silent=True)
+
+    def run(self, workloads, colocate=False, spark_env=None, cluster=None, max_concurrency=2, small_workloads=scheduler.SMALL_WORKLOADS):
+        """Run "benchmark framework app datasize run_id" workloads.
+
+        With colocate, the small_workloads apps are packed into concurrent
+        rounds by the scheduler; spark_env and cluster size the YARN footprints.
+        """
+        valid = []
+        for workload in workloads:
+            if len(workload.split()) != 5:
+                print("Skip workload due to wrong format:", workload)
+                continue
+            valid.append(workload)
+        if colocate:
+            rounds = scheduler.plan(valid, spark_env, cluster, max_concurrency=max_concurrency, small_workloads=small_workloads)
+        else:
+            rounds = [{'workloads': [scheduler.parse_workload(w)], 'executors': {w: None}} for w in valid]
+        results = {}
+        tracer = tracing.get_tracer()
+        with tracer.span('session', workloads=len(valid), rounds=len(rounds)):
+            for (index, round) in enumerate(rounds):
+                results.update(self.run_round(index, round))
+        os.makedirs(self.trace_dir, exist_ok=True)
+        tracer.save(self.trace_dir)
+        print("Session:", self.stats)
+        return results
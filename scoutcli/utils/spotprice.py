@@ -0,0 +1,148 @@
+import concurrent.futures
+import datetime
+import json
+import os
+
+import numpy as np
+
+from scoutcli.utils import catalog
+
+
+CACHE_DIR = os.path.expanduser('~/.scout/spot-prices')
+# EC2 keeps 90 days of spot price history
+RETENTION_DAYS = 90
+
+
+def _utcnow():
+    return datetime.datetime.utcnow().replace(microsecond=0)
+
+
+def _format(timestamp):
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def fetch_history(client, instance_type, availability_zone, start_time=None, product='Linux/UNIX'):
+    """Return [(timestamp, price)] for one instance type and zone, following all pages."""
+    kwargs = {
+        'InstanceTypes': [instance_type],
+        'AvailabilityZone': availability_zone,
+        'ProductDescriptions': [product],
+        'PaginationConfig': {'PageSize': 1000},
+    }
+    if start_time is not None:
+        kwargs['StartTime'] = start_time
+    records = []
+    for page in client.get_paginator('describe_spot_price_history').paginate(**kwargs):
+        for record in page['SpotPriceHistory']:
+            records.append((_format(record['Timestamp']), float(record['SpotPrice'])))
+    return records
+
+
+def ec2_client(region, concurrency):
+    import boto3
+    from botocore.config import Config
+    return boto3.client('ec2', region_name=region, config=Config(max_pool_connections=concurrency))
+
+
+class SpotPriceHistory:
+    """Spot price history per instance type and zone, cached on disk.
+
+    Each refresh only asks EC2 for records newer than the latest cached one,
+    for all (instance type, zone) pairs concurrently through one client.
+    """
+    def __init__(self, region='us-east-1', cache_dir=CACHE_DIR, client=None, concurrency=16):
+        self.region = region
+        self.cache_path = os.path.join(cache_dir, '{}.json'.format(region))
+        self.client = client
+        self.concurrency = concurrency
+        self.records = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(self.cache_path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(self.records, f)
+        os.rename(tmp_path, self.cache_path)
+
+    def _key(self, instance_type, availability_zone):
+        return "{}|{}".format(instance_type, availability_zone)
+
+    def refresh(self, instance_types, availability_zones):
+        if self.client is None:
+            self.client = ec2_client(self.region, self.concurrency)
+        oldest = _format(_utcnow() - datetime.timedelta(days=RETENTION_DAYS))
+        pairs = [(t, z) for t in instance_types for z in availability_zones]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {}
+            for (instance_type, availability_zone) in pairs:
+                cached = self.records.get(self._key(instance_type, availability_zone), [])
+                start_time = datetime.datetime.strptime(cached[-1][0], '%Y-%m-%dT%H:%M:%S') if cached else None
+                futures[pool.submit(fetch_history, self.client, instance_type, availability_zone, start_time)] = (instance_type, availability_zone)
+            for future in concurrent.futures.as_completed(futures):
+                key = self._key(*futures[future])
+                merged = dict(self.records.get(key, []))
+                merged.update(future.result())
+                self.records[key] = sorted((ts, price) for (ts, price) in merged.items() if ts >= oldest)
+        self._save()
+
+    def prices(self, instance_type, availability_zone, days=None):
+        records = self.records.get(self._key(instance_type, availability_zone), [])
+        if days is not None:
+            since = _format(_utcnow() - datetime.timedelta(days=days))
+            records = [r for r in records if r[0] >= since]
+        return np.array([price for (ts, price) in records], dtype=float)
+
+    def mean_prices(self, instance_types, availability_zones, days=None, refresh=True):
+        """{instance type: {zone: mean price}} for the pairs with any history."""
+        if refresh:
+            self.refresh(instance_types, availability_zones)
+        history = {}
+        for instance_type in instance_types:
+            history[instance_type] = {}
+            for availability_zone in availability_zones:
+                prices = self.prices(instance_type, availability_zone, days)
+                if prices.size:
+                    history[instance_type][availability_zone] = float(prices.mean())
+        return history
+
+
+def get_spot_price_history(instance_type_list, availability_zone_list, region_name='us-east-1', days=None):
+    return SpotPriceHistory(region_name).mean_prices(instance_type_list, availability_zone_list, days)
+
+
+def filter_spot_price(price_history, percentile=50):
+    """Keep the zones priced at or below the given percentile of each instance type."""
+    instance_types = sorted(price_history.keys())
+    zones = sorted(set(z for t in instance_types for z in price_history[t]))
+    matrix = np.full((len(instance_types), len(zones)), np.nan)
+    for (i, instance_type) in enumerate(instance_types):
+        for (j, zone) in enumerate(zones):
+            matrix[i, j] = price_history[instance_type].get(zone, np.nan)
+    if not zones:
+        return {t: {} for t in instance_types}
+    thresholds = np.nanpercentile(matrix, percentile, axis=1)
+    keep = matrix <= thresholds[:, np.newaxis]
+    return {t: {zones[j]: float(matrix[i, j]) for j in np.flatnonzero(keep[i])} for (i, t) in enumerate(instance_types)}
+
+
+def create_spot_bidding(spot_candidates, factor=2):
+    return {t: {z: "{0:.3f}".format(price * factor) for (z, price) in zones.items()} for (t, zones) in spot_candidates.items()}
+
+
+def default_bid(instance_type, availability_zone=None, region_name='us-east-1'):
+    """The spot price to bid when none is given, as the string EC2 expects."""
+    price = catalog.spot_price(instance_type)
+    if price is None and availability_zone is not None:
+        # no default bid for newer types; bid twice the recent mean in the zone
+        history = get_spot_price_history([instance_type], [availability_zone], region_name, days=7)
+        price = float(create_spot_bidding(history)[instance_type][availability_zone]) if history[instance_type] else None
+    if price is None:
+        raise RuntimeError("No default spot price for {}, please pass --spot-price".format(instance_type))
+    return str(price)
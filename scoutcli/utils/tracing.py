@@ -0,0 +1,111 @@
+import contextlib
+import json
+import os
+import socket
+import threading
+import time
+
+
+TRACE_NAME = 'trace.json'
+
+
+class Tracer:
+    """Nested, timed spans of one process, exported as Chrome trace events.
+
+    Open the trace.json of a run in chrome://tracing or Perfetto.  Spans of
+    different threads nest independently unless the thread runs a function
+    passed through wrap(); each span carries the host, and keyword arguments
+    of span() become its args.
+    """
+    def __init__(self, host=None, clock=time.time):
+        self.host = host if host is not None else socket.gethostname()
+        self.pid = os.getpid()
+        self.clock = clock
+        self.spans = []
+        self.local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        stack = self._stack()
+        record = {'name': name, 'depth': len(stack), 'tid': threading.get_ident(), 'args': attributes, 'start': self.clock()}
+        stack.append(record)
+        try:
+            yield record['args']
+        finally:
+            stack.pop()
+            record['duration'] = self.clock() - record['start']
+            self.spans.append(record)
+
+    def wrap(self, func):
+        """func for another thread, with its spans nested in the spans open here."""
+        parents = list(self._stack())
+
+        def run(*args, **kwargs):
+            stack = self._stack()
+            saved = list(stack)
+            stack[:] = parents
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack[:] = saved
+        return run
+
+    def events(self):
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.host}}]
+        for record in sorted(self.spans, key=lambda r: (r['start'], r['depth'])):
+            events.append({
+                'name': record['name'],
+                'ph': 'X',
+                'ts': int(record['start'] * 1e6),
+                'dur': int(record['duration'] * 1e6),
+                'pid': self.pid,
+                'tid': record['tid'],
+                'args': dict(record['args'], host=self.host),
+            })
+        return events
+
+    def summary(self, workload_phase='execute'):
+        """Seconds per top-level phase and how much of the wall clock the workload itself took."""
+        roots = [r for r in self.spans if r['depth'] == 0]
+        if not roots:
+            return {}
+        wall = max(r['start'] + r['duration'] for r in roots) - min(r['start'] for r in roots)
+        phases = {}
+        for record in self.spans:
+            if record['depth'] == 1:
+                phases[record['name']] = phases.get(record['name'], 0) + record['duration']
+        workload = sum(r['duration'] for r in self.spans if r['name'] == workload_phase)
+        return {
+            'host': self.host,
+            'wall_seconds': round(wall, 3),
+            'workload_seconds': round(workload, 3),
+            'overhead_seconds': round(wall - workload, 3),
+            'phases': {name: round(seconds, 3) for (name, seconds) in phases.items()},
+        }
+
+    def save(self, output_dir):
+        """Write trace.json into output_dir and add the summary to its report.json, if any."""
+        with open(os.path.join(output_dir, TRACE_NAME), 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
+        report_json = os.path.join(output_dir, 'report.json')
+        if os.path.exists(report_json):
+            with open(report_json, 'r') as f:
+                report = json.load(f)
+            report['trace'] = self.summary()
+            with open(report_json, 'w') as f:
+                json.dump(report, f, indent=4, sort_keys=True)
+
+
+_tracer = None
+
+
+def get_tracer():
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -0,0 +1,237 @@
+import csv
+import datetime
+import glob
+import json
+import os
+import re
+import sqlite3
+
+from scoutcli.utils import artifacts
+from scoutcli.utils import predictor
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    signature TEXT,
+    cluster_size INTEGER,
+    instance_type TEXT,
+    workload TEXT,
+    framework TEXT,
+    datasize TEXT,
+    run_id TEXT,
+    completed INTEGER,
+    elapsed_time REAL,
+    executor_num INTEGER,
+    colocation TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run INTEGER,
+    node INTEGER,
+    offset INTEGER,
+    metric TEXT,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS run_stats (
+    run INTEGER,
+    metric TEXT,
+    mean REAL,
+    p50 REAL,
+    p95 REAL,
+    max REAL
+);
+CREATE INDEX IF NOT EXISTS samples_metric ON samples (metric, run);
+CREATE INDEX IF NOT EXISTS run_stats_metric ON run_stats (metric, run);
+CREATE INDEX IF NOT EXISTS runs_workload ON runs (workload, instance_type, cluster_size);
+'''
+
+RUN_COLUMNS = ['cluster_size', 'instance_type', 'workload', 'framework', 'datasize', 'run_id']
+STATS = ['mean', 'p50', 'p95', 'max']
+
+
+def percentile(values, p):
+    """Linear interpolation between closest ranks, as numpy.percentile does."""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def _parse_timestamp(value):
+    # sadf prints "2017-06-01 10:00:05 UTC", the collector export "2017-06-01 10:00:05.123";
+    # both are parsed to the second, and plain epoch seconds are accepted as well
+    try:
+        return float(value)
+    except ValueError:
+        return (datetime.datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S') - datetime.datetime(1970, 1, 1)).total_seconds()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_timeline(f, downsample):
+    """Average the rows of a sar CSV file object into downsample-second buckets.
+
+    Returns ({offset: {metric: mean}}, {metric: [raw values]}), with offsets
+    counted from the first sample.
+    """
+    buckets = {}
+    raw = {}
+    start = None
+    for row in csv.DictReader(f):
+        timestamp = _parse_timestamp(row.pop('timestamp'))
+        start = timestamp if start is None else start
+        bucket = buckets.setdefault(int((timestamp - start) // downsample * downsample), {})
+        for (metric, value) in row.items():
+            value = _to_float(value)
+            if value is not None:
+                bucket.setdefault(metric, []).append(value)
+                raw.setdefault(metric, []).append(value)
+    timeline = {offset: {m: sum(v) / len(v) for (m, v) in metrics.items()} for (offset, metrics) in buckets.items()}
+    return (timeline, raw)
+
+
+def _sar_files(path):
+    """Yield (name, file) for the sar_nodeN.csv files of a run, plain or archived by myhibench run."""
+    for csv_path in sorted(glob.glob(os.path.join(path, 'sar_node*.csv'))):
+        with open(csv_path, 'r') as f:
+            yield (os.path.basename(csv_path), f)
+    if not glob.glob(os.path.join(path, 'sar_node*.csv')):
+        for member in artifacts.iter_members(path, 'sar_node*.csv'):
+            yield member
+
+
+def _signature(path):
+    files = sorted(glob.glob(os.path.join(path, 'report.json')) + glob.glob(os.path.join(path, 'sar_node*.csv')) + glob.glob(os.path.join(path, artifacts.INDEX_NAME)))
+    return json.dumps([(os.path.basename(f), os.path.getsize(f), int(os.path.getmtime(f))) for f in files])
+
+
+class Warehouse:
+    """An SQLite index of benchmark results mirrored from S3.
+
+    Every output directory ("<cluster size>_<instance type>_<app>_<framework>_
+    <datasize>_<run_id>") becomes a row in runs.  Its sar_nodeN.csv files,
+    plain or inside the results archive, are downsampled into samples, and
+    per-run statistics of each metric over all raw samples go to run_stats.
+    """
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _run_directories(self, root):
+        for (dirpath, dirs, files) in os.walk(root):
+            if predictor.parse_output_name(os.path.basename(dirpath)) is not None and 'report.json' in files:
+                yield dirpath
+
+    def index(self, root, downsample=60, force=False):
+        """Ingest new or changed run directories below root; returns (indexed, skipped)."""
+        indexed = skipped = 0
+        for path in self._run_directories(root):
+            path = os.path.abspath(path)
+            signature = _signature(path)
+            row = self.db.execute("SELECT id, signature FROM runs WHERE path = ?", (path,)).fetchone()
+            if row is not None and row[1] == signature and not force:
+                skipped += 1
+                continue
+            with self.db:
+                if row is not None:
+                    self._delete(row[0])
+                self._ingest(path, signature, downsample)
+            indexed += 1
+        return (indexed, skipped)
+
+    def _delete(self, run):
+        for table in ['samples', 'run_stats']:
+            self.db.execute("DELETE FROM {} WHERE run = ?".format(table), (run,))
+        self.db.execute("DELETE FROM runs WHERE id = ?", (run,))
+
+    def _ingest(self, path, signature, downsample):
+        meta = predictor.parse_output_name(os.path.basename(path))
+        with open(os.path.join(path, 'report.json'), 'r') as f:
+            report = json.load(f)
+        cursor = self.db.execute(
+            "INSERT INTO runs (path, signature, {}, completed, elapsed_time, executor_num, colocation) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)".format(", ".join(RUN_COLUMNS)),
+            [path, signature] + [meta[c] for c in RUN_COLUMNS] + [
+                int(bool(report.get('completed'))),
+                _to_float(report.get('elapsed_time')),
+                report.get('executor_num'),
+                ",".join(report.get('colocation', [])),
+            ])
+        run = cursor.lastrowid
+        raw = {}
+        for (name, f) in _sar_files(path):
+            node = int(re.search(r'sar_node(\d+)\.csv$', name).group(1))
+            (timeline, node_raw) = read_timeline(f, downsample)
+            self.db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)",
+                                ((run, node, offset, metric, value) for (offset, metrics) in timeline.items() for (metric, value) in metrics.items()))
+            for (metric, values) in node_raw.items():
+                raw.setdefault(metric, []).extend(values)
+        self.db.executemany("INSERT INTO run_stats VALUES (?, ?, ?, ?, ?, ?)",
+                            ((run, metric, sum(values) / len(values), percentile(values, 50), percentile(values, 95), max(values))
+                             for (metric, values) in raw.items()))
+
+    @staticmethod
+    def _where(filters):
+        clauses = []
+        params = []
+        for (column, value) in sorted(filters.items()):
+            if value is None:
+                continue
+            if isinstance(value, str) and '*' in value:
+                clauses.append("runs.{} LIKE ?".format(column))
+                params.append(value.replace('*', '%'))
+            else:
+                clauses.append("runs.{} = ?".format(column))
+                params.append(value)
+        return (" AND ".join(clauses) or "1", params)
+
+    def runs(self, **filters):
+        (where, params) = self._where(filters)
+        cursor = self.db.execute("SELECT {}, completed, elapsed_time FROM runs WHERE {} ORDER BY {}".format(", ".join(RUN_COLUMNS), where, ", ".join(RUN_COLUMNS)), params)
+        return [dict(zip(RUN_COLUMNS + ['completed', 'elapsed_time'], row)) for row in cursor]
+
+    def query(self, metric, stat='p95', group_by='cluster_size', **filters):
+        """Aggregate a metric's downsampled timeline over matching runs, grouped by a run column.
+
+        stat is mean, max or pNN, e.g., p95 of cpu.%iowait per cluster size.
+        The values are the per-bucket means of the samples table, so pNN is a
+        percentile of downsampled means and differs from the per-run p95 in
+        run_stats, which is computed over the raw values.
+        """
+        (where, params) = self._where(filters)
+        matching = ("FROM samples JOIN runs ON samples.run = runs.id "
+                    "WHERE samples.metric = ? AND runs.completed = 1 AND {}".format(where))
+        params = [metric] + params
+        if stat in ('mean', 'max'):
+            cursor = self.db.execute("SELECT runs.{0}, {1}(samples.value) {2} GROUP BY runs.{0} ORDER BY runs.{0}".format(
+                group_by, 'AVG' if stat == 'mean' else 'MAX', matching), params)
+            return dict(cursor.fetchall())
+        p = float(stat.lstrip('p'))
+        results = {}
+        counts = self.db.execute("SELECT runs.{0}, COUNT(*) {1} GROUP BY runs.{0} ORDER BY runs.{0}".format(group_by, matching), params).fetchall()
+        for (key, count) in counts:
+            # only the two values around the rank leave SQLite, see percentile()
+            rank = (count - 1) * p / 100.0
+            low = int(rank)
+            values = [row[0] for row in self.db.execute(
+                "SELECT samples.value {} AND runs.{} = ? ORDER BY samples.value LIMIT 2 OFFSET ?".format(matching, group_by),
+                params + [key, low])]
+            high = values[1] if len(values) > 1 and low + 1 < count else values[0]
+            results[key] = values[0] + (high - values[0]) * (rank - low)
+        return results
+
+    def metrics(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT metric FROM run_stats ORDER BY metric")]
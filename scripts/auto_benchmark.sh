@@ -6,20 +6,19 @@ if [[ ! -d "$DIR" ]]; then DIR="$PWD"; fi
 
 wait_for_cluster
 
+fix_click_on_python3
+
+# the session keeps HDFS/YARN up between workloads and only reinitializes
+# the cluster when the Hadoop configuration changes
+session_args=()
 for workload in "$@"
 do
-    num_params=`echo $workload | wc -w`
-    if (( ${num_params} != 5 )); then echo Skip workload due to wrong format: ${workload}; continue; fi
-
-    benchmark=`echo ${workload} | cut -d' ' -f1`
-    framework=`echo ${workload} | cut -d' ' -f2`
-    app=`echo ${workload} | cut -d' ' -f3`
-    datasize=`echo ${workload} | cut -d' ' -f4`
-    run_id=`echo ${workload} | cut -d' ' -f5`
-    enable_upload=1
-    timeout=7200  # 2 hours
-
-    config_cluster
-    start_cluster
-    profile_app ${benchmark} ${framework} ${app} ${datasize} ${run_id} ${enable_upload} ${timeout}
+    session_args+=(-w "${workload}")
 done
+
+myhibench session \
+    --master ${master} --slaves "${node_list}" --instances "${instance_list}" \
+    --mode ${cluster_mode} --cluster-size ${cluster_size} --instance-type ${instance_type} \
+    --s3-bucket "${s3_bucket}" --timeout 7200 \
+    ${SCOUT_COLOCATE:+--colocate} \
+    "${session_args[@]}"
@@ -85,7 +85,7 @@ config_cluster() {
 prewarm_system() {
     echo "Prewarm the system"
     local prewarm_datasize="warmup"
-    sleep 10  # wait for YARN/HDFS to be ready
+    myhadoop wait_ready --no-ssh --slaves "${node_list}"  # wait for YARN/HDFS to be ready
     # warmup_workload_list="wordcount.spark wordcount.hadoop terasort.spark terasort.hadoop pagerank.spark pagerank.hadoop kmeans.spark kmeans.hadoop bayes.spark bayes.hadoop lr.spark als.spark scan.spark scan.hadoop aggregation.spark aggregation.hadoop join.spark join.hadoop"
     for workload in ${workload_list};
     do
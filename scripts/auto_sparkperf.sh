@@ -85,7 +85,7 @@ config_cluster() {
 
 prewarm_system() {
     echo "Prewarm the system"
-    sleep 10  # wait for YARN/HDFS to be ready
+    myhadoop wait_ready --no-ssh --slaves "${node_list}"  # wait for YARN/HDFS to be ready
 
     # run the workload
     # warmup_workload_list="regression classification naive-bayes decision-tree random-forest gradient-boosted-tree als kmeans gmm lda pic svd pca summary-statistics block-matrix-mult pearson spearman chi-sq-feature chi-sq-gof word2vec fp-growth prefix-span"
@@ -1,46 +1,27 @@
 #!/bin/bash
 
-instance_type=`curl -s http://169.254.169.254/latest/meta-data/instance-type`
-instance_id=`curl -s http://169.254.169.254/latest/meta-data/instance-id`
-region=`curl -s http://169.254.169.254/latest/dynamic/instance-identity/document | jq -r .region`
-node_ip=`curl -s http://169.254.169.254/latest/meta-data/local-ipv4`
+# served from the metadata cache shared with myhibench/mysparkperf
+instance_type=`myaws metadata instance-type`
+instance_id=`myaws metadata instance-id`
+region=`myaws metadata region`
+node_ip=`myaws metadata local-ipv4`
 echo "Instance Type: $instance_type"
 echo "Instance Id: $instance_id"
 echo "Region: $region"
 echo "IP: $node_ip"
 
-# retrieve the cluster setting
-fleet_request_id=`aws ec2 describe-tags --region ${region} --filters "Name=resource-id,Values=${instance_id}" | jq -r '.Tags[] | select(.Key=="aws:ec2spot:fleet-request-id") | .Value'`
+# retrieve the cluster setting; discovered once and cached in /tmp/scout-cluster.json
+eval "$(myaws cluster --format shell)"
 echo "Fleet:" $fleet_request_id
-instance_list=`aws ec2 describe-spot-fleet-instances --spot-fleet-request-id ${fleet_request_id}  --region ${region} | jq -r '.ActiveInstances[].InstanceId' | xargs -I {} aws ec2 describe-instances --instance-id {} --region ${region} | jq -r '.Reservations[].Instances[].PrivateIpAddress' | sort | paste -sd " " -`
 echo "Instance list:" $instance_list
-
-master=`echo ${instance_list} | awk '{print $1;}'`
 echo "Master:" $master
 if [ "${node_ip}" != "${master}" ]; then
     echo "Not the master node"
     exit
 fi
-
-target_cluster_size=`aws ec2 describe-tags --region ${region} --filters "Name=resource-id,Values=${instance_id}" | jq -r '.Tags[] | select(.Key=="cluster-size") | .Value'`
-cluster_mode=`aws ec2 describe-tags --region ${region} --filters "Name=resource-id,Values=${instance_id}" | jq -r '.Tags[] | select(.Key=="cluster-mode") | .Value'`
-cluster_mode="${cluster_mode:-n+1}"
 echo "Cluster mode:" $cluster_mode
-if [ "${cluster_mode}" == "n+1" ]; then
-    cluster_size=$((target_cluster_size-1))
-else
-    cluster_size=${target_cluster_size}
-fi
-if [ "${cluster_mode}" == "n+1" ]; then
-    node_list_before=( ${instance_list} )
-    node_list="${node_list_before[@]:1}"
-else
-    node_list=(${instance_list})
-fi
 echo "Slaves: ${node_list}"
 
-s3_bucket=`aws ec2 describe-tags --region ${region} --filters "Name=resource-id,Values=${instance_id}" | jq -r '.Tags[] | select(.Key=="s3-bucket") | .Value'`
-
 ##########################
 # functions
 ##########################
@@ -57,34 +38,19 @@ terminate_fleet() {
 }
 
 wait_for_cluster() {
-    while true;
-    do
-        current_cluster_size=`aws ec2 describe-spot-fleet-instances --spot-fleet-request-id ${fleet_request_id}  --region ${region} | jq -r '.ActiveInstances' | jq length`
-        echo "target cluster size: ${target_cluster_size}"
-        echo "current cluster size: ${current_cluster_size}"
-        if [ "${target_cluster_size}" == "${current_cluster_size}" ];
-        then
-            # better?
-            echo "Cluster is ready, waiting for 60 more seconds"
-            sleep 60
-            break
-        fi
-        sleep 30
-    done
+    eval "$(myaws cluster --wait --format shell)"
+    # instead of a flat sleep, continue once sshd answers on every node
+    myhadoop wait_ready --nodes "${instance_list}" --no-hadoop
 }
 
 config_cluster() {
-    for node_ip in ${instance_list};
-    do
-        echo "Configuring ${node_ip}"
-        (ssh ${node_ip} "myhibench auto_configure --master ${master} --slaves '${node_list}'; myhibench init") &
-    done
-    wait
+    # computed once here, pushed to the other nodes concurrently with a per-node timeout and retries
+    myhibench cluster_configure --master ${master} --slaves "${node_list}" --instances "${instance_list}"
     echo All instances are configured
 }
 
 start_cluster() {
-    ssh ${master} "myhibench start"
+    ssh ${master} "myhibench start; myhadoop wait_ready --no-ssh --slaves '${node_list}'"
 }
 
 profile_app() {
@@ -136,16 +102,16 @@ profile_app() {
        
     # upload everything even with failures
     if (( $enable_upload > 0 )); then
-        aws s3 sync ${workload_output} s3://${s3_bucket}/${output_name}
+        myaws upload ${workload_output} s3://${s3_bucket}/${output_name}
         if [ "${benchmark}" == "hibench" ]; then
-            sar_data_path="/opt/HiBench/report/${app}/${framework}/sar*.csv"
+            sar_data_dir="/opt/HiBench/report/${app}/${framework}"
         else
-            sar_data_path="${workload_output}/sar*.csv"
+            sar_data_dir="${workload_output}"
         fi
         for node_ip in ${node_list};
         do
             echo "Uploading sar data from ${node_ip}"
-            cmd=`echo "aws s3 cp ${sar_data_path} s3://${s3_bucket}/${output_name}/" | base64 -w0`
+            cmd=`echo "myaws upload ${sar_data_dir} s3://${s3_bucket}/${output_name} --include 'sar*.csv'" | base64 -w0`
             echo ssh ${node_ip} `echo $cmd | base64 -d`
             (ssh ${node_ip} "echo $cmd | base64 -d | bash") &
         done
@@ -1,10 +1,11 @@
-import boto3
 import datetime
 import json
 import random
 
 from executor import execute
-import numpy as np
+
+from scoutcli.utils.spotprice import get_spot_price_history, filter_spot_price, create_spot_bidding
+
 
 def main(workload_groups, datasize_list, instance_type_list, availability_zone_list, subnet_list, iteration, dry_run):
     spot_candidates = filter_spot_price(get_spot_price_history(instance_type_list, availability_zone_list))
@@ -37,44 +38,6 @@ def main(workload_groups, datasize_list, instance_type_list, availability_zone_l
 
 
 
-def get_spot_price_history(instance_type_list, avaiability_zone_list, region_name='us-east-1'):
-    client = boto3.client('ec2', region_name=region_name)
-    price_history = {}
-    for instance_type in instance_type_list:
-        price_history[instance_type] = {}
-        for avaiability_zone in avaiability_zone_list:
-
-            prices = client.describe_spot_price_history(
-                InstanceTypes=[instance_type],
-                AvailabilityZone=avaiability_zone,
-                MaxResults=1000,
-                ProductDescriptions=['Linux/UNIX']
-            )
-
-            price_list = [float(record['SpotPrice']) for record in prices['SpotPriceHistory']]
-            price_history[instance_type][avaiability_zone] = sum(price_list) / len(price_list)
-    return price_history
-
-
-def filter_spot_price(price_history, percentile=50):
-    price_list = {}
-    for instance_type in price_history.keys():
-        price_list[instance_type] = {}
-        threshold = np.percentile(list(price_history[instance_type].values()), percentile)
-        for availability_zone, price in price_history[instance_type].items():
-            if price <= threshold:
-                price_list[instance_type][availability_zone] = price
-    return price_list
-
-
-def create_spot_bidding(spot_candidates, factor=2):
-    spot_bidding_list = {}
-    for instance_type in spot_candidates.keys():
-        spot_bidding_list[instance_type] = {}
-        for availability_zone, price in spot_candidates[instance_type].items():
-            spot_bidding_list[instance_type][availability_zone] = "{0:.3f}".format(price*2)
-    return spot_bidding_list
-
 if __name__ == '__main__':
     dry_run = False
     iteration = 3
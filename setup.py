@@ -8,15 +8,23 @@ setup_options = dict(
     author='NCSU Operating Research Lab',
     url='https://github.com/oxhead/scout-scripts',
     packages=find_packages(include=['scoutcli*']),
+    package_data={'scoutcli': ['data/*.json']},
     install_requires=[
         'boto3',
         'click',
         'executor',
+        'numpy',
     ],
     extras_require={
         ':python_version=="3.4"': [
             'click>=6.7',
-        ]
+        ],
+        'columnar': [
+            'pyarrow',
+        ],
+        'zstd': [
+            'zstandard',
+        ],
     },
     license="Apache License 2.0",
     classifiers=(
@@ -42,6 +50,7 @@ setup_options = dict(
             'myspark=scoutcli.myspark:cli',
             'mysparkperf=scoutcli.mysparkperf:cli',
             'myaws=scoutcli.myaws:cli',
+            'scout=scoutcli.scout:cli',
         ]
     }
 )
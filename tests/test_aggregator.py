@@ -0,0 +1,38 @@
+import json
+
+from scoutcli.utils import aggregator
+
+
+def _lines(path):
+    with open(str(path), 'r') as f:
+        return [json.loads(line) for line in f]
+
+
+def _timeline(tmp_path):
+    timeline = aggregator.Timeline(str(tmp_path / 'timeline.jsonl'), interval=5, lateness=10)
+    timeline.columns['a'] = ['cpu']
+    timeline.columns['b'] = ['cpu']
+    return timeline
+
+
+def test_buckets_are_written_once(tmp_path):
+    timeline = _timeline(tmp_path)
+    timeline.add('a', [[100.0, 1], [105.0, 2], [120.0, 3]])
+    # bucket 100 and 105 are past the lateness and written; b is too late for 100
+    timeline.add('b', [[101.0, 9], [121.0, 4]])
+    timeline.close()
+    lines = _lines(tmp_path / 'timeline.jsonl')
+    assert [line['timestamp'] for line in lines] == [100.0, 105.0, 120.0]
+    assert lines[0]['nodes'] == {'a': {'cpu': 1}}
+    assert lines[2]['nodes'] == {'a': {'cpu': 3}, 'b': {'cpu': 4}}
+    assert timeline.dropped == 1
+
+
+def test_samples_after_close_are_dropped(tmp_path):
+    timeline = _timeline(tmp_path)
+    timeline.add('a', [[100.0, 1]])
+    timeline.close()
+    timeline.add('a', [[105.0, 2]])
+    timeline.close()
+    assert [line['timestamp'] for line in _lines(tmp_path / 'timeline.jsonl')] == [100.0]
+    assert timeline.dropped == 1
@@ -0,0 +1,62 @@
+from scoutcli.utils import cluster
+
+
+FLEETS = {'sfr-1': {'i-1': '10.0.0.4', 'i-2': '10.0.0.2', 'i-3': '10.0.0.3', 'i-4': '10.0.0.1', 'i-5': '10.0.0.5'}}
+
+
+def _client(cluster_mode='n+1', cluster_size=5):
+    tags = {'i-1': {'aws:ec2spot:fleet-request-id': 'sfr-1', 'cluster-mode': cluster_mode, 'cluster-size': str(cluster_size)}}
+    return cluster.FakeEC2Client({k: dict(v) for (k, v) in FLEETS.items()}, tags, page_size=2)
+
+
+def test_discovery_pages_through_every_call(tmp_path):
+    client = _client()
+    info = cluster.ClusterDiscovery(client, 'i-1', cache_file=str(tmp_path / 'cluster.json')).discover()
+    # 2 tags on 2 pages, 5 instances and 5 reservations on 3 pages each
+    assert client.calls.count('describe_tags') == 2
+    assert client.calls.count('describe_spot_fleet_instances') == 3
+    assert client.calls.count('describe_instances') == 3
+    assert info['instances'] == ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4', '10.0.0.5']
+    assert info['complete']
+
+
+def test_roles_by_cluster_mode(tmp_path):
+    info = cluster.ClusterDiscovery(_client('n+1'), 'i-1', cache_file=str(tmp_path / 'a.json')).discover()
+    assert info['master'] == '10.0.0.1'
+    assert info['slaves'] == ['10.0.0.2', '10.0.0.3', '10.0.0.4', '10.0.0.5']
+    assert info['cluster_size'] == 4
+    info = cluster.ClusterDiscovery(_client('single'), 'i-1', cache_file=str(tmp_path / 'b.json')).discover()
+    assert info['master'] == '10.0.0.1'
+    assert info['slaves'] == info['instances']
+    assert info['cluster_size'] == 5
+
+
+def test_cache_reuse_and_invalidation(tmp_path):
+    cache_file = str(tmp_path / 'cluster.json')
+    client = _client()
+    discovery = cluster.ClusterDiscovery(client, 'i-1', cache_file=cache_file)
+    discovery.get()
+    assert cluster.cached('slaves', cache_file) == '10.0.0.2 10.0.0.3 10.0.0.4 10.0.0.5'
+
+    # an unchanged fleet is confirmed with one listing of its instances
+    del client.calls[:]
+    discovery.get()
+    assert set(client.calls) == {'describe_spot_fleet_instances'}
+
+    # a replaced spot instance makes the cache stale
+    del client.fleets['sfr-1']['i-5']
+    client.fleets['sfr-1']['i-6'] = '10.0.0.6'
+    del client.calls[:]
+    info = discovery.get()
+    assert 'describe_instances' in client.calls
+    assert info['instances'][-1] == '10.0.0.6'
+    assert cluster.load(cache_file)['instance_ids'] == ['i-1', 'i-2', 'i-3', 'i-4', 'i-6']
+
+
+def test_incomplete_cluster_is_rediscovered(tmp_path):
+    client = _client(cluster_size=6)
+    discovery = cluster.ClusterDiscovery(client, 'i-1', cache_file=str(tmp_path / 'cluster.json'))
+    assert not discovery.get()['complete']
+    del client.calls[:]
+    discovery.get()
+    assert 'describe_tags' in client.calls
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import threading
+
+from scoutcli.utils import collector
+
+
+def _start(tmp_path, code):
+    process = subprocess.Popen([sys.executable, '-c', code])
+    # reap the child so it does not linger as a zombie that still answers kill(pid, 0)
+    threading.Thread(target=process.wait, daemon=True).start()
+    pidfile = tmp_path / 'collector.pid'
+    pidfile.write_text(str(process.pid))
+    return (process, str(pidfile))
+
+
+def test_stop_waits_for_exit(tmp_path):
+    (process, pidfile) = _start(tmp_path, 'import time; time.sleep(60)')
+    assert collector.stop(pidfile, timeout=5)
+    assert process.wait(timeout=5) is not None
+    assert not (tmp_path / 'collector.pid').exists()
+
+
+def test_stop_kills_a_collector_ignoring_sigterm(tmp_path):
+    code = 'import signal, sys, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); sys.stdout.write("ready\\n"); sys.stdout.flush(); time.sleep(60)'
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+    assert process.stdout.readline() == b'ready\n'
+    threading.Thread(target=process.wait, daemon=True).start()
+    pidfile = tmp_path / 'collector.pid'
+    pidfile.write_text(str(process.pid))
+    assert collector.stop(str(pidfile), timeout=0.2)
+    assert process.wait(timeout=5) == -9
+    assert not pidfile.exists()
+
+
+def test_stop_without_collector(tmp_path):
+    assert not collector.stop(str(tmp_path / 'missing.pid'))
+
+
+def test_wait_pidfile(tmp_path):
+    pidfile = tmp_path / 'collector.pid'
+    assert not collector.wait_pidfile(str(pidfile), timeout=0.1)
+    timer = threading.Timer(0.1, pidfile.write_text, ['123'])
+    timer.start()
+    assert collector.wait_pidfile(str(pidfile), timeout=5)
+    timer.join()
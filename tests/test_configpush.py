@@ -0,0 +1,34 @@
+from scoutcli.utils import configpush
+from scoutcli.utils import parallel
+
+
+def _push(nodes, cmd, retries=0):
+    return configpush.push(nodes, cmd, retries=retries, runner=parallel.local_runner)
+
+
+def test_apply_command_restores_the_bundled_files(tmp_path):
+    path = tmp_path / 'hibench.conf'
+    path.write_text("hibench.scale.profile large\n")
+    cmd = configpush.apply_command(configpush.bundle([str(path)]), "echo applied")
+    path.write_text("changed\n")
+    report = _push(['node1', 'node2'], cmd)
+    assert path.read_text() == "hibench.scale.profile large\n"
+    assert report == {node: {'status': 'ok', 'attempts': 1, 'output': 'applied'} for node in ['node1', 'node2']}
+
+
+def test_failed_nodes_are_retried(tmp_path):
+    marker = tmp_path / 'marker'
+    # fails on the first attempt only
+    cmd = configpush.apply_command(configpush.bundle([]), "test -e {0} || (touch {0}; echo missing; exit 1)".format(marker))
+    report = _push(['node1'], cmd, retries=2)
+    assert report['node1']['status'] == 'ok' and report['node1']['attempts'] == 2
+
+
+def test_timeout_and_failure_in_the_table():
+    report = _push(['node1'], configpush.apply_command(configpush.bundle([]), "sleep 5", timeout=0.2))
+    report.update(_push(['node2'], configpush.apply_command(configpush.bundle([]), "echo broken; exit 1")))
+    assert report['node1']['status'] == 'timeout'
+    assert report['node2'] == {'status': 'failed', 'attempts': 1, 'output': 'broken'}
+    table = configpush.format_table(report, roles={'node1': 'master'}).splitlines()
+    assert table[1].split()[:3] == ['node1', 'master', 'timeout']
+    assert table[2].split()[-1] == 'broken'
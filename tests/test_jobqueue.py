@@ -0,0 +1,77 @@
+import json
+import os
+
+from scoutcli.utils import jobqueue
+
+
+def _queue(path, in_memory=False):
+    job_queue = jobqueue.JobQueue(str(path), in_memory=in_memory)
+    job_queue.add_matrix(['hibench spark wordcount', 'hibench hadoop terasort'], ['large'], ['c4.large', 'm4.large'], [3], ['1', '2'])
+    return job_queue
+
+
+def _dispatch(job_queue, runtime=None, max_fleets=2, lost=()):
+    clock = jobqueue.FakeClock()
+    backend = jobqueue.FakeEC2Backend(clock, runtime=runtime, overhead=600, lost=lost)
+    dispatcher = jobqueue.Dispatcher(job_queue, backend, max_fleets=max_fleets, target_seconds=3600, max_retries=2, clock=clock.time, sleep=clock.sleep)
+    dispatcher.run(poll=60)
+    return (clock, backend)
+
+
+def test_dispatch_to_completion(tmp_path):
+    job_queue = _queue(tmp_path / 'queue.json')
+    runtime = lambda workload, instance_type, instance_num: 900 if 'terasort' in workload else 300
+    (clock, backend) = _dispatch(job_queue, runtime)
+    assert len(job_queue.jobs) == 8
+    assert all(job['state'] == 'done' for job in job_queue.jobs)
+    assert not job_queue.active_fleets()
+    # the measured runtimes replace the default estimate
+    assert job_queue.runtimes['hibench hadoop terasort|large|c4.largex3'] == 900
+    assert job_queue.runtimes['hibench spark wordcount|large|m4.largex3'] == 300
+    # every fleet records what it ran, so a restarted dispatcher can find its reports
+    for fleet in job_queue.fleets.values():
+        assert fleet['workloads'] and fleet['instance_num'] == 3
+    with open(str(tmp_path / 'queue.json'), 'r') as f:
+        assert all(job['state'] == 'done' for job in json.load(f)['jobs'])
+
+
+def test_dispatch_respects_max_fleets(tmp_path):
+    job_queue = _queue(tmp_path / 'queue.json')
+    (clock, backend) = _dispatch(job_queue, max_fleets=1)
+    launched = sorted((fleet['launched_at'], fleet['finished_at']) for fleet in job_queue.fleets.values())
+    for (previous, current) in zip(launched, launched[1:]):
+        assert current[0] >= previous[1]
+
+
+def test_simulation_leaves_state_unchanged(tmp_path):
+    path = tmp_path / 'queue.json'
+    _queue(path).save()
+    with open(str(path), 'r') as f:
+        before = f.read()
+    job_queue = jobqueue.JobQueue(str(path), in_memory=True)
+    _dispatch(job_queue)
+    assert all(job['state'] == 'done' for job in job_queue.jobs)
+    with open(str(path), 'r') as f:
+        assert f.read() == before
+    assert not os.path.exists(str(path) + '.tmp')
+
+
+def test_unreported_jobs_are_retried(tmp_path):
+    job_queue = _queue(tmp_path / 'queue.json')
+    job_queue.assign(job_queue.pending('c4.largex3'), 'sfr-1', 0)
+    (reported, lost) = sorted(job_queue.fleets['sfr-1']['workloads'])[:2]
+    job_queue.complete('sfr-1', 5000, {reported: 300})
+    states = {job['workload']: job for job in job_queue.jobs if job['instance_type'] == 'c4.large'}
+    assert states[reported]['state'] == 'done'
+    assert states[lost]['state'] == 'pending' and states[lost]['retries'] == 1 and states[lost]['fleet'] is None
+    # only the reported runtime is learned, not a share of the fleet's wall-clock time
+    assert list(job_queue.runtimes.values()) == [300]
+
+
+def test_lost_jobs_fail_after_max_retries(tmp_path):
+    job_queue = _queue(tmp_path / 'queue.json')
+    (clock, backend) = _dispatch(job_queue, lost=['hibench hadoop terasort large 1'])
+    failed = [job for job in job_queue.jobs if job['state'] == 'failed']
+    assert [job['workload'] for job in failed] == ['hibench hadoop terasort large 1'] * 2
+    assert all(job['retries'] == 2 for job in failed)
+    assert sum(job['state'] == 'done' for job in job_queue.jobs) == 6
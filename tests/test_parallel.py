@@ -0,0 +1,46 @@
+from scoutcli.utils import parallel
+
+
+def test_streaming_and_status():
+    lines = []
+    with parallel.AsyncCommandAgent(show_result=False, runner=parallel.local_runner, multiplex=False,
+                                    on_line=lambda cmd_id, line: lines.append(line)) as agent:
+        agent.submit('ok', "echo one; echo two")
+        agent.submit('fail', "echo three; exit 3")
+    assert sorted(lines) == ['one', 'three', 'two']
+    assert agent.results() == {'ok': "one\ntwo", 'fail': "three"}
+    assert agent.status() == {'ok': True, 'fail': False}
+    assert agent.cmd_records['fail'].returncode == 3
+
+
+def test_per_command_timeout():
+    with parallel.AsyncCommandAgent(show_result=False, runner=parallel.local_runner, multiplex=False) as agent:
+        agent.submit('slow', "echo started; sleep 30", timeout=0.5)
+        agent.submit('fast', "echo done")
+    assert agent.cmd_records['slow'].timed_out
+    assert agent.cmd_records['slow'].output == "started"
+    assert agent.status() == {'slow': False, 'fast': True}
+
+
+def test_long_lines_do_not_abort_the_run():
+    with parallel.AsyncCommandAgent(show_result=False, runner=parallel.local_runner, multiplex=False) as agent:
+        agent.submit('long', "printf 'x%.0s' $(seq 200000); echo; echo tail")
+        agent.submit('short', "echo short")
+    assert agent.results()['long'] == "x" * 200000 + "\ntail"
+    assert agent.status() == {'long': True, 'short': True}
+
+
+def test_remote_commands_pass_ssh_options():
+    argvs = []
+
+    def runner(host, cmd, **kwargs):
+        argvs.append(parallel.ssh_runner(host, cmd, **kwargs))
+        return parallel.local_runner(host, cmd)
+
+    with parallel.AsyncCommandAgent(show_result=False, runner=runner, multiplex=False) as agent:
+        agent.submit_remote_commands(['node1', 'node2'], "echo hi", ssh_user='ubuntu', port=2222, check=False, silent=True)
+    assert sorted(argv[-2] for argv in argvs) == ['node1', 'node2']
+    assert all(argv[-1] == "echo hi" for argv in argvs)
+    assert all(['-l', 'ubuntu'] == argv[argv.index('-l'):argv.index('-l') + 2] for argv in argvs)
+    assert all(['-p', '2222'] == argv[argv.index('-p'):argv.index('-p') + 2] for argv in argvs)
+    assert set(agent.status().values()) == {True}
@@ -0,0 +1,42 @@
+import json
+
+from scoutcli.utils import predictor
+
+
+# appended across runs: another datasize, another framework and two runs of the directory's workload
+HIBENCH_REPORT = """Type         Date       Time     Input_data_size      Duration(s)          Throughput(bytes/s)  Throughput/node
+HadoopTerasort 2018-05-01 09:00:00 32000000             40.0                 800000               200000
+HadoopTerasort 2018-05-01 10:00:00 3200000000           400.0                8000000              2000000
+ScalaSparkTerasort 2018-05-01 11:00:00 3200000000           200.0                16000000             4000000
+HadoopTerasort 2018-05-01 12:00:00 3200000000           420.0                7600000              1900000
+"""
+
+
+def _run_dir(root, name):
+    path = root / name
+    path.mkdir()
+    return path
+
+
+def test_load_directory_reads_reports_and_hibench_reports(tmp_path):
+    with open(str(_run_dir(tmp_path, '4_c4.large_wordcount_spark_large_1') / 'report.json'), 'w') as f:
+        json.dump({'completed': True, 'elapsed_time': 120.0}, f)
+    with open(str(_run_dir(tmp_path, '4_c4.large_wordcount_spark_large_2') / 'report.json'), 'w') as f:
+        json.dump({'completed': True, 'elapsed_time': 100.0, 'colocation': ['sort']}, f)
+    with open(str(_run_dir(tmp_path, '8_m4.large_terasort_hadoop_huge_1') / 'hibench.report'), 'w') as f:
+        f.write(HIBENCH_REPORT)
+    runtime_predictor = predictor.RuntimePredictor()
+    assert runtime_predictor.load_directory(str(tmp_path)) == 3
+    assert runtime_predictor.predict('wordcount', 'spark', 'large', 'c4.large', 4) == 120.0
+    assert runtime_predictor.observations[('terasort', 'hadoop', 'huge', 'm4.large', 8)] == [400.0, 420.0]
+    assert ('terasort', 'spark', 'huge', 'm4.large', 8) not in runtime_predictor.observations
+    # scaled from the observed cluster size
+    assert runtime_predictor.predict('wordcount', 'spark', 'large', 'c4.large', 8) == 60.0
+
+
+def test_workers_and_pack():
+    assert predictor.workers(5, 'n+1') == 4
+    assert predictor.workers(1, 'n+1') == 1
+    assert predictor.workers(5, 'single') == 5
+    bins = predictor.pack({'a': 3000, 'b': 2000, 'c': 1000, 'd': 500}, 3600)
+    assert [sorted(b['items']) for b in bins] == [['a', 'd'], ['b', 'c']]
@@ -0,0 +1,57 @@
+import json
+import time
+
+import pytest
+
+from scoutcli.utils import readiness
+
+
+def _after(calls):
+    """A condition that turns true on the given call."""
+    state = {'calls': 0}
+
+    def condition():
+        state['calls'] += 1
+        return state['calls'] >= calls
+    return (condition, state)
+
+
+def test_wait_until_backs_off():
+    (condition, state) = _after(4)
+    # 0.01 + 0.02 + 0.04 between the four calls
+    waited = readiness.wait_until(condition, timeout=5, interval=0.01, max_interval=1)
+    assert state['calls'] == 4
+    assert 0.07 <= waited < 1
+
+
+def test_wait_until_caps_the_interval():
+    (condition, state) = _after(6)
+    waited = readiness.wait_until(condition, timeout=5, interval=0.01, max_interval=0.02)
+    # 0.01 + 4 * 0.02
+    assert 0.09 <= waited < 1
+
+
+def test_wait_until_times_out():
+    with pytest.raises(readiness.ReadinessTimeout):
+        readiness.wait_until(lambda: False, timeout=0.05, interval=0.01, max_interval=0.01)
+
+
+def test_failed_phase_cancels_the_others(tmp_path):
+    checker = readiness.Readiness(timeout=0.2, record_file=str(tmp_path / 'readiness.jsonl'))
+    start = time.time()
+    with pytest.raises(readiness.ReadinessTimeout):
+        # slow would poll for another 0.2 seconds after fast times out
+        checker.wait({'fast': lambda: False, 'slow': lambda: time.time() - start > 0.4}, interval=0.01, max_interval=0.05)
+    assert time.time() - start < 0.35
+
+
+def test_wait_and_record(tmp_path):
+    record_file = tmp_path / 'readiness.jsonl'
+    checker = readiness.Readiness(timeout=5, record_file=str(record_file))
+    phases = checker.wait({'a': _after(1)[0], 'b': _after(2)[0]}, interval=0.01)
+    assert sorted(phases) == ['a', 'b']
+    checker.record(command='test')
+    checker.record(command='again')
+    records = [json.loads(line) for line in record_file.read_text().splitlines()]
+    assert [record['command'] for record in records] == ['test', 'again']
+    assert records[0]['phases'] == phases and 'timestamp' in records[0]
@@ -0,0 +1,86 @@
+import os
+
+from scoutcli.utils import s3sync
+
+
+def _write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+def _source(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    _write(source / 'sar.csv', 'timestamp,cpu\n1,2\n')
+    _write(source / 'report.json', '{}')
+    return source
+
+
+def test_skip_unchanged_and_reupload_changed(tmp_path):
+    source = _source(tmp_path)
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    uploader = s3sync.Uploader(client=client, concurrency=2)
+    assert uploader.sync(str(source), 's3://bucket/run1') == (['report.json', 'sar.csv'], [], [])
+    assert uploader.sync(str(source), 's3://bucket/run1') == ([], ['report.json', 'sar.csv'], [])
+    _write(source / 'sar.csv', 'timestamp,cpu\n1,3\n')
+    assert uploader.sync(str(source), 's3://bucket/run1') == (['sar.csv'], ['report.json'], [])
+    with open(str(tmp_path / 's3' / 'bucket' / 'run1' / 'sar.csv'), 'r') as f:
+        assert f.read().endswith('1,3\n')
+
+
+def test_new_destination_uploads_everything(tmp_path):
+    source = _source(tmp_path)
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    uploader = s3sync.Uploader(client=client, concurrency=2)
+    uploader.sync(str(source), 's3://bucket/run1', include=['sar*.csv'])
+    assert uploader.sync(str(source), 's3://bucket/run2', include=['sar*.csv']) == (['sar.csv'], [], [])
+    assert os.path.exists(str(tmp_path / 's3' / 'bucket' / 'run2' / 'sar.csv'))
+    # the manifest of the first destination is kept
+    assert uploader.sync(str(source), 's3://bucket/run1', include=['sar*.csv']) == ([], ['sar.csv'], [])
+
+
+def test_remote_manifest_resumes_without_local_copy(tmp_path):
+    source = _source(tmp_path)
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    s3sync.Uploader(client=client).sync(str(source), 's3://bucket/run1')
+    os.remove(str(source / s3sync.MANIFEST_NAME))
+    assert s3sync.Uploader(client=client).sync(str(source), 's3://bucket/run1') == ([], ['report.json', 'sar.csv'], [])
+
+
+def test_multipart_upload(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    _write(source / 'big.log', 'x' * 1000)
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    uploader = s3sync.Uploader(client=client, multipart_threshold=100, chunk_size=300)
+    assert uploader.sync(str(source), 's3://bucket/run') == (['big.log'], [], [])
+    assert ('complete_multipart_upload', 'run/big.log') in client.calls
+    assert os.path.getsize(str(tmp_path / 's3' / 'bucket' / 'run' / 'big.log')) == 1000
+
+
+def test_concurrent_multipart_uploads_keep_their_parts(tmp_path):
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    # the first upload completes while the second is still in flight
+    first = client.create_multipart_upload(Bucket='bucket', Key='a')['UploadId']
+    second = client.create_multipart_upload(Bucket='bucket', Key='b')['UploadId']
+    client.upload_part(Bucket='bucket', Key='a', UploadId=first, PartNumber=1, Body=b'a')
+    client.complete_multipart_upload(Bucket='bucket', Key='a', UploadId=first, MultipartUpload={'Parts': [{'PartNumber': 1}]})
+    third = client.create_multipart_upload(Bucket='bucket', Key='c')['UploadId']
+    assert len({first, second, third}) == 3
+    client.upload_part(Bucket='bucket', Key='b', UploadId=second, PartNumber=1, Body=b'b')
+    client.upload_part(Bucket='bucket', Key='c', UploadId=third, PartNumber=1, Body=b'c')
+    client.complete_multipart_upload(Bucket='bucket', Key='b', UploadId=second, MultipartUpload={'Parts': [{'PartNumber': 1}]})
+    assert client.get_object(Bucket='bucket', Key='b')['Body'].read() == b'b'
+
+
+def test_many_multipart_files_in_parallel(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    for i in range(16):
+        _write(source / 'part{}.log'.format(i), str(i) * 1000)
+    client = s3sync.LocalS3Client(str(tmp_path / 's3'))
+    uploader = s3sync.Uploader(client=client, concurrency=8, multipart_threshold=100, chunk_size=50)
+    assert len(uploader.sync(str(source), 's3://bucket/run')[0]) == 16
+    for i in range(16):
+        with open(str(tmp_path / 's3' / 'bucket' / 'run' / 'part{}.log'.format(i)), 'r') as f:
+            assert f.read() == str(i) * 1000
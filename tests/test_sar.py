@@ -0,0 +1,44 @@
+import os
+import subprocess
+
+import pytest
+
+from scoutcli.utils import sar
+
+
+SADF = """#!/bin/sh
+case "$*" in
+  *-u*) printf '# hostname;interval;timestamp;CPU;%%usr;%%idle\\nnode;5;2017-01-01 00:00:05;-1;1.00;99.00\\n' ;;
+  *DEV*) printf '# hostname;interval;timestamp;IFACE;rxkB/s\\nnode;5;2017-01-01 00:00:05;eth0;2.00\\n' ;;
+  *) printf '# hostname;interval;timestamp;DEV;tps\\nnode;5;2017-01-01 00:00:05;xvda;3.00\\n' ;;
+esac
+exit {status}
+"""
+
+
+def _fake_sadf(tmp_path, monkeypatch, script):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    path = bin_dir / 'sadf'
+    path.write_text(script)
+    path.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(bin_dir, os.pathsep, os.environ['PATH']))
+
+
+def test_export_joins_activities(tmp_path, monkeypatch):
+    _fake_sadf(tmp_path, monkeypatch, SADF.format(status=0))
+    assert sar.export('sar.dat', str(tmp_path / 'sar.csv')) == 1
+    assert (tmp_path / 'sar.csv').exists()
+
+
+def test_export_raises_when_sadf_fails(tmp_path, monkeypatch):
+    _fake_sadf(tmp_path, monkeypatch, SADF.format(status=1))
+    with pytest.raises(subprocess.CalledProcessError):
+        sar.export('sar.dat', str(tmp_path / 'sar.csv'))
+
+
+def test_export_raises_without_records(tmp_path, monkeypatch):
+    _fake_sadf(tmp_path, monkeypatch, "#!/bin/sh\nexit 0\n")
+    with pytest.raises(RuntimeError):
+        sar.export('sar.dat', str(tmp_path / 'sar.csv'))
+    assert not (tmp_path / 'sar.csv').exists()
@@ -0,0 +1,33 @@
+from scoutcli.utils import scheduler
+
+
+SPARK_ENV = {
+    'spark.executor.instances': 15,
+    'spark.executor.cores': 1,
+    'spark.executor.memory': '2048m',
+    'spark.yarn.executor.memoryOverhead': 512,
+    'spark.yarn.am.cores': 1,
+    'spark.yarn.am.memory': '1536m',
+    'spark.yarn.am.memoryOverhead': 512,
+}
+CLUSTER = scheduler.capacity(4, 4, 16384)
+
+
+def test_small_workloads_share_the_cluster():
+    workloads = ['sparkperf spark spearman large 1', 'sparkperf spark fp-growth large 1', 'sparkperf spark regression large 1']
+    rounds = scheduler.plan(workloads, SPARK_ENV, CLUSTER)
+    assert [[w['app'] for w in r['workloads']] for r in rounds] == [['regression'], ['spearman', 'fp-growth']]
+    assert rounds[0]['executors'] == {'sparkperf spark regression large 1': None}
+    # 16 vcores minus two AMs, split evenly
+    assert set(rounds[1]['executors'].values()) == {7}
+
+
+def test_small_workloads_can_be_overridden():
+    workloads = ['sparkperf spark spearman large 1', 'sparkperf spark fp-growth large 1']
+    rounds = scheduler.plan(workloads, SPARK_ENV, CLUSTER, small_workloads=['spearman'])
+    assert [len(r['workloads']) for r in rounds] == [1, 1]
+
+
+def test_hibench_runs_alone():
+    rounds = scheduler.plan(['hibench spark wordcount small 1', 'hibench spark join small 1'], SPARK_ENV, CLUSTER)
+    assert all(len(r['workloads']) == 1 for r in rounds)
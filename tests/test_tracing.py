@@ -0,0 +1,64 @@
+import threading
+
+from scoutcli.utils import tracing
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _traced():
+    clock = _Clock()
+    tracer = tracing.Tracer(host='node1', clock=clock)
+    with tracer.span('run', workload='terasort'):
+        with tracer.span('configure'):
+            clock.now += 2
+        with tracer.span('execute') as args:
+            args['status'] = 'ok'
+            clock.now += 10
+        clock.now += 1
+    return tracer
+
+
+def test_span_depths_and_events():
+    tracer = _traced()
+    assert {r['name']: r['depth'] for r in tracer.spans} == {'run': 0, 'configure': 1, 'execute': 1}
+    events = tracer.events()
+    assert events[0]['ph'] == 'M' and events[0]['args'] == {'name': 'node1'}
+    run = events[1]
+    assert run['name'] == 'run' and run['ph'] == 'X'
+    assert (run['ts'], run['dur']) == (100000000, 13000000)
+    assert run['pid'] == tracer.pid and run['tid'] == threading.get_ident()
+    assert run['args'] == {'workload': 'terasort', 'host': 'node1'}
+    assert events[3]['args'] == {'status': 'ok', 'host': 'node1'}
+
+
+def test_summary_overhead_is_wall_minus_execute():
+    summary = _traced().summary()
+    assert summary['wall_seconds'] == 13.0
+    assert summary['workload_seconds'] == 10.0
+    assert summary['overhead_seconds'] == 3.0
+    assert summary['phases'] == {'configure': 2.0, 'execute': 10.0}
+
+
+def test_wrapped_threads_nest_in_the_parent_span():
+    tracer = tracing.Tracer(host='node1')
+
+    def member(name):
+        with tracer.span(name):
+            with tracer.span('execute'):
+                pass
+
+    with tracer.span('session'):
+        threads = [threading.Thread(target=tracer.wrap(member), args=(name,)) for name in ['a', 'b']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    depths = sorted((r['name'], r['depth']) for r in tracer.spans)
+    assert depths == [('a', 1), ('b', 1), ('execute', 2), ('execute', 2), ('session', 0)]
+    assert sorted(tracer.summary()['phases']) == ['a', 'b']
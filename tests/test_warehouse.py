@@ -0,0 +1,34 @@
+import json
+
+from scoutcli.utils import warehouse
+
+
+def _run(root, name, values, completed=True):
+    path = root / name
+    path.mkdir()
+    with open(str(path / 'report.json'), 'w') as f:
+        json.dump({'completed': completed, 'elapsed_time': 100}, f)
+    with open(str(path / 'sar_node1.csv'), 'w') as f:
+        f.write("timestamp,cpu.%usr\n")
+        for (i, value) in enumerate(values):
+            f.write("2018-05-01 10:{:02d}:{:02d}.000,{}\n".format(i // 60, i % 60, value))
+    return path
+
+
+def test_query_matches_python_aggregates(tmp_path):
+    _run(tmp_path, '2_c4.large_wordcount_spark_large_1', [i % 7 for i in range(600)])
+    _run(tmp_path, '4_c4.large_wordcount_spark_large_1', [i % 11 for i in range(300)])
+    _run(tmp_path, '8_c4.large_wordcount_spark_large_1', [50] * 120, completed=False)
+    store = warehouse.Warehouse(str(tmp_path / 'scout.db'))
+    assert store.index(str(tmp_path), downsample=10) == (3, 0)
+    buckets = {}
+    for (size, value) in store.db.execute("SELECT runs.cluster_size, samples.value FROM samples JOIN runs ON samples.run = runs.id WHERE runs.completed = 1"):
+        buckets.setdefault(size, []).append(value)
+    assert sorted(store.query('cpu.%usr', 'max')) == [2, 4]
+    for (size, values) in buckets.items():
+        assert abs(store.query('cpu.%usr', 'mean')[size] - sum(values) / len(values)) < 1e-9
+        assert store.query('cpu.%usr', 'max')[size] == max(values)
+        for p in [0, 50, 95, 100]:
+            assert abs(store.query('cpu.%usr', 'p{}'.format(p))[size] - warehouse.percentile(values, p)) < 1e-9
+    assert store.index(str(tmp_path), downsample=10) == (0, 3)
+    store.close()